@@ -8,6 +8,7 @@ from .views import (
     PasswordResetView,
     PasswordResetConfirmView,
     CheckUsernameView,
+    WebSocketTicketView,
     logout_view
 )
 
@@ -23,6 +24,7 @@ urlpatterns = [
     # Token management
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('ws-ticket/', WebSocketTicketView.as_view(), name='ws_ticket'),
     
     # User profile
     path('me/', UserProfileView.as_view(), name='user_profile'),
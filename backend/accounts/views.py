@@ -12,6 +12,8 @@ from django.utils import timezone
 from datetime import timedelta
 import hashlib
 
+from core.websocket import issue_ticket
+
 from .serializers import (
     UserSerializer,
     UserRegistrationSerializer,
@@ -68,6 +70,17 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
 
+class WebSocketTicketView(APIView):
+    """Issue a single-use ticket for opening a websocket."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        return Response({
+            'ticket': issue_ticket(request.user),
+            'expires_in': settings.WEBSOCKET_TICKET_TIMEOUT
+        }, status=status.HTTP_201_CREATED)
+
+
 class PasswordChangeView(APIView):
     """Change password for authenticated user."""
     permission_classes = [permissions.IsAuthenticated]
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SizeAnalytics, APIRequestLog, FeatureUsage
+from .models import SizeAnalytics, APIRequestRollup, FeatureUsage
 
 @admin.register(SizeAnalytics)
 class SizeAnalyticsAdmin(admin.ModelAdmin):
@@ -7,12 +7,12 @@ class SizeAnalyticsAdmin(admin.ModelAdmin):
     list_filter = ['brand', 'garment_category', 'return_reported']
     date_hierarchy = 'created_at'
 
-@admin.register(APIRequestLog)
-class APIRequestLogAdmin(admin.ModelAdmin):
-    list_display = ['user', 'endpoint', 'method', 'status_code', 'response_time_ms', 'created_at']
-    list_filter = ['method', 'status_code']
-    search_fields = ['user__email', 'endpoint']
-    date_hierarchy = 'created_at'
+@admin.register(APIRequestRollup)
+class APIRequestRollupAdmin(admin.ModelAdmin):
+    list_display = ['hour', 'endpoint', 'method', 'request_count', 'error_count', 'p95_response_time_ms']
+    list_filter = ['method']
+    search_fields = ['endpoint']
+    date_hierarchy = 'hour'
 
 @admin.register(FeatureUsage)
 class FeatureUsageAdmin(admin.ModelAdmin):
@@ -0,0 +1,141 @@
+from collections import deque
+from typing import Any, Dict, Optional
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger('miora.analytics')
+
+
+class RequestLogBuffer:
+    """Bounded in-process buffer that writes API request logs in batches.
+
+    The request path only appends to a deque; a daemon thread flushes it into
+    the daily log partitions with ``bulk_create`` whenever ``flush_size`` records are waiting or
+    ``flush_interval`` seconds have passed. When the buffer is full new
+    records are dropped and counted rather than blocking the request, so a
+    slow database cannot grow worker memory.
+    """
+
+    def __init__(self, capacity: int = 10000, flush_size: int = 500,
+                 flush_interval: float = 2.0, background: bool = True):
+        self.capacity = capacity
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.background = background
+
+        self._records = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+
+    def append(self, record: Dict[str, Any]) -> bool:
+        """Queue one request log field dict; False if it was dropped."""
+        with self._lock:
+            if len(self._records) >= self.capacity:
+                self.dropped += 1
+                return False
+            self._records.append(record)
+            pending = len(self._records)
+
+        if self.background:
+            self._ensure_thread()
+            if pending >= self.flush_size:
+                self._wakeup.set()
+        return True
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows saved."""
+        from .partitions import write_records
+
+        # One flusher at a time keeps batches in arrival order
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._records)
+                self._records.clear()
+            if not batch:
+                return 0
+
+            try:
+                write_records(batch, batch_size=self.flush_size)
+            except Exception as e:
+                # Not re-queued: a failing database must not pin memory
+                with self._lock:
+                    self.failed += len(batch)
+                logger.error(f'Failed to write {len(batch)} API request logs: {str(e)}')
+                return 0
+
+            with self._lock:
+                self.flushed += len(batch)
+            return len(batch)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'buffered': len(self._records),
+                'capacity': self.capacity,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'failed': self.failed,
+            }
+
+    def _ensure_thread(self):
+        # Forked workers (gunicorn --preload) inherit the object but not the
+        # thread, so it is started per process.
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='api-request-log-flusher', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+_buffer: Optional[RequestLogBuffer] = None
+
+
+def get_request_log_buffer() -> RequestLogBuffer:
+    """Process-wide buffer configured from ``API_REQUEST_LOG_BUFFER``."""
+    global _buffer
+    if _buffer is None:
+        options = getattr(settings, 'API_REQUEST_LOG_BUFFER', {})
+        _buffer = RequestLogBuffer(
+            capacity=options.get('CAPACITY', 10000),
+            flush_size=options.get('FLUSH_SIZE', 500),
+            flush_interval=options.get('FLUSH_INTERVAL', 2.0),
+            background=options.get('BACKGROUND', True),
+        )
+        atexit.register(_flush_at_exit)
+    return _buffer
+
+
+def _flush_at_exit():
+    if _buffer is not None:
+        try:
+            _buffer.flush()
+        except Exception as e:
+            logger.error(f'Failed to flush API request logs at exit: {str(e)}')
+
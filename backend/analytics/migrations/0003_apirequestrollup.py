@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_alter_apirequestlog_created_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="APIRequestRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField()),
+                ("endpoint", models.CharField(max_length=255)),
+                ("method", models.CharField(max_length=10)),
+                ("request_count", models.PositiveIntegerField(default=0)),
+                ("error_count", models.PositiveIntegerField(default=0)),
+                ("avg_response_time_ms", models.FloatField(blank=True, null=True)),
+                ("p50_response_time_ms", models.FloatField(blank=True, null=True)),
+                ("p95_response_time_ms", models.FloatField(blank=True, null=True)),
+                ("p99_response_time_ms", models.FloatField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "db_table": "api_request_rollups",
+                "indexes": [
+                    models.Index(fields=["hour"], name="api_request_hour_33851c_idx"),
+                    models.Index(
+                        fields=["endpoint", "hour"], name="api_request_endpoin_502b42_idx"
+                    ),
+                ],
+                "unique_together": {("hour", "endpoint", "method")},
+            },
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 import uuid
 
 
@@ -29,7 +30,9 @@ class SizeAnalytics(models.Model):
 
 
 class APIRequestLog(models.Model):
-    """For rate limiting and monitoring"""
+    """Legacy request log; requests are now logged to daily partitions
+    (``analytics.partitions``) and read through ``APIRequestRollup``.
+    """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
     endpoint = models.CharField(max_length=255)
@@ -38,7 +41,8 @@ class APIRequestLog(models.Model):
     response_time_ms = models.IntegerField(null=True, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the request finished, not when the buffered row is written
+    created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         db_table = 'api_request_logs'
@@ -63,3 +67,30 @@ class FeatureUsage(models.Model):
             models.Index(fields=['feature_name', 'created_at']),
             models.Index(fields=['user', 'created_at']),
         ]
+
+
+class APIRequestRollup(models.Model):
+    """Hourly request count and latency percentiles per endpoint.
+    
+    Built from the daily request log partitions by
+    ``RequestLogRollupService``; dashboards read these instead of raw rows.
+    """
+    hour = models.DateTimeField()
+    endpoint = models.CharField(max_length=255)  # ids replaced by {id}
+    method = models.CharField(max_length=10)
+    request_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)  # 5xx responses
+    avg_response_time_ms = models.FloatField(null=True, blank=True)
+    p50_response_time_ms = models.FloatField(null=True, blank=True)
+    p95_response_time_ms = models.FloatField(null=True, blank=True)
+    p99_response_time_ms = models.FloatField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'api_request_rollups'
+        unique_together = ['hour', 'endpoint', 'method']
+        indexes = [
+            models.Index(fields=['hour']),
+            models.Index(fields=['endpoint', 'hour']),
+        ]
@@ -0,0 +1,147 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from typing import Any, Dict, Iterable, List
+import re
+import threading
+import logging
+
+from django.apps.registry import Apps
+from django.db import DatabaseError, connection, models
+from django.utils import timezone
+
+logger = logging.getLogger('miora.analytics')
+
+TABLE_PREFIX = 'api_request_logs_'
+TABLE_PATTERN = re.compile(rf'^{TABLE_PREFIX}(\d{{8}})$')
+
+# Partition models live in their own registry so they never show up in
+# migrations, admin or ``apps.get_models()``.
+_partition_apps = Apps()
+_models: Dict[date, type] = {}
+_existing = set()
+_lock = threading.Lock()
+
+
+def partition_table(day: date) -> str:
+    return f'{TABLE_PREFIX}{day:%Y%m%d}'
+
+
+def partition_day(moment: datetime) -> date:
+    """UTC day a timestamp is stored under."""
+    return moment.astimezone(dt_timezone.utc).date() if timezone.is_aware(moment) else moment.date()
+
+
+def partition_model(day: date) -> type:
+    """Unmanaged model for one daily ``APIRequestLog`` partition table.
+
+    Partitions use a bigint key and a bounded ``user_agent`` instead of the
+    base table's UUID and text columns, and keep ``user_id`` without a
+    foreign key constraint so a whole day can be dropped at once.
+    """
+    model = _models.get(day)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(day)
+        if model is None:
+            table = partition_table(day)
+            meta = type('Meta', (), {
+                'app_label': 'analytics',
+                'db_table': table,
+                'managed': False,
+                'apps': _partition_apps,
+                'indexes': [models.Index(fields=['created_at'], name=f'{table}_created')],
+            })
+            model = type(f'APIRequestLog{day:%Y%m%d}', (models.Model,), {
+                '__module__': __name__,
+                'Meta': meta,
+                'id': models.BigAutoField(primary_key=True),
+                'user_id': models.UUIDField(null=True, blank=True),
+                'endpoint': models.CharField(max_length=255),
+                'method': models.CharField(max_length=10),
+                'status_code': models.SmallIntegerField(null=True, blank=True),
+                'response_time_ms': models.IntegerField(null=True, blank=True),
+                'ip_address': models.GenericIPAddressField(null=True, blank=True),
+                'user_agent': models.CharField(max_length=255, blank=True),
+                'created_at': models.DateTimeField(),
+            })
+            _models[day] = model
+    return model
+
+
+def existing_partitions() -> List[date]:
+    """Days that currently have a partition table, oldest first."""
+    days = []
+    for table in connection.introspection.table_names():
+        match = TABLE_PATTERN.match(table)
+        if match:
+            days.append(datetime.strptime(match.group(1), '%Y%m%d').date())
+    return sorted(days)
+
+
+def ensure_partition(day: date) -> type:
+    """Create the day's partition table if needed and return its model."""
+    model = partition_model(day)
+    table = model._meta.db_table
+    if table in _existing:
+        return model
+
+    with _lock:
+        if table not in _existing:
+            if table not in connection.introspection.table_names():
+                try:
+                    with connection.schema_editor() as schema_editor:
+                        schema_editor.create_model(model)
+                    logger.info(f'Created API request log partition {table}')
+                except DatabaseError:
+                    # Another worker created the same day's table first
+                    if table not in connection.introspection.table_names():
+                        raise
+            _existing.add(table)
+    return model
+
+
+def write_records(records: Iterable[Dict[str, Any]], batch_size: int = 500) -> int:
+    """Insert buffered log records into their daily partitions."""
+    by_day: Dict[date, List[Dict[str, Any]]] = {}
+    for record in records:
+        record = dict(record)
+        record['created_at'] = record.get('created_at') or timezone.now()
+        by_day.setdefault(partition_day(record['created_at']), []).append(record)
+
+    written = 0
+    for day, day_records in by_day.items():
+        model = ensure_partition(day)
+        model.objects.bulk_create([model(**record) for record in day_records], batch_size=batch_size)
+        written += len(day_records)
+    return written
+
+
+def records_between(start: datetime, end: datetime):
+    """Rows logged in ``[start, end)``, as a list of querysets (one per partition)."""
+    existing = set(existing_partitions())
+    querysets = []
+    day = partition_day(start)
+    last_day = partition_day(end - timedelta(microseconds=1))
+    while day <= last_day:
+        if day in existing:
+            querysets.append(
+                partition_model(day).objects.filter(created_at__gte=start, created_at__lt=end)
+            )
+        day += timedelta(days=1)
+    return querysets
+
+
+def drop_partitions_before(cutoff: date) -> List[date]:
+    """Drop every partition older than ``cutoff``: one DROP TABLE per day."""
+    dropped = []
+    for day in existing_partitions():
+        if day >= cutoff:
+            break
+        model = partition_model(day)
+        with connection.schema_editor() as schema_editor:
+            schema_editor.delete_model(model)
+        with _lock:
+            _existing.discard(model._meta.db_table)
+        dropped.append(day)
+    return dropped
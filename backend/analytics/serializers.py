@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import SizeAnalytics, APIRequestLog, FeatureUsage
+from .models import SizeAnalytics, APIRequestRollup, FeatureUsage
 
 
 class SizeAnalyticsSerializer(serializers.ModelSerializer):
@@ -19,12 +19,12 @@ class BrandAnalyticsRequestSerializer(serializers.Serializer):
     garment_category = serializers.CharField(max_length=50, required=False)
 
 
-class APIRequestLogSerializer(serializers.ModelSerializer):
-    """Read-only serializer for API request logs."""
+class APIRequestRollupSerializer(serializers.ModelSerializer):
+    """Read-only serializer for hourly API request rollups."""
     
     class Meta:
-        model = APIRequestLog
-        fields = '__all__'
+        model = APIRequestRollup
+        exclude = ('id', 'created_at')
         read_only_fields = '__all__'
 
 
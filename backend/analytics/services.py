@@ -1,7 +1,15 @@
-from datetime import datetime
-from typing import Dict, Any
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+import re
 import logging
-from .models import SizeAnalytics
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import SizeAnalytics, APIRequestRollup
+from .partitions import records_between, drop_partitions_before, partition_day
 
 logger = logging.getLogger('miora.analytics')
 
@@ -15,7 +23,7 @@ class AnalyticsService:
         try:
             # Anonymize measurements
             height_range = AnalyticsService._get_range(avatar.height, 10)
-            weight_range = AnalyticsService._get_range(avatar.weight, 10) if avatar.weight else None
+            weight_range = AnalyticsService._get_range(avatar.weight, 10) if avatar.weight else ''
             
             SizeAnalytics.objects.create(
                 brand=garment.brand or 'Unknown',
@@ -30,6 +38,29 @@ class AnalyticsService:
         except Exception as e:
             logger.error(f'Failed to track size recommendation: {str(e)}')
     
+    @staticmethod
+    def track_size_recommendations(avatar, recommendations):
+        """Track a batch of recommendations for one avatar with a single insert."""
+        try:
+            height_range = AnalyticsService._get_range(avatar.height, 10)
+            weight_range = AnalyticsService._get_range(avatar.weight, 10) if avatar.weight else ''
+            
+            SizeAnalytics.objects.bulk_create([
+                SizeAnalytics(
+                    brand=recommendation.garment.brand or 'Unknown',
+                    garment_category=recommendation.garment.category,
+                    recommended_size=recommendation.recommended_size,
+                    fit_score=recommendation.confidence_score,
+                    height_range=height_range,
+                    weight_range=weight_range,
+                    body_type=avatar.body_type or 'average'
+                )
+                for recommendation in recommendations
+            ])
+            
+        except Exception as e:
+            logger.error(f'Failed to track size recommendations: {str(e)}')
+    
     @staticmethod
     def track_size_feedback(recommendation):
         """Track user feedback on size recommendation."""
@@ -63,4 +94,107 @@ class AnalyticsService:
         
         lower = int(value // step) * step
         upper = lower + step
-        return f"{lower}-{upper}"
\ No newline at end of file
+        return f"{lower}-{upper}"
+
+
+class RequestLogRollupService:
+    """Hourly rollups and retention for the partitioned API request log."""
+    
+    # Path segments that identify objects are grouped under one endpoint
+    ID_SEGMENT = re.compile(
+        r'/(?:[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}|\d+)(?=/|$)',
+        re.IGNORECASE
+    )
+    PERCENTILES = (50, 95, 99)
+    
+    @classmethod
+    def endpoint_group(cls, path: str) -> str:
+        return cls.ID_SEGMENT.sub('/{id}', path)[:255]
+    
+    @classmethod
+    def rollup_hour(cls, hour: datetime) -> List[APIRequestRollup]:
+        """(Re)build the rollups of the hour starting at ``hour``."""
+        hour = hour.replace(minute=0, second=0, microsecond=0)
+        end = hour + timedelta(hours=1)
+        
+        # The database collapses the hour to one row per endpoint, method
+        # and distinct response time; only those counts reach Python.
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        for queryset in records_between(hour, end):
+            rows = queryset.values('endpoint', 'method', 'response_time_ms').annotate(
+                requests=Count('id'),
+                errors=Count('id', filter=Q(status_code__gte=500)),
+            ).order_by()
+            for row in rows.iterator():
+                group = groups.setdefault(
+                    (cls.endpoint_group(row['endpoint']), row['method']),
+                    {'requests': 0, 'errors': 0, 'times': Counter()}
+                )
+                group['requests'] += row['requests']
+                group['errors'] += row['errors']
+                if row['response_time_ms'] is not None:
+                    group['times'][row['response_time_ms']] += row['requests']
+        
+        rollups = []
+        for (endpoint, method), group in groups.items():
+            times = group['times']
+            average, percentiles = _weighted_stats(times, cls.PERCENTILES)
+            rollups.append(APIRequestRollup(
+                hour=hour,
+                endpoint=endpoint,
+                method=method,
+                request_count=group['requests'],
+                error_count=group['errors'],
+                avg_response_time_ms=average,
+                p50_response_time_ms=_optional_float(percentiles[0]),
+                p95_response_time_ms=_optional_float(percentiles[1]),
+                p99_response_time_ms=_optional_float(percentiles[2]),
+            ))
+        
+        # Idempotent: late flushes can re-run an hour
+        with transaction.atomic():
+            APIRequestRollup.objects.filter(hour=hour).delete()
+            APIRequestRollup.objects.bulk_create(rollups)
+        
+        return rollups
+    
+    @staticmethod
+    def prune(retention_days: Optional[int] = None) -> list:
+        """Drop request log partitions older than the retention period."""
+        if retention_days is None:
+            retention_days = getattr(settings, 'API_REQUEST_LOG_RETENTION_DAYS', 30)
+        # Partitions are named by UTC day
+        cutoff = partition_day(timezone.now()) - timedelta(days=retention_days)
+        return drop_partitions_before(cutoff)
+
+
+def _weighted_stats(counts: Counter, percentiles) -> tuple:
+    """Mean and linearly interpolated percentiles of ``{value: count}``.
+    
+    Matches ``np.percentile`` over the expanded values without building
+    them; ``(None, [None, ...])`` when there are none.
+    """
+    if not counts:
+        return None, [None] * len(percentiles)
+    
+    values = np.array(sorted(counts), dtype=np.float64)
+    weights = np.array([counts[value] for value in sorted(counts)], dtype=np.int64)
+    cumulative = np.cumsum(weights)
+    total = int(cumulative[-1])
+    
+    def nth(index):
+        # Value of the index-th (0-based) element of the sorted expansion
+        return values[np.searchsorted(cumulative, index, side='right')]
+    
+    results = []
+    for q in percentiles:
+        position = q / 100 * (total - 1)
+        lower = int(np.floor(position))
+        upper = int(np.ceil(position))
+        results.append(nth(lower) + (nth(upper) - nth(lower)) * (position - lower))
+    
+    return float((values * weights).sum() / total), results
+
+
+def _optional_float(value) -> Optional[float]:
+    return None if value is None else round(float(value), 2)
@@ -0,0 +1,39 @@
+from celery import shared_task
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+import logging
+from .services import RequestLogRollupService
+
+logger = logging.getLogger('miora.analytics')
+
+
+@shared_task(bind=True, max_retries=3)
+def rollup_api_requests(self, hour=None):
+    """Roll up the given hour (ISO timestamp), by default the last full hour."""
+    try:
+        if hour is None:
+            start = timezone.now() - timedelta(hours=1)
+        else:
+            start = parse_datetime(hour)
+        
+        rollups = RequestLogRollupService.rollup_hour(start)
+        return {'success': True, 'endpoints': len(rollups)}
+        
+    except Exception as e:
+        logger.error(f'API request rollup failed: {str(e)}')
+        raise self.retry(exc=e, countdown=60)
+
+
+@shared_task(bind=True, max_retries=3)
+def prune_api_request_logs(self):
+    """Drop request log partitions past the retention period."""
+    try:
+        dropped = RequestLogRollupService.prune()
+        if dropped:
+            logger.info(f'Dropped {len(dropped)} API request log partitions')
+        return {'success': True, 'dropped': [day.isoformat() for day in dropped]}
+        
+    except Exception as e:
+        logger.error(f'API request log pruning failed: {str(e)}')
+        raise self.retry(exc=e, countdown=300)
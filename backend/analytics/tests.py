@@ -1,3 +1,210 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, RequestFactory
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest.mock import patch
+import numpy as np
 
-# Create your tests here.
+from core.middleware import APILoggingMiddleware
+from .buffer import RequestLogBuffer
+from . import partitions
+from .models import APIRequestRollup
+from .partitions import partition_model, existing_partitions, drop_partitions_before, write_records
+from .services import RequestLogRollupService
+
+User = get_user_model()
+
+
+class PartitionedLogTestCase(TransactionTestCase):
+    """Creates and drops partition tables, which needs real transactions."""
+
+    def setUp(self):
+        self.addCleanup(drop_partitions_before, date.max)
+
+    def logs(self, day=None):
+        return partition_model(day or timezone.now().date()).objects
+
+
+class RequestLogBufferTest(PartitionedLogTestCase):
+    """Test cases for the batched API request log writer."""
+
+    def _record(self, **overrides):
+        return {
+            'endpoint': '/api/v1/garments/',
+            'method': 'GET',
+            'status_code': 200,
+            'response_time_ms': 12,
+            'ip_address': '127.0.0.1',
+            'created_at': timezone.now(),
+            **overrides
+        }
+
+    def test_flush_writes_one_batch(self):
+        """Test buffered records are written with a single insert."""
+        buffer = RequestLogBuffer(flush_size=100, background=False)
+        buffer.append(self._record())
+        buffer.flush()  # creates today's partition
+
+        finished_at = timezone.now() - timedelta(seconds=5)
+        for i in range(10):
+            buffer.append(self._record(status_code=200 + i, created_at=finished_at))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(buffer.flush(), 10)
+
+        inserts = [query for query in queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+
+        self.assertEqual(self.logs(finished_at.date()).filter(created_at=finished_at).count(), 10)
+        self.assertEqual(buffer.stats()['flushed'], 11)
+        self.assertEqual(buffer.stats()['buffered'], 0)
+
+    def test_full_buffer_drops_and_counts(self):
+        """Test backpressure drops records instead of growing memory."""
+        buffer = RequestLogBuffer(capacity=3, background=False)
+
+        results = [buffer.append(self._record()) for _ in range(5)]
+
+        self.assertEqual(results, [True, True, True, False, False])
+        self.assertEqual(buffer.stats()['buffered'], 3)
+        self.assertEqual(buffer.stats()['dropped'], 2)
+
+    def test_failed_flush_is_not_requeued(self):
+        """Test a failing database write is counted and discarded."""
+        buffer = RequestLogBuffer(background=False)
+        buffer.append(self._record())
+
+        with patch('analytics.partitions.write_records', side_effect=Exception('db down')):
+            self.assertEqual(buffer.flush(), 0)
+
+        self.assertEqual(buffer.stats()['failed'], 1)
+        self.assertEqual(buffer.stats()['buffered'], 0)
+
+    def test_middleware_logs_without_queries(self):
+        """Test the response path only buffers the log entry."""
+        user = User.objects.create_user(
+            email='logger@example.com',
+            username='logger',
+            password='testpass123'
+        )
+        buffer = RequestLogBuffer(background=False)
+        request = RequestFactory().get('/api/v1/garments/', HTTP_USER_AGENT='tests')
+        request.user = user
+        middleware = APILoggingMiddleware(lambda request: HttpResponse())
+
+        with patch('core.middleware.get_request_log_buffer', return_value=buffer):
+            with self.assertNumQueries(0):
+                middleware(request)
+                anonymous = RequestFactory().get('/api/v1/garments/')
+                anonymous.user = AnonymousUser()
+                middleware(anonymous)
+
+        buffer.flush()
+        self.assertEqual(self.logs().filter(user_id=user.pk, user_agent='tests').count(), 1)
+        self.assertEqual(self.logs().filter(user_id__isnull=True).count(), 1)
+
+    def test_middleware_is_installed(self):
+        """Test API requests through the full stack reach the buffer."""
+        buffer = RequestLogBuffer(background=False)
+
+        with patch('core.middleware.get_request_log_buffer', return_value=buffer):
+            response = self.client.get('/api/v1/garments/garments/')
+
+        self.assertEqual(buffer.stats()['buffered'], 1)
+        buffer.flush()
+        self.assertTrue(self.logs().filter(status_code=response.status_code).exists())
+
+
+class RequestLogPartitionTest(PartitionedLogTestCase):
+    """Test cases for daily partitions, retention and hourly rollups."""
+
+    def _record(self, created_at, endpoint='/api/v1/garments/', response_time_ms=10, status_code=200):
+        return {
+            'endpoint': endpoint,
+            'method': 'GET',
+            'status_code': status_code,
+            'response_time_ms': response_time_ms,
+            'created_at': created_at,
+        }
+
+    def test_records_are_written_per_day(self):
+        """Test records land in the partition of their UTC day."""
+        late = datetime(2026, 3, 1, 23, 59, tzinfo=dt_timezone.utc)
+        write_records([self._record(late), self._record(late + timedelta(minutes=2))])
+
+        self.assertEqual(existing_partitions(), [date(2026, 3, 1), date(2026, 3, 2)])
+        self.assertEqual(self.logs(date(2026, 3, 1)).count(), 1)
+        self.assertEqual(self.logs(date(2026, 3, 2)).count(), 1)
+
+    def test_retention_drops_whole_partitions(self):
+        """Test pruning drops old day tables and keeps recent ones."""
+        now = timezone.now()
+        write_records([self._record(now - timedelta(days=days)) for days in (0, 5, 40, 41)])
+
+        dropped = RequestLogRollupService.prune(retention_days=30)
+
+        self.assertEqual(len(dropped), 2)
+        self.assertEqual(
+            existing_partitions(),
+            sorted({(now - timedelta(days=days)).astimezone(dt_timezone.utc).date() for days in (0, 5)})
+        )
+
+    def test_partition_created_concurrently(self):
+        """Test losing the race to create a day's table still writes."""
+        day = datetime(2026, 3, 1, 12, tzinfo=dt_timezone.utc)
+        write_records([self._record(day)])
+        partitions._existing.clear()
+
+        # Another worker created the table after this one checked
+        tables = connection.introspection.table_names()
+        missing = [name for name in tables if not name.startswith(partitions.TABLE_PREFIX)]
+        with patch.object(connection.introspection, 'table_names', side_effect=[missing, tables]):
+            write_records([self._record(day)])
+
+        self.assertEqual(self.logs(date(2026, 3, 1)).count(), 2)
+
+    def test_rollup_matches_unaggregated_percentiles(self):
+        """Test percentiles over repeated response times match numpy's."""
+        hour = datetime(2026, 3, 1, 14, tzinfo=dt_timezone.utc)
+        times = [5, 5, 5, 7, 7, 12, 40, 40, 41, 300, None]
+        write_records([
+            self._record(hour + timedelta(seconds=i), response_time_ms=time)
+            for i, time in enumerate(times)
+        ])
+
+        rollup = RequestLogRollupService.rollup_hour(hour)[0]
+
+        expected = np.percentile([time for time in times if time is not None], (50, 95, 99))
+        self.assertEqual(rollup.request_count, 11)
+        self.assertAlmostEqual(rollup.avg_response_time_ms, 46.2)
+        self.assertAlmostEqual(rollup.p50_response_time_ms, round(expected[0], 2))
+        self.assertAlmostEqual(rollup.p95_response_time_ms, round(expected[1], 2))
+        self.assertAlmostEqual(rollup.p99_response_time_ms, round(expected[2], 2))
+
+    def test_hourly_rollup_percentiles(self):
+        """Test rollups group ids and compute latency percentiles."""
+        hour = datetime(2026, 3, 1, 14, tzinfo=dt_timezone.utc)
+        records = [
+            self._record(hour + timedelta(seconds=i), f'/api/v1/garments/{i}/', response_time_ms=i + 1)
+            for i in range(100)
+        ]
+        records.append(self._record(hour + timedelta(minutes=5), status_code=502))
+        records.append(self._record(hour + timedelta(hours=1)))  # next hour
+        write_records(records)
+
+        RequestLogRollupService.rollup_hour(hour + timedelta(minutes=30))
+        RequestLogRollupService.rollup_hour(hour)  # re-running replaces
+
+        detail = APIRequestRollup.objects.get(hour=hour, endpoint='/api/v1/garments/{id}/')
+        self.assertEqual(detail.request_count, 100)
+        self.assertAlmostEqual(detail.p50_response_time_ms, 50.5)
+        self.assertAlmostEqual(detail.p95_response_time_ms, 95.05)
+        self.assertAlmostEqual(detail.p99_response_time_ms, 99.01)
+
+        listing = APIRequestRollup.objects.get(hour=hour, endpoint='/api/v1/garments/')
+        self.assertEqual((listing.request_count, listing.error_count), (1, 1))
+        self.assertEqual(APIRequestRollup.objects.count(), 2)
@@ -2,7 +2,9 @@ from django.urls import path
 from .views import (
     BrandAnalyticsView,
     TrackFeatureUsageView,
-    UserStatsView
+    UserStatsView,
+    APIRequestRollupView,
+    RoutePerformanceView
 )
 
 app_name = 'analytics'
@@ -11,4 +13,6 @@ urlpatterns = [
     path('brand/', BrandAnalyticsView.as_view(), name='brand_analytics'),
     path('track/', TrackFeatureUsageView.as_view(), name='track_usage'),
     path('user-stats/', UserStatsView.as_view(), name='user_stats'),
+    path('requests/rollups/', APIRequestRollupView.as_view(), name='request_rollups'),
+    path('requests/performance/', RoutePerformanceView.as_view(), name='route_performance'),
 ]
\ No newline at end of file
@@ -4,9 +4,11 @@ from rest_framework.views import APIView
 from django.db.models import Count, Avg, Q
 from django.utils import timezone
 from datetime import timedelta
-from .models import SizeAnalytics, FeatureUsage
+from core import profiling
+from .models import SizeAnalytics, FeatureUsage, APIRequestRollup
 from .serializers import (
     SizeAnalyticsSerializer,
+    APIRequestRollupSerializer,
     BrandAnalyticsRequestSerializer,
     FeatureUsageSerializer
 )
@@ -94,4 +96,50 @@ class UserStatsView(APIView):
         if stats['recent_activity']['last_outfit_saved']:
             stats['recent_activity']['last_outfit_saved'] = stats['recent_activity']['last_outfit_saved'].created_at
         
-        return Response(stats)
\ No newline at end of file
+        return Response(stats)
+
+
+class APIRequestRollupView(generics.ListAPIView):
+    """Hourly request counts and latency percentiles per endpoint."""
+    serializer_class = APIRequestRollupSerializer
+    permission_classes = [permissions.IsAdminUser]
+    
+    MAX_HOURS = 24 * 31
+    
+    def get_queryset(self):
+        try:
+            hours = int(self.request.query_params.get('hours', 24))
+        except ValueError:
+            hours = 24
+        hours = min(max(hours, 1), self.MAX_HOURS)
+        
+        queryset = APIRequestRollup.objects.filter(
+            hour__gte=timezone.now() - timedelta(hours=hours)
+        )
+        
+        endpoint = self.request.query_params.get('endpoint')
+        if endpoint:
+            queryset = queryset.filter(endpoint=endpoint)
+        
+        return queryset.order_by('-hour', 'endpoint', 'method')
+
+
+class RoutePerformanceView(APIView):
+    """Histograms of sampled request profiles per route, across workers."""
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request):
+        options = profiling.get_settings()
+        routes = profiling.summarize(profiling.route_metrics.collect())
+        
+        route = request.query_params.get('route')
+        if route:
+            routes = [row for row in routes if route in row['route']]
+        
+        return Response({
+            'sample_rate': options['SAMPLE_RATE'],
+            'bucket_bounds_ms': [
+                None if bound == float('inf') else bound for bound in profiling.BUCKETS_MS
+            ],
+            'routes': routes,
+        })
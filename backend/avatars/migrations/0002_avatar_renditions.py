@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("avatars", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="avatar",
+            name="renditions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -38,6 +38,7 @@ class Avatar(models.Model):
     # 3D model data
     model_file_url = models.URLField(max_length=500, blank=True)
     thumbnail_url = models.URLField(max_length=500, blank=True)
+    renditions = models.JSONField(default=dict, blank=True)  # Responsive sizes (core.renditions)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
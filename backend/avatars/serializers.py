@@ -1,15 +1,20 @@
 from rest_framework import serializers
 from .models import Avatar, AvatarGenerationLog
 from django.conf import settings
+from core.renditions import RenditionField
+from core.uploads import validate_upload_key
 
 
 class AvatarSerializer(serializers.ModelSerializer):
     """Serializer for avatar details."""
+    # Smallest adequate rendition for the client (see RenditionField)
+    image = RenditionField()
     
     class Meta:
         model = Avatar
         fields = '__all__'
-        read_only_fields = ('id', 'user', 'created_at', 'updated_at', 'model_file_url', 'thumbnail_url')
+        read_only_fields = ('id', 'user', 'created_at', 'updated_at', 'model_file_url', 'thumbnail_url',
+                            'renditions')
     
     def validate(self, data):
         # Validate that user doesn't exceed max avatars
@@ -66,4 +71,11 @@ class AvatarGenerationLogSerializer(serializers.ModelSerializer):
     class Meta:
         model = AvatarGenerationLog
         fields = '__all__'
-        read_only_fields = '__all__'
\ No newline at end of file
+        read_only_fields = '__all__'
+
+class AvatarPhotoKeySerializer(serializers.Serializer):
+    """Serializer for a photo uploaded with ``photo_upload_url``."""
+    photo_key = serializers.CharField(max_length=255)
+    
+    def validate_photo_key(self, value):
+        return validate_upload_key(self.context['request'].user, 'avatars', value)
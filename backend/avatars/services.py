@@ -1,9 +1,10 @@
 import numpy as np
 from PIL import Image
-import cv2
 # import mediapipe as mp  # Temporarily disabled due to Python 3.13 compatibility
 from typing import Dict, Any
 import logging
+from core import renditions
+from core.images import ImageSource
 
 logger = logging.getLogger('miora.avatars')
 
@@ -11,6 +12,10 @@ logger = logging.getLogger('miora.avatars')
 class AvatarGenerationService:
     """Service for generating 3D avatars from photos."""
     
+    # Bounding box the photo is decoded at for pose and face analysis
+    ANALYSIS_SIZE = (1280, 1280)
+    THUMBNAIL_SIZE = (256, 256)
+    
     def __init__(self):
         # Temporarily stubbed out until mediapipe supports Python 3.13
         # self.mp_pose = mp.solutions.pose
@@ -35,10 +40,10 @@ class AvatarGenerationService:
             # Temporary stub implementation
             logger.info("Avatar generation called - returning mock data")
             
-            # Convert photo data to numpy array for basic processing
-            nparr = np.frombuffer(photo_data, np.uint8)
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            # Decode only at the resolutions analysis and the thumbnail use;
+            # image_rgb is the pose/face input once mediapipe is back
+            source = ImageSource.open(photo_data)
+            image_rgb = np.asarray(source.fit(self.ANALYSIS_SIZE).convert('RGB'))
             
             # Mock measurements
             measurements = {
@@ -50,13 +55,14 @@ class AvatarGenerationService:
                 'torso_length': 60.0,
             }
             
-            # Generate thumbnail
-            thumbnail_data = self._generate_thumbnail(image_rgb)
+            # Generate thumbnail and responsive renditions
+            thumbnail_data = self._generate_thumbnail(source)
             
             return {
                 'success': True,
                 'model_data': b'MOCK_3D_MODEL_DATA',
                 'thumbnail_data': thumbnail_data,
+                'renditions': renditions.render(source),
                 'measurements': measurements,
                 'metadata': {
                     'pose_confidence': 0.8,
@@ -83,14 +89,12 @@ class AvatarGenerationService:
         # This would use something like SMPL-X or similar
         return b'GLB_MODEL_DATA_PLACEHOLDER'
     
-    def _generate_thumbnail(self, image: np.ndarray) -> bytes:
+    def _generate_thumbnail(self, source: ImageSource) -> bytes:
         """Generate thumbnail from image."""
-        # Resize image
-        thumbnail = Image.fromarray(image)
-        thumbnail.thumbnail((256, 256), Image.Resampling.LANCZOS)
+        thumbnail = source.fit(self.THUMBNAIL_SIZE)
         
         # Convert to bytes
         import io
         buffer = io.BytesIO()
         thumbnail.save(buffer, format='PNG')
-        return buffer.getvalue()
\ No newline at end of file
+        return buffer.getvalue()
@@ -1,17 +1,17 @@
 from celery import shared_task
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 import time
 import logging
 from .models import Avatar, AvatarGenerationLog
 from .services import AvatarGenerationService
+from core import renditions
+from core.utils import S3Storage
 
 logger = logging.getLogger('miora.avatars')
 
 
 @shared_task(bind=True, max_retries=3)
-def generate_avatar_from_photo(self, avatar_id, photo_data):
-    """Generate 3D avatar from uploaded photo."""
+def generate_avatar_from_photo(self, avatar_id, photo_key):
+    """Generate 3D avatar from a photo uploaded to storage."""
     try:
         avatar = Avatar.objects.get(id=avatar_id)
         log = AvatarGenerationLog.objects.filter(
@@ -29,18 +29,19 @@ def generate_avatar_from_photo(self, avatar_id, photo_data):
         service = AvatarGenerationService()
         
         # Process photo and generate 3D model
-        result = service.generate_from_photo(photo_data)
+        with S3Storage.open_file(photo_key) as photo_file:
+            result = service.generate_from_photo(photo_file.read())
         
         if result['success']:
-            # Save 3D model file
-            model_path = f'avatars/{avatar.user.id}/{avatar.id}/model.glb'
-            model_file = ContentFile(result['model_data'])
-            avatar.model_file_url = default_storage.save(model_path, model_file)
-            
-            # Save thumbnail
-            thumbnail_path = f'avatars/{avatar.user.id}/{avatar.id}/thumbnail.png'
-            thumbnail_file = ContentFile(result['thumbnail_data'])
-            avatar.thumbnail_url = default_storage.save(thumbnail_path, thumbnail_file)
+            # Save 3D model file and thumbnail, uploaded in parallel
+            base_path = f'avatars/{avatar.user.id}/{avatar.id}'
+            image_renditions = result.get('renditions', [])
+            urls = S3Storage.upload_files([
+                (result['model_data'], f'{base_path}/model.glb', 'model/gltf-binary'),
+                (result['thumbnail_data'], f'{base_path}/thumbnail.png', 'image/png'),
+            ] + renditions.upload_items(image_renditions, base_path))
+            avatar.model_file_url, avatar.thumbnail_url = urls[:2]
+            avatar.renditions = renditions.build_manifest(image_renditions, urls[2:])
             
             # Update measurements if detected
             if result.get('measurements'):
@@ -3,8 +3,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Q
 from .models import Avatar, AvatarGenerationLog
-from .serializers import AvatarSerializer, AvatarCreateSerializer, AvatarGenerationLogSerializer
+from .serializers import (
+    AvatarSerializer, AvatarCreateSerializer, AvatarGenerationLogSerializer, AvatarPhotoKeySerializer
+)
 from .tasks import generate_avatar_from_photo
+from core.uploads import DirectUploadSerializer, create_upload, upload_prefix
+from core.utils import S3Storage
+import uuid
 
 
 class AvatarViewSet(viewsets.ModelViewSet):
@@ -51,26 +56,57 @@ class AvatarViewSet(viewsets.ModelViewSet):
                 'detail': 'No active avatar found.'
             }, status=status.HTTP_404_NOT_FOUND)
     
+    @action(detail=False, methods=['post'])
+    def photo_upload_url(self, request):
+        """Presign a direct upload of an avatar photo to storage."""
+        serializer = DirectUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        upload = create_upload(request.user, 'avatars', serializer.validated_data['content_type'])
+        return Response(upload, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'])
     def generate_from_photo(self, request, pk=None):
-        """Generate 3D avatar from photo."""
+        """Generate 3D avatar from photo.
+        
+        Takes either a ``photo_key`` from ``photo_upload_url`` or, for older
+        clients, the photo itself as multipart data.
+        """
         avatar = self.get_object()
         photo = request.FILES.get('photo')
+        photo_key = request.data.get('photo_key')
         
-        if not photo:
+        if not photo and not photo_key:
             return Response({
                 'detail': 'Photo is required.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if photo_key:
+            serializer = AvatarPhotoKeySerializer(
+                data={'photo_key': photo_key}, context={'request': request}
+            )
+            if not serializer.is_valid():
+                return Response({
+                    'detail': serializer.errors['photo_key'][0]
+                }, status=status.HTTP_400_BAD_REQUEST)
+            photo_key = serializer.validated_data['photo_key']
+        else:
+            # Store it so only the key goes through the task queue
+            photo_key = S3Storage.upload_file(
+                photo.read(),
+                f'{upload_prefix(request.user, "avatars")}{uuid.uuid4().hex}_{photo.name}',
+                photo.content_type
+            )
+        
         # Create generation log
         log = AvatarGenerationLog.objects.create(
             avatar=avatar,
             generation_method='photo',
-            source_images=[photo.name]
+            source_images=[photo_key]
         )
         
         # Queue async task for avatar generation
-        task = generate_avatar_from_photo.delay(avatar.id, photo)
+        task = generate_avatar_from_photo.delay(avatar.id, photo_key)
         
         return Response({
             'detail': 'Avatar generation started.',
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("community", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="outfitpost",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="community_o_created_7beb74_idx"
+            ),
+        ),
+    ]
@@ -22,6 +22,10 @@ class OutfitPost(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the feed
+            models.Index(fields=['-created_at', '-id']),
+        ]
 
 class StyleChallenge(models.Model):
     title = models.CharField(max_length=200)
@@ -4,6 +4,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from core.pagination import KeysetPagination
 from .models import OutfitPost, StyleChallenge, ChallengeParticipation
 from .serializers import (
     OutfitPostSerializer,
@@ -17,6 +18,7 @@ class OutfitPostListCreateView(generics.ListCreateAPIView):
     queryset = OutfitPost.objects.all()
     serializer_class = OutfitPostSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
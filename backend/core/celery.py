@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import task_prerun, task_postrun
 from django.conf import settings
 
 # Set the default Django settings module for the 'celery' program.
@@ -14,6 +15,19 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+
+@task_prerun.connect
+def detect_task_n_plus_one(task_id=None, task=None, **kwargs):
+    from .n_plus_one import start_task_detection
+    start_task_detection(task_id, task)
+
+
+@task_postrun.connect
+def report_task_n_plus_one(task_id=None, **kwargs):
+    from .n_plus_one import finish_task_detection
+    finish_task_detection(task_id)
+
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
@@ -0,0 +1,150 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+import time
+
+logger = logging.getLogger('miora.api')
+
+
+class StageFailed(Exception):
+    """A stage raised; ``stage`` names it and ``error`` is the original."""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f'Stage {stage} failed: {error}')
+        self.stage = stage
+        self.error = error
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of a DAG.
+
+    ``func(context, inputs)`` gets the outputs of the stages it depends on
+    by name and returns its own output, a JSON-serializable dict so it can
+    be checkpointed.
+    """
+    name: str
+    func: Callable[[Any, Dict[str, Dict[str, Any]]], Dict[str, Any]]
+    depends_on: Tuple[str, ...] = ()
+
+
+class DAG:
+    """Stages and their dependencies, validated and topologically ordered."""
+
+    def __init__(self, stages: Iterable[Stage]):
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f'Duplicate stage {stage.name}')
+            self.stages[stage.name] = stage
+
+        for stage in self.stages.values():
+            unknown = set(stage.depends_on) - set(self.stages)
+            if unknown:
+                raise ValueError(f'Stage {stage.name} depends on unknown stages {sorted(unknown)}')
+
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        order, visiting, visited = [], set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f'Cycle through stage {name}')
+            visiting.add(name)
+            for dependency in self.stages[name].depends_on:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+
+class CheckpointStore:
+    """Where an executor records stage progress; this base keeps nothing.
+
+    ``load`` returns the outputs of stages completed by earlier attempts,
+    which are not run again. The other hooks are always called from the
+    thread running ``execute``, never from stage threads.
+    """
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        return {}
+
+    def started(self, stage: str):
+        pass
+
+    def completed(self, stage: str, output: Dict[str, Any], elapsed_ms: int):
+        pass
+
+    def failed(self, stage: str, error: BaseException, elapsed_ms: int):
+        pass
+
+
+def execute(dag: DAG, context: Any, store: Optional[CheckpointStore] = None,
+            max_workers: int = 4) -> Dict[str, Dict[str, Any]]:
+    """Run the stages of ``dag`` not yet checkpointed in ``store``.
+
+    Each stage starts as soon as all of its dependencies have completed,
+    so independent stages run in parallel threads. Once a stage fails no
+    new ones start, but those already running finish and are checkpointed
+    before ``StageFailed`` is raised, so a retry resumes after them.
+    Returns every stage's output, restored ones included.
+    """
+    store = store or CheckpointStore()
+    outputs = {name: output for name, output in store.load().items() if name in dag.stages}
+    if outputs:
+        logger.debug(f'Resuming after stages {sorted(outputs)}')
+
+    pending = [name for name in dag.order if name not in outputs]
+    running = {}
+    failure = None
+
+    def run(stage: Stage, inputs: Dict[str, Dict[str, Any]]):
+        started = time.perf_counter()
+        try:
+            return stage.func(context, inputs), _elapsed_ms(started), None
+        except Exception as e:
+            return None, _elapsed_ms(started), e
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            if failure is None:
+                for name in [name for name in pending if _ready(dag.stages[name], outputs)]:
+                    stage = dag.stages[name]
+                    pending.remove(name)
+                    store.started(name)
+                    inputs = {dependency: outputs[dependency] for dependency in stage.depends_on}
+                    running[pool.submit(run, stage, inputs)] = name
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                output, elapsed_ms, error = future.result()
+                if error is None:
+                    outputs[name] = output
+                    store.completed(name, output, elapsed_ms)
+                else:
+                    store.failed(name, error, elapsed_ms)
+                    failure = failure or StageFailed(name, error)
+
+    if failure is not None:
+        raise failure
+    return outputs
+
+
+def _ready(stage: Stage, outputs: Dict[str, Any]) -> bool:
+    return all(dependency in outputs for dependency in stage.depends_on)
+
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.perf_counter() - started) * 1000)
@@ -0,0 +1,165 @@
+from typing import Dict, Tuple, Union
+import io
+import math
+import threading
+
+from PIL import Image
+
+# Power-of-two reductions JPEG can decode to directly (DCT scaling)
+SCALES = (1, 2, 4, 8)
+
+# Modes whose pixels Image.reduce and resize can average; palette, bilevel
+# and 16-bit images are converted before scaling
+SCALABLE_MODES = {'L', 'LA', 'I', 'F', 'RGB', 'RGBA', 'RGBX', 'CMYK', 'YCbCr'}
+
+
+class ImageSource:
+    """An encoded image, decoded only at the resolutions callers need.
+
+    Each processing stage asks for the size it works at (``fit`` for a
+    bounding box, ``fit_pixels`` for a pixel budget) instead of decoding
+    the full image and shrinking it. JPEGs are decoded straight to the
+    nearest larger 1/2, 1/4 or 1/8 scale with ``Image.draft``; other
+    formats are decoded once and halved with ``Image.reduce``. Decoded
+    levels and fitted results are cached on the instance, so the stages of
+    one task share them; drop the instance to free them. Stages running in
+    parallel threads may share an instance: each level or fit is computed
+    once, by whichever asks first.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        header = self._open()
+        self.format = header.format
+        self.mode = header.mode
+        self.size: Tuple[int, int] = header.size
+        self._levels: Dict[int, Image.Image] = {}
+        self._fitted: Dict[Tuple, Image.Image] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def open(cls, source: Union[bytes, str, io.IOBase]) -> 'ImageSource':
+        """Wrap bytes, a path or a readable file."""
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return cls(bytes(source))
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                return cls(f.read())
+        return cls(source.read())
+
+    @classmethod
+    def from_image(cls, image: Image.Image) -> 'ImageSource':
+        """Wrap an already decoded image (e.g. the output of a stage)."""
+        source = cls.__new__(cls)
+        source.data = None
+        source.format = image.format
+        source.mode = image.mode
+        source.size = image.size
+        source._levels = {1: image}
+        source._fitted = {}
+        source._lock = threading.RLock()
+        return source
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def decoded_scales(self) -> Tuple[int, ...]:
+        """Scales decoded so far, for tests and instrumentation."""
+        return tuple(sorted(self._levels))
+
+    def full(self) -> Image.Image:
+        """The image at its original resolution."""
+        return self.level(1)
+
+    def level(self, scale: int) -> Image.Image:
+        """The image reduced by ``scale`` (one of ``SCALES``)."""
+        image = self._levels.get(scale)
+        if image is not None:
+            return image
+
+        with self._lock:
+            image = self._levels.get(scale)
+            if image is not None:
+                return image
+
+            if self.data is not None and self.format == 'JPEG':
+                image = self._open()
+                requested = (max(1, self.width // scale), max(1, self.height // scale))
+                image.draft(None, requested)
+                image.load()
+            else:
+                # Halve the closest larger level that is already decoded
+                larger = [cached for cached in self._levels if cached < scale]
+                base = max(larger) if larger else 1
+                image = self._levels.get(base)
+                if image is None:
+                    image = self._open()
+                    image.load()
+                    self._levels[1] = image
+                if base != scale:
+                    image = _scalable(image).reduce(scale // base)
+
+            self._levels[scale] = image
+            return image
+
+    def fit(self, max_size: Tuple[int, int],
+            resample: Image.Resampling = Image.Resampling.LANCZOS) -> Image.Image:
+        """The image scaled down to fit ``max_size``; never upscaled.
+
+        Decodes the smallest level still at least as large as the result,
+        then resamples that. The returned image is shared; copy it before
+        modifying it in place.
+        """
+        key = ('fit', tuple(max_size), resample)
+        image = self._fitted.get(key)
+        if image is not None:
+            return image
+
+        with self._lock:
+            image = self._fitted.get(key)
+            if image is not None:
+                return image
+
+            ratio = min(max_size[0] / self.width, max_size[1] / self.height, 1.0)
+            target = (max(1, round(self.width * ratio)), max(1, round(self.height * ratio)))
+            image = self._level_for(target)
+            if image.size != target:
+                image = _scalable(image).resize(target, resample)
+
+            self._fitted[key] = image
+            return image
+
+    def fit_pixels(self, max_pixels: int,
+                   resample: Image.Resampling = Image.Resampling.LANCZOS) -> Image.Image:
+        """The image scaled down to at most ``max_pixels`` pixels."""
+        ratio = min(1.0, math.sqrt(max_pixels / float(self.width * self.height)))
+        return self.fit(
+            (max(1, int(self.width * ratio)), max(1, int(self.height * ratio))), resample
+        )
+
+    def _level_for(self, target: Tuple[int, int]) -> Image.Image:
+        for scale in reversed(SCALES):
+            if self.width // scale >= target[0] and self.height // scale >= target[1]:
+                return self.level(scale)
+        return self.level(1)
+
+    def _open(self) -> Image.Image:
+        return Image.open(io.BytesIO(self.data))
+
+
+def _scalable(image: Image.Image) -> Image.Image:
+    if image.mode in SCALABLE_MODES:
+        return image
+    if image.mode.startswith('I;16'):
+        # 16-bit grayscale, scaled down to 8 bits
+        return image.convert('I').point(lambda value: value / 256).convert('L')
+    if image.mode == '1':
+        return image.convert('L')
+    has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
@@ -1,8 +1,14 @@
 import time
+import random
 import logging
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
-from analytics.models import APIRequestLog
+from django.utils import timezone
+from analytics.buffer import get_request_log_buffer
+from .rate_limit import rate_limiter, get_rules
+from . import profiling
+from .n_plus_one import detect_n_plus_one, get_settings as n_plus_one_settings
 
 logger = logging.getLogger('miora.api')
 
@@ -23,58 +29,175 @@ class APILoggingMiddleware(MiddlewareMixin):
                 if hasattr(request, '_start_time'):
                     response_time = int((time.time() - request._start_time) * 1000)
                 
-                # Create log entry
-                APIRequestLog.objects.create(
-                    user=request.user if request.user.is_authenticated else None,
-                    endpoint=request.path,
-                    method=request.method,
-                    status_code=response.status_code,
-                    response_time_ms=response_time,
-                    ip_address=self.get_client_ip(request),
-                    user_agent=request.META.get('HTTP_USER_AGENT', '')[:255]
-                )
+                # Buffer the entry; it is written in a batch off the request path
+                user = getattr(request, 'user', None)
+                get_request_log_buffer().append({
+                    'user_id': user.pk if user is not None and user.is_authenticated else None,
+                    'endpoint': request.path[:255],
+                    'method': request.method,
+                    'status_code': response.status_code,
+                    'response_time_ms': response_time,
+                    'ip_address': self.get_client_ip(request),
+                    'user_agent': request.META.get('HTTP_USER_AGENT', '')[:255],
+                    'created_at': timezone.now(),
+                })
             except Exception as e:
                 logger.error(f'Failed to log API request: {str(e)}')
         
         return response
     
-    def get_client_ip(self, request):
-        """Get client IP address."""
+    @staticmethod
+    def get_client_ip(request):
+        """Get client IP address.
+        
+        Only the ``TRUSTED_PROXY_COUNT`` rightmost ``X-Forwarded-For``
+        entries were added by our proxies; anything left of them is sent
+        by the client and could be forged, so it is never used.
+        """
+        proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        if proxies and x_forwarded_for:
+            hops = [hop.strip() for hop in x_forwarded_for.split(',') if hop.strip()]
+            if len(hops) >= proxies:
+                return hops[-proxies]
+        return request.META.get('REMOTE_ADDR')
 
 
 class RateLimitMiddleware(MiddlewareMixin):
-    """Simple rate limiting middleware."""
+    """Sliding-window rate limiting backed by Redis.
+    
+    Clients are limited per tier (anonymous by IP, signed-in users by id,
+    staff exempt by default) plus any per-route limits; see
+    ``RATE_LIMIT_TIERS`` and ``RATE_LIMIT_ROUTES``.
+    """
     
     def process_request(self, request):
         """Check rate limits."""
-        if request.path.startswith('/api/'):
-            # Skip rate limiting for authenticated users with higher limits
-            if request.user.is_authenticated:
-                return None
-            
-            # Simple IP-based rate limiting for anonymous users
-            ip = APILoggingMiddleware().get_client_ip(request)
-            
-            # Count requests in last hour
-            from django.utils import timezone
-            from datetime import timedelta
-            
-            hour_ago = timezone.now() - timedelta(hours=1)
-            request_count = APIRequestLog.objects.filter(
-                ip_address=ip,
-                created_at__gte=hour_ago
-            ).count()
-            
-            # Check limit (100 requests per hour for anonymous)
-            if request_count > 100:
-                return JsonResponse({
-                    'error': 'Rate limit exceeded. Please try again later.'
-                }, status=429)
-        
-        return None
\ No newline at end of file
+        if not request.path.startswith('/api/'):
+            return None
+        
+        tier, identity = self.get_client(request)
+        
+        results = [
+            rate_limiter.hit(rule, identity)
+            for rule in get_rules(request.path, tier)
+        ]
+        if not results:
+            return None
+        
+        # Report the tightest limit
+        request._rate_limit = min(results, key=lambda result: result.remaining)
+        
+        blocked = [result for result in results if not result.allowed]
+        if blocked:
+            retry_after = max(result.retry_after for result in blocked)
+            response = JsonResponse({
+                'error': 'Rate limit exceeded. Please try again later.'
+            }, status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+        
+        return None
+    
+    def process_response(self, request, response):
+        """Expose the remaining allowance."""
+        result = getattr(request, '_rate_limit', None)
+        if result is not None:
+            response['X-RateLimit-Limit'] = str(result.limit)
+            response['X-RateLimit-Remaining'] = str(result.remaining)
+        return response
+    
+    def get_client(self, request):
+        """Return the ``(tier, identity)`` the request is counted against."""
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return ('staff' if user.is_staff else 'user'), f'user:{user.pk}'
+        
+        # API clients authenticate per view with JWT; read the user id from
+        # the token here without a database lookup.
+        user_id = self.get_token_user_id(request)
+        if user_id is not None:
+            return 'user', f'user:{user_id}'
+        
+        return 'anonymous', f'ip:{APILoggingMiddleware.get_client_ip(request)}'
+    
+    def get_token_user_id(self, request):
+        from rest_framework_simplejwt.authentication import JWTAuthentication
+        from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+        from rest_framework_simplejwt.settings import api_settings
+        
+        authentication = JWTAuthentication()
+        header = authentication.get_header(request)
+        raw_token = authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return None
+        
+        try:
+            token = authentication.get_validated_token(raw_token)
+        except (InvalidToken, TokenError):
+            return None
+        return token.get(api_settings.USER_ID_CLAIM)
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """Profile a sample of requests.
+    
+    ``PROFILING['SAMPLE_RATE']`` of requests record DB queries, cache hits
+    and misses, external HTTP calls and serializer time. Sampled responses
+    carry a ``Server-Timing`` header and feed the per-route histograms
+    served to admins by the analytics performance endpoint.
+    """
+    
+    def process_request(self, request):
+        """Decide whether to sample the request."""
+        sample_rate = profiling.get_settings()['SAMPLE_RATE']
+        if sample_rate <= 0 or random.random() >= sample_rate:
+            return None
+        
+        request._profile_token = profiling.start_profile()
+        return None
+    
+    def process_response(self, request, response):
+        """Report and record the request's profile."""
+        token = getattr(request, '_profile_token', None)
+        if token is None:
+            return response
+        
+        del request._profile_token
+        profile = profiling.end_profile(token)
+        total_ms = profile.total_ms
+        
+        try:
+            if profiling.get_settings()['SERVER_TIMING']:
+                response['Server-Timing'] = profile.server_timing(total_ms)
+            profiling.route_metrics.record(self.get_route(request), profile, total_ms)
+        except Exception as e:
+            logger.error(f'Failed to record request profile: {str(e)}')
+        
+        return response
+    
+    @staticmethod
+    def get_route(request):
+        """URL pattern the request resolved to, so IDs don't split routes."""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return f'{request.method} <unmatched>'
+        return f'{request.method} /{match.route}'
+
+
+class NPlusOneMiddleware:
+    """Report query shapes repeated within one request.
+    
+    Off unless ``N_PLUS_ONE_DETECTION['MODE']`` is ``log`` (staging) or
+    ``raise``; tests get the same check from ``AuthenticatedAPITestCase``.
+    """
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+    
+    def __call__(self, request):
+        if n_plus_one_settings()['MODE'] == 'off':
+            return self.get_response(request)
+        
+        with detect_n_plus_one(f'{request.method} {request.path}'):
+            return self.get_response(request)
@@ -0,0 +1,179 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+import re
+import traceback
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('miora.api')
+
+DEFAULT_IGNORE = (
+    r'^(SAVEPOINT|RELEASE SAVEPOINT|ROLLBACK TO SAVEPOINT)\b',
+)
+
+_WHITESPACE = re.compile(r'\s+')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+
+
+class NPlusOneError(AssertionError):
+    """The same query shape ran too often inside one request or task."""
+
+
+def get_settings() -> Dict:
+    options = getattr(settings, 'N_PLUS_ONE_DETECTION', {})
+    return {
+        'MODE': options.get('MODE', 'off'),
+        'THRESHOLD': options.get('THRESHOLD', 5),
+        'IGNORE': tuple(options.get('IGNORE', ())) + DEFAULT_IGNORE,
+    }
+
+
+def fingerprint(sql: str) -> str:
+    """Shape of a query: literals and ``IN`` lists collapsed."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def call_site() -> Optional[str]:
+    """Innermost project frame that is not part of the detector.
+
+    When the query comes from library code such as a nested DRF serializer,
+    the innermost library frame above Django's ORM is added as ``via``.
+    """
+    root = str(Path(settings.BASE_DIR).resolve())
+    skip = (__file__, str(Path(root) / 'core' / 'middleware.py'), str(Path(root) / 'core' / 'test_base.py'))
+    via = None
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        filename = frame.filename
+        if filename in skip:
+            continue
+        if not filename.startswith(root) or 'site-packages' in filename:
+            if via is None and '/django/' not in filename and 'site-packages' in filename:
+                via = f'{filename.split("site-packages/")[-1]}:{frame.lineno} in {frame.name}'
+            continue
+        site = f'{Path(filename).relative_to(root)}:{frame.lineno} in {frame.name}'
+        return f'{site} (via {via})' if via else site
+    return via
+
+
+@dataclass
+class RepeatedQuery:
+    fingerprint: str
+    count: int = 0
+    call_site: Optional[str] = None
+
+
+@dataclass
+class NPlusOneDetector:
+    """Count query shapes run inside one scope and flag the repeated ones.
+
+    ``label`` names the scope (a request path or task) in reports. A shape
+    run ``threshold`` times or more is reported together with the call site
+    where it first reached the threshold.
+    """
+    label: str
+    threshold: int = 5
+    ignore: tuple = DEFAULT_IGNORE
+    queries: Dict[str, RepeatedQuery] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._ignore = [re.compile(pattern, re.IGNORECASE) for pattern in self.ignore]
+
+    def __call__(self, execute, sql, params, many, context):
+        self.record(sql)
+        return execute(sql, params, many, context)
+
+    def record(self, sql: str):
+        if any(pattern.search(sql) for pattern in self._ignore):
+            return
+        shape = fingerprint(sql)
+        query = self.queries.get(shape)
+        if query is None:
+            query = self.queries[shape] = RepeatedQuery(shape)
+        query.count += 1
+        if query.count == self.threshold:
+            query.call_site = call_site()
+
+    @property
+    def repeated(self) -> List[RepeatedQuery]:
+        return sorted(
+            (query for query in self.queries.values() if query.count >= self.threshold),
+            key=lambda query: -query.count
+        )
+
+    def report(self) -> str:
+        lines = [f'Repeated queries in {self.label}:']
+        for query in self.repeated:
+            lines.append(f'  {query.count}x at {query.call_site or "<unknown>"}: {query.fingerprint[:300]}')
+        return '\n'.join(lines)
+
+    def check(self, mode: str):
+        """Raise or log the repeated queries, depending on ``mode``."""
+        if not self.repeated:
+            return
+        if mode == 'raise':
+            raise NPlusOneError(self.report())
+        if mode == 'log':
+            logger.warning(self.report())
+
+
+@contextmanager
+def detect_n_plus_one(label: str, mode: Optional[str] = None, threshold: Optional[int] = None):
+    """Watch every database connection for repeated query shapes.
+
+    ``mode`` and ``threshold`` default to ``N_PLUS_ONE_DETECTION``. In
+    ``raise`` mode an ``NPlusOneError`` is raised when the block exits
+    normally; ``log`` only logs a warning, ``off`` does nothing.
+    """
+    options = get_settings()
+    mode = mode or options['MODE']
+    if mode == 'off':
+        yield None
+        return
+
+    detector = NPlusOneDetector(
+        label, threshold=threshold or options['THRESHOLD'], ignore=options['IGNORE']
+    )
+    wrapped = []
+    for connection in connections.all():
+        connection.execute_wrappers.append(detector)
+        wrapped.append(connection)
+    try:
+        yield detector
+    finally:
+        for connection in wrapped:
+            connection.execute_wrappers.remove(detector)
+
+    detector.check(mode)
+
+
+_task_detectors = {}
+
+
+def start_task_detection(task_id, task, **kwargs):
+    """``task_prerun`` handler: watch the task's queries."""
+    if get_settings()['MODE'] == 'off':
+        return
+    scope = detect_n_plus_one(f'task {task.name}')
+    scope.__enter__()
+    _task_detectors[task_id] = scope
+
+
+def finish_task_detection(task_id, **kwargs):
+    """``task_postrun`` handler: report what the task repeated."""
+    scope = _task_detectors.pop(task_id, None)
+    if scope is None:
+        return
+    try:
+        scope.__exit__(None, None, None)
+    except NPlusOneError as e:
+        # The task has already finished; raising here would only hide it
+        logger.error(str(e))
@@ -1,5 +1,10 @@
-from rest_framework.pagination import PageNumberPagination
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+import base64
+import json
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -24,4 +29,164 @@ class LargeResultsSetPagination(PageNumberPagination):
     """Pagination for large result sets."""
     page_size = 50
     page_size_query_param = 'page_size'
-    max_page_size = 200
\ No newline at end of file
+    max_page_size = 200
+
+class KeysetPagination(BasePagination):
+    """Keyset ("seek") pagination for large, append-mostly lists.
+    
+    Pages are ordered by ``(created_at, id)``, newest first, and the cursor
+    is the position of the last row seen. Each page is a ``WHERE
+    (created_at, id) < cursor ... LIMIT n`` that a matching composite index
+    answers directly, so deep pages cost the same as the first and no
+    ``COUNT(*)`` is run unless the client asks for one with
+    ``?include_count=true``. Views can page on another column pair by
+    setting ``keyset_ordering``.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'include_count'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-'))
+            for name in getattr(view, 'keyset_ordering', self.ordering)
+        ]
+        self.next_position = self.previous_position = None
+        
+        # Opt-in total for views that display it; the only non-seek query
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.count = queryset.count()
+        
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor['reverse'])
+        
+        if cursor:
+            queryset = queryset.filter(self._seek(cursor['position'], reverse))
+        queryset = queryset.order_by(*[
+            f'-{name}' if descending != reverse else name
+            for name, descending in self.fields
+        ])
+        
+        # One extra row tells whether there is anything beyond this page
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+        
+        if results:
+            if has_more or reverse:
+                self.next_position = self._position(results[-1])
+            if cursor and (has_more or not reverse):
+                self.previous_position = self._position(results[0])
+        
+        return results
+    
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+    
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'page_size': self.page_size,
+            'results': data
+        }
+        if self.count is not None:
+            response['count'] = self.count
+        return Response(response)
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'page_size': {'type': 'integer'},
+                'count': {'type': 'integer', 'description': 'Only with include_count=true'},
+                'results': schema,
+            },
+        }
+    
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self._link(self.next_position, reverse=False)
+    
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self._link(self.previous_position, reverse=True)
+    
+    def decode_cursor(self, request, model):
+        """``{'position': [...], 'reverse': bool}`` from the query string, or None."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values, reverse = cursor['p'], bool(cursor.get('r'))
+            if len(values) != len(self.fields):
+                raise ValueError('cursor does not match ordering')
+            position = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        
+        return {'position': position, 'reverse': reverse}
+    
+    def encode_cursor(self, position, reverse):
+        data = {'p': position}
+        if reverse:
+            data['r'] = 1
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode('ascii')
+    
+    def _link(self, position, reverse):
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position, reverse))
+    
+    def _position(self, instance):
+        # isoformat for dates/datetimes, str for UUIDs; ints stay ints
+        values = []
+        for name, _ in self.fields:
+            value = getattr(instance, name)
+            if hasattr(value, 'isoformat'):
+                value = value.isoformat()
+            elif not isinstance(value, (int, float)):
+                value = str(value)
+            values.append(value)
+        return values
+    
+    def _seek(self, position, reverse):
+        """Rows strictly after ``position`` (before it when ``reverse``).
+        
+        Expands the row comparison ``(a, b) < (x, y)`` into
+        ``a <= x AND (a < x OR (a = x AND b < y))``. The OR alone is only
+        applied as a filter; the redundant bound on the leading column is
+        what lets the planner start an index range scan at the cursor.
+        """
+        name, descending = self.fields[0]
+        bound = Q(**{f'{name}__{"lte" if descending != reverse else "gte"}': position[0]})
+        
+        condition = Q()
+        for index, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != reverse else 'gt'
+            term = Q(**{f'{name}__{lookup}': position[index]})
+            for earlier, (earlier_name, _) in enumerate(self.fields[:index]):
+                term &= Q(**{earlier_name: position[earlier]})
+            condition |= term
+        return bound & condition
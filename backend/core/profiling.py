@@ -0,0 +1,463 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger('miora.api')
+
+# Upper bounds (ms) of the histogram buckets; the last one is open-ended
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float('inf'))
+
+DEFAULT_EXTERNAL_SERVICES = {
+    'api.flora-fauna.ai': 'florafauna',
+    'api.revery.ai': 'revery',
+    'api.remove.bg': 'removebg',
+    'api.cloudinary.com': 'cloudinary',
+    'api.avaturn.me': 'avaturn',
+    'amazonaws.com': 's3',
+}
+
+_current: ContextVar[Optional['RequestProfile']] = ContextVar('miora_request_profile', default=None)
+
+
+def get_settings() -> Dict[str, Any]:
+    options = getattr(settings, 'PROFILING', {})
+    return {
+        'SAMPLE_RATE': options.get('SAMPLE_RATE', 0.0),
+        'SERVER_TIMING': options.get('SERVER_TIMING', True),
+        'PUBLISH_INTERVAL': options.get('PUBLISH_INTERVAL', 10),
+        'EXTERNAL_SERVICES': options.get('EXTERNAL_SERVICES', DEFAULT_EXTERNAL_SERVICES),
+    }
+
+
+class RequestProfile:
+    """Where one request spent its time.
+
+    Durations are in milliseconds. Timers of the same kind do not nest:
+    a serializer that renders another serializer is counted once. DB and
+    external calls made while serializing count towards both.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_ms = 0.0
+        self.serializer_ms = 0.0
+        self.external: Dict[str, Dict[str, float]] = {}
+        self._active = set()
+
+    @contextmanager
+    def timing(self, kind: str):
+        if kind in self._active:
+            yield
+            return
+
+        self._active.add(kind)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active.discard(kind)
+            elapsed = (time.perf_counter() - start) * 1000
+            if kind == 'db':
+                self.db_queries += 1
+                self.db_ms += elapsed
+            elif kind == 'cache':
+                self.cache_ms += elapsed
+            elif kind == 'serializer':
+                self.serializer_ms += elapsed
+
+    @contextmanager
+    def external_call(self, service: str):
+        # urllib3 re-enters urlopen for retries and redirects; only the
+        # outermost call is one request
+        if 'http' in self._active:
+            yield
+            return
+
+        self._active.add('http')
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active.discard('http')
+            self.add_external(service, (time.perf_counter() - start) * 1000)
+
+    def add_external(self, service: str, elapsed_ms: float):
+        entry = self.external.setdefault(service, {'calls': 0, 'ms': 0.0})
+        entry['calls'] += 1
+        entry['ms'] += elapsed_ms
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def durations(self, total_ms: float) -> Dict[str, float]:
+        """Per-component durations, as recorded in the route histograms."""
+        durations = {
+            'total': total_ms,
+            'db': self.db_ms,
+            'cache': self.cache_ms,
+            'serializer': self.serializer_ms,
+        }
+        for service, entry in self.external.items():
+            durations[f'ext.{service}'] = entry['ms']
+        return durations
+
+    def server_timing(self, total_ms: float) -> str:
+        """``Server-Timing`` header value."""
+        metrics = [
+            f'db;dur={self.db_ms:.1f};desc="{self.db_queries} queries"',
+            f'cache;dur={self.cache_ms:.1f};desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'serializer;dur={self.serializer_ms:.1f}',
+        ]
+        for service, entry in sorted(self.external.items()):
+            metrics.append(f'ext-{service};dur={entry["ms"]:.1f};desc="{entry["calls"]} calls"')
+        metrics.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(metrics)
+
+
+def current_profile() -> Optional[RequestProfile]:
+    return _current.get()
+
+
+def start_profile() -> Any:
+    """Profile the current request; returns a token for ``end_profile``."""
+    install()
+    return _current.set(RequestProfile())
+
+
+def end_profile(token) -> Optional[RequestProfile]:
+    profile = _current.get()
+    _current.reset(token)
+    return profile
+
+
+# -- Instrumentation -------------------------------------------------------
+#
+# Hooks are installed once per process and cost a ContextVar lookup when the
+# request is not sampled.
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+
+    with _install_lock:
+        if _installed:
+            return
+        _install_db()
+        _install_cache()
+        _install_http()
+        _install_serializers()
+        _installed = True
+
+
+def _db_wrapper(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    with profile.timing('db'):
+        return execute(sql, params, many, context)
+
+
+def _add_db_wrapper(connection, **kwargs):
+    if _db_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_db_wrapper)
+
+
+def _install_db():
+    connection_created.connect(_add_db_wrapper, dispatch_uid='miora.profiling.db')
+    for connection in connections.all(initialized_only=True):
+        _add_db_wrapper(connection)
+
+
+def _wrap_cache_lookup(method):
+    def lookup(self, key, default=None, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return method(self, key, default, *args, **kwargs)
+        with profile.timing('cache'):
+            value = method(self, key, default, *args, **kwargs)
+        if value is default:
+            profile.cache_misses += 1
+        else:
+            profile.cache_hits += 1
+        return value
+    return lookup
+
+
+def _wrap_cache_many(method):
+    def get_many(self, keys, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return method(self, keys, *args, **kwargs)
+        keys = list(keys)
+        with profile.timing('cache'):
+            values = method(self, keys, *args, **kwargs)
+        profile.cache_hits += len(values)
+        profile.cache_misses += len(keys) - len(values)
+        return values
+    return get_many
+
+
+def _wrap_cache_write(method):
+    def write(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return method(self, *args, **kwargs)
+        with profile.timing('cache'):
+            return method(self, *args, **kwargs)
+    return write
+
+
+def _install_cache():
+    for alias in settings.CACHES:
+        cls = type(caches[alias])
+        if getattr(cls, '_miora_profiled', False):
+            continue
+        cls.get = _wrap_cache_lookup(cls.get)
+        cls.get_many = _wrap_cache_many(cls.get_many)
+        for name in ('set', 'add', 'delete', 'set_many', 'delete_many', 'incr', 'touch'):
+            setattr(cls, name, _wrap_cache_write(getattr(cls, name)))
+        cls._miora_profiled = True
+
+
+def external_service(host: str) -> str:
+    """Name an outgoing request's host is reported under."""
+    for suffix, service in get_settings()['EXTERNAL_SERVICES'].items():
+        if host == suffix or host.endswith(f'.{suffix}'):
+            return service
+    return 'other'
+
+
+def _install_http():
+    # requests, cloudinary and botocore all send through urllib3 pools
+    try:
+        from urllib3.connectionpool import HTTPConnectionPool
+    except ImportError:  # pragma: no cover - urllib3 ships with requests
+        return
+
+    original = HTTPConnectionPool.urlopen
+    if getattr(original, '_miora_profiled', False):
+        return
+
+    def urlopen(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return original(self, *args, **kwargs)
+        with profile.external_call(external_service(self.host or '')):
+            return original(self, *args, **kwargs)
+
+    urlopen._miora_profiled = True
+    HTTPConnectionPool.urlopen = urlopen
+
+
+def _install_serializers():
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer, '_miora_profiled', False):
+        return
+
+    data = BaseSerializer.data.fget
+    is_valid = BaseSerializer.is_valid
+
+    def profiled_data(self):
+        profile = _current.get()
+        if profile is None:
+            return data(self)
+        with profile.timing('serializer'):
+            return data(self)
+
+    def profiled_is_valid(self, *args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return is_valid(self, *args, **kwargs)
+        with profile.timing('serializer'):
+            return is_valid(self, *args, **kwargs)
+
+    BaseSerializer.data = property(profiled_data)
+    BaseSerializer.is_valid = profiled_is_valid
+    BaseSerializer._miora_profiled = True
+
+
+# -- Aggregation -----------------------------------------------------------
+
+def _empty_histogram() -> Dict[str, Any]:
+    return {'count': 0, 'sum_ms': 0.0, 'buckets': [0] * len(BUCKETS_MS)}
+
+
+def _bucket(value_ms: float) -> int:
+    for index, bound in enumerate(BUCKETS_MS):
+        if value_ms <= bound:
+            return index
+    return len(BUCKETS_MS) - 1
+
+
+def percentile(histogram: Dict[str, Any], fraction: float) -> Optional[float]:
+    """Upper bound of the bucket holding the ``fraction`` quantile."""
+    if not histogram['count']:
+        return None
+    target = histogram['count'] * fraction
+    seen = 0
+    for bound, count in zip(BUCKETS_MS, histogram['buckets']):
+        seen += count
+        if seen >= target:
+            return None if bound == float('inf') else bound
+    return None
+
+
+class RouteMetrics:
+    """Per-route histograms of sampled request profiles.
+
+    Each worker aggregates in memory and every ``PUBLISH_INTERVAL`` seconds
+    writes its totals to the cache under its own key, so the metrics view
+    can merge all workers without any per-request cache traffic.
+    """
+
+    KEY_PREFIX = 'profiling:routes'
+    WORKERS_KEY = 'profiling:routes:workers'
+    TIMEOUT = 3600
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._published = 0.0
+
+    @property
+    def worker_key(self) -> str:
+        return f'{self.KEY_PREFIX}:{socket.gethostname()}:{os.getpid()}'
+
+    def record(self, route: str, profile: RequestProfile, total_ms: float):
+        with self._lock:
+            entry = self._routes.setdefault(route, {
+                'requests': 0, 'db_queries': 0, 'cache_hits': 0, 'cache_misses': 0, 'timings': {},
+            })
+            entry['requests'] += 1
+            entry['db_queries'] += profile.db_queries
+            entry['cache_hits'] += profile.cache_hits
+            entry['cache_misses'] += profile.cache_misses
+            for name, value in profile.durations(total_ms).items():
+                histogram = entry['timings'].setdefault(name, _empty_histogram())
+                histogram['count'] += 1
+                histogram['sum_ms'] += value
+                histogram['buckets'][_bucket(value)] += 1
+
+        if time.monotonic() - self._published >= get_settings()['PUBLISH_INTERVAL']:
+            self.publish()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                route: {
+                    **entry,
+                    'timings': {
+                        name: {**histogram, 'buckets': list(histogram['buckets'])}
+                        for name, histogram in entry['timings'].items()
+                    },
+                }
+                for route, entry in self._routes.items()
+            }
+
+    def publish(self):
+        """Write this worker's totals to the shared cache."""
+        self._published = time.monotonic()
+        try:
+            cache = caches[self.alias]
+            cache.set(self.worker_key, self.snapshot(), timeout=self.TIMEOUT)
+            workers = cache.get(self.WORKERS_KEY) or []
+            if self.worker_key not in workers:
+                cache.set(self.WORKERS_KEY, workers + [self.worker_key], timeout=None)
+        except Exception as e:
+            logger.warning(f'Could not publish route metrics: {str(e)}')
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """Totals of every worker that published recently, this one included."""
+        self.publish()
+        cache = caches[self.alias]
+        try:
+            workers = cache.get(self.WORKERS_KEY) or []
+            snapshots = cache.get_many(workers)
+            live = [key for key in workers if key in snapshots]
+            if live != workers:
+                cache.set(self.WORKERS_KEY, live, timeout=None)
+            snapshots = list(snapshots.values())
+        except Exception as e:
+            logger.warning(f'Could not read route metrics: {str(e)}')
+            snapshots = []
+
+        if not snapshots:
+            snapshots = [self.snapshot()]
+        return merge(snapshots)
+
+    def clear(self):
+        with self._lock:
+            self._routes = {}
+
+
+def merge(snapshots: Iterable[Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        for route, entry in snapshot.items():
+            target = merged.setdefault(route, {
+                'requests': 0, 'db_queries': 0, 'cache_hits': 0, 'cache_misses': 0, 'timings': {},
+            })
+            for field in ('requests', 'db_queries', 'cache_hits', 'cache_misses'):
+                target[field] += entry[field]
+            for name, histogram in entry['timings'].items():
+                total = target['timings'].setdefault(name, _empty_histogram())
+                total['count'] += histogram['count']
+                total['sum_ms'] += histogram['sum_ms']
+                total['buckets'] = [a + b for a, b in zip(total['buckets'], histogram['buckets'])]
+    return merged
+
+
+def summarize(routes: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Metrics endpoint rows, slowest total p95 first."""
+    rows = []
+    for route, entry in routes.items():
+        timings = {}
+        for name, histogram in sorted(entry['timings'].items()):
+            timings[name] = {
+                'count': histogram['count'],
+                'avg_ms': round(histogram['sum_ms'] / histogram['count'], 2) if histogram['count'] else None,
+                'p50_ms': percentile(histogram, 0.5),
+                'p95_ms': percentile(histogram, 0.95),
+                'p99_ms': percentile(histogram, 0.99),
+                'buckets': histogram['buckets'],
+            }
+        requests = entry['requests'] or 1
+        rows.append({
+            'route': route,
+            'sampled_requests': entry['requests'],
+            'avg_db_queries': round(entry['db_queries'] / requests, 2),
+            'cache_hits': entry['cache_hits'],
+            'cache_misses': entry['cache_misses'],
+            'timings': timings,
+        })
+
+    def sort_key(row):
+        total = row['timings'].get('total', {})
+        return -(total.get('p95_ms') or float('inf')), -(total.get('avg_ms') or 0)
+
+    return sorted(rows, key=sort_key)
+
+
+route_metrics = RouteMetrics()
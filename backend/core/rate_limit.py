@@ -0,0 +1,146 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import logging
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger('miora.api')
+
+# Atomically count a request in the current window and read the previous
+# window's total: one round trip, O(1) regardless of traffic history.
+SLIDING_WINDOW_SCRIPT = """
+local current = redis.call('INCR', KEYS[1])
+if current == 1 then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+return {current, previous}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """``limit`` requests per ``window`` seconds within ``scope``."""
+    scope: str
+    limit: int
+    window: int
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int
+    scope: str
+
+
+class SlidingWindowRateLimiter:
+    """Sliding-window counter over two fixed windows.
+
+    Each request increments the counter of the current window; the
+    estimate weights the previous window by how much of it still overlaps
+    the sliding window. With Redis this is a single Lua script call per
+    rule, so cost does not depend on how many requests were made before.
+    Other cache backends fall back to ``incr``/``add``. If the cache is
+    unreachable requests are let through.
+    """
+
+    KEY_PREFIX = 'ratelimit'
+
+    def __init__(self, alias: str = 'default'):
+        self.alias = alias
+        self._script = None
+
+    def hit(self, rule: RateLimitRule, identity: str, now: Optional[float] = None) -> RateLimitResult:
+        """Count one request for ``identity`` under ``rule``."""
+        now = time.time() if now is None else now
+        index = int(now // rule.window)
+        current_key = self._key(rule, identity, index)
+        previous_key = self._key(rule, identity, index - 1)
+
+        try:
+            current, previous = self._increment(current_key, previous_key, rule.window)
+        except Exception as e:
+            logger.warning(f'Rate limiter unavailable, allowing request: {str(e)}')
+            return RateLimitResult(True, rule.limit, rule.limit, 0, rule.scope)
+
+        elapsed = now - index * rule.window
+        overlap = 1 - elapsed / rule.window
+        estimate = previous * overlap + current
+        allowed = estimate <= rule.limit
+
+        retry_after = 0
+        if not allowed:
+            # When the previous window's share has decayed enough, or at the
+            # latest when the current window rolls over.
+            retry_after = math.ceil(rule.window - elapsed)
+            if previous:
+                excess = estimate - rule.limit
+                retry_after = min(retry_after, math.ceil(excess / previous * rule.window))
+            retry_after = max(retry_after, 1)
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=rule.limit,
+            remaining=max(int(rule.limit - estimate), 0),
+            retry_after=retry_after,
+            scope=rule.scope,
+        )
+
+    def _key(self, rule: RateLimitRule, identity: str, index: int) -> str:
+        return f'{self.KEY_PREFIX}:{rule.scope}:{rule.window}:{identity}:{index}'
+
+    def _increment(self, current_key: str, previous_key: str, window: int) -> Tuple[int, int]:
+        cache = caches[self.alias]
+        client = self._redis_client(cache)
+
+        if client is not None:
+            if self._script is None:
+                self._script = client.register_script(SLIDING_WINDOW_SCRIPT)
+            # Keys expire after two windows so the previous one stays readable
+            current, previous = self._script(
+                keys=[cache.make_key(current_key), cache.make_key(previous_key)],
+                args=[window * 2],
+                client=client
+            )
+            return int(current), int(previous)
+
+        if cache.add(current_key, 1, timeout=window * 2):
+            current = 1
+        else:
+            current = cache.incr(current_key)
+        return current, int(cache.get(previous_key) or 0)
+
+    def _redis_client(self, cache):
+        """The raw redis-py client behind Django's RedisCache, if any."""
+        backend = getattr(cache, '_cache', None)
+        if backend is None or not hasattr(backend, 'get_client'):
+            return None
+        return backend.get_client(write=True)
+
+
+def get_rules(path: str, tier: str) -> List[RateLimitRule]:
+    """Rules that apply to a request on ``path`` from a ``tier`` client.
+
+    The tier's global limit always applies; every ``RATE_LIMIT_ROUTES``
+    prefix matching ``path`` adds its own, separately counted, limit.
+    """
+    rules = []
+
+    tier_limit = getattr(settings, 'RATE_LIMIT_TIERS', {}).get(tier)
+    if tier_limit:
+        rules.append(RateLimitRule(f'{tier}:global', tier_limit['limit'], tier_limit['window']))
+
+    for prefix, limits in getattr(settings, 'RATE_LIMIT_ROUTES', []):
+        route_limit = limits.get(tier)
+        if route_limit and path.startswith(prefix):
+            rules.append(RateLimitRule(f'{tier}:{prefix}', route_limit['limit'], route_limit['window']))
+
+    return rules
+
+
+rate_limiter = SlidingWindowRateLimiter()
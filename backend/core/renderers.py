@@ -0,0 +1,49 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` backed by orjson.
+    
+    Produces the same JSON as the stock renderer: UUIDs, datetimes (UTC
+    as ``...Z``), dates, times and numpy arrays are encoded natively in
+    the formats DRF's encoder uses; anything orjson does not know
+    (Decimals, lazy strings, timedeltas, querysets) goes through that
+    encoder's ``default``. Floats are written in orjson's shortest form,
+    so large exponents lose the ``+`` (``1e16``, not ``1e+16``).
+    
+    NaN and Infinity are written as ``null``; the stock renderer raises
+    on them under ``STRICT_JSON`` (failing the response), and checking
+    every float first would cost more than the encoding saves.
+    Pretty-printed output (``; indent=N``), non-compact or ASCII-only
+    settings and installs without orjson use the stock renderer.
+    """
+    
+    OPTIONS = (
+        (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        if orjson is not None else 0
+    )
+    
+    _encoder = encoders.JSONEncoder()
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        if data is None:
+            return b''
+        
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        
+        ret = orjson.dumps(data, default=self._encoder.default, option=self.OPTIONS)
+        
+        # Keep the output a strict JavaScript subset, as JSONRenderer does
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
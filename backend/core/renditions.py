@@ -0,0 +1,206 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import io
+import logging
+import math
+
+from django.conf import settings
+from PIL import Image, features
+from rest_framework import serializers
+
+from .images import ImageSource
+
+logger = logging.getLogger('miora.api')
+
+DEFAULT_WIDTHS = (64, 150, 300, 600, 1200)
+
+# Encoder options per format, in order of preference (smallest files first)
+DEFAULT_FORMATS = {
+    'avif': {'quality': 50, 'speed': 8},
+    'webp': {'quality': 80, 'method': 4},
+}
+
+CONTENT_TYPES = {
+    'avif': 'image/avif',
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+
+def get_settings() -> Dict[str, Any]:
+    options = getattr(settings, 'IMAGE_RENDITIONS', {})
+    return {
+        'WIDTHS': tuple(options.get('WIDTHS', DEFAULT_WIDTHS)),
+        'FORMATS': options.get('FORMATS', DEFAULT_FORMATS),
+        'DEFAULT_WIDTH': options.get('DEFAULT_WIDTH', 300),
+    }
+
+
+def available_formats(formats: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """``formats`` without those this Pillow build cannot encode."""
+    usable = {}
+    for name, options in formats.items():
+        if name == 'jpeg' or features.check(name):
+            usable[name] = options
+        else:
+            logger.debug(f'Skipping {name} renditions: not supported by Pillow')
+    return usable
+
+
+@dataclass
+class Rendition:
+    """One encoded size of an image; ``box`` is the bounding box it fits."""
+    box: int
+    width: int
+    height: int
+    format: str
+    data: bytes
+
+    @property
+    def content_type(self) -> str:
+        return CONTENT_TYPES[self.format]
+
+    def key(self, base_path: str) -> str:
+        extension = 'jpg' if self.format == 'jpeg' else self.format
+        return f'{base_path}/renditions/{self.box}.{extension}'
+
+
+def render(source: ImageSource, widths: Optional[Sequence[int]] = None,
+           formats: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Rendition]:
+    """Encode ``source`` at every size in ``widths`` and every format.
+
+    The largest size is decoded once (at a reduced JPEG scale where
+    possible) and each smaller one is resampled from the previous, so the
+    whole set costs one decode. Sizes are bounding boxes and the image is
+    never upscaled: boxes larger than the image are skipped, except that
+    the smallest box is always produced.
+    """
+    options = get_settings()
+    widths = sorted(widths or options['WIDTHS'], reverse=True)
+    formats = available_formats(formats or options['FORMATS'])
+
+    fitting = [box for box in widths if box <= max(source.size)] or widths[-1:]
+
+    renditions = []
+    image = None
+    for box in fitting:
+        if image is None:
+            image = _encodable(source.fit((box, box)))
+        else:
+            ratio = box / max(image.size)
+            target = (max(1, round(image.width * ratio)), max(1, round(image.height * ratio)))
+            image = image.resize(target, Image.Resampling.LANCZOS)
+
+        for name, encoder_options in formats.items():
+            renditions.append(Rendition(
+                box=box,
+                width=image.width,
+                height=image.height,
+                format=name,
+                data=_encode(image, name, encoder_options),
+            ))
+    return renditions
+
+
+def upload_items(renditions: List[Rendition], base_path: str) -> List[Tuple[bytes, str, str]]:
+    """``(data, key, content_type)`` tuples for ``S3Storage.upload_files``."""
+    return [
+        (rendition.data, rendition.key(base_path), rendition.content_type)
+        for rendition in renditions
+    ]
+
+
+def build_manifest(renditions: List[Rendition], urls: List[str]) -> Dict[str, Any]:
+    """The ``renditions`` manifest stored on a model, smallest size first."""
+    sizes: Dict[int, Dict[str, Any]] = {}
+    for rendition, url in zip(renditions, urls):
+        entry = sizes.setdefault(rendition.box, {
+            'width': rendition.width,
+            'height': rendition.height,
+            'sources': {},
+        })
+        entry['sources'][rendition.format] = {'url': url, 'bytes': len(rendition.data)}
+
+    return {
+        'formats': list(dict.fromkeys(rendition.format for rendition in renditions)),
+        'sizes': [sizes[box] for box in sorted(sizes)],
+    }
+
+
+def choose(manifest: Dict[str, Any], width: int) -> Optional[Dict[str, Any]]:
+    """Smallest rendition at least ``width`` pixels wide (else the largest)."""
+    sizes = (manifest or {}).get('sizes') or []
+    if not sizes:
+        return None
+    for entry in sizes:
+        if entry['width'] >= width:
+            return entry
+    return sizes[-1]
+
+
+class RenditionField(serializers.Field):
+    """Read-only field serializing the rendition that suits the client.
+
+    The target size is ``?image_width=`` (times ``?dpr=``, capped at 3),
+    else the serializer context's ``image_width``, else ``default_width``.
+    Returns the chosen size's URLs per format, best format first, plus a
+    ``srcset`` per format for responsive web clients; ``None`` until
+    renditions have been generated.
+    """
+
+    def __init__(self, default_width: Optional[int] = None, **kwargs):
+        self.default_width = default_width
+        kwargs.setdefault('source', 'renditions')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def requested_width(self) -> int:
+        width = self.context.get('image_width') or self.default_width or get_settings()['DEFAULT_WIDTH']
+        request = self.context.get('request')
+        if request is not None:
+            try:
+                width = int(request.query_params.get('image_width', width))
+                dpr = float(request.query_params.get('dpr', 1))
+            except (AttributeError, ValueError):
+                dpr = 1
+            if not math.isfinite(dpr):
+                dpr = 1
+            width = int(width * min(max(dpr, 1), 3))
+        return max(width, 1)
+
+    def to_representation(self, manifest):
+        entry = choose(manifest, self.requested_width())
+        if entry is None:
+            return None
+
+        formats = manifest.get('formats', [])
+        return {
+            'width': entry['width'],
+            'height': entry['height'],
+            'sources': {
+                name: entry['sources'][name]['url']
+                for name in formats if name in entry['sources']
+            },
+            'srcset': {
+                name: ', '.join(
+                    f"{size['sources'][name]['url']} {size['width']}w"
+                    for size in manifest['sizes'] if name in size['sources']
+                )
+                for name in formats
+            },
+        }
+
+
+def _encodable(image: Image.Image) -> Image.Image:
+    if image.mode in ('RGB', 'RGBA'):
+        return image
+    has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _encode(image: Image.Image, name: str, options: Dict[str, Any]) -> bytes:
+    if name == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format=name.upper(), **options)
+    return buffer.getvalue()
@@ -0,0 +1,12 @@
+from django.urls import path, re_path
+
+from .websocket import TryOnConsumer, NotificationConsumer
+
+websocket_urlpatterns = [
+    # Progress of a try-on session (see try_on.tasks.notify_session)
+    re_path(
+        r'^ws/try-on/(?P<session_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/$',
+        TryOnConsumer.as_asgi()
+    ),
+    path('ws/notifications/', NotificationConsumer.as_asgi()),
+]
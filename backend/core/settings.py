@@ -4,6 +4,7 @@ import os
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+from celery.schedules import crontab
 from dotenv import load_dotenv, find_dotenv
 
 # Load environment variables
@@ -54,11 +55,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.NPlusOneMiddleware',
+    'core.middleware.APILoggingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,6 +87,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'core.wsgi.application'
+ASGI_APPLICATION = 'core.asgi.application'
 
 # Database 
 DATABASES = {
@@ -103,6 +109,95 @@ CACHES = {
     }
 }
 
+# Try-on simulation results cached per layer (seconds); Redis evicts LRU
+TRY_ON_SIMULATION_CACHE_TIMEOUT = config('TRY_ON_SIMULATION_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# API request logs are buffered per process and written in batches to
+# daily partition tables, which are dropped after the retention period
+API_REQUEST_LOG_RETENTION_DAYS = config('API_REQUEST_LOG_RETENTION_DAYS', default=30, cast=int)
+API_REQUEST_LOG_BUFFER = {
+    'CAPACITY': config('API_REQUEST_LOG_BUFFER_CAPACITY', default=10000, cast=int),
+    'FLUSH_SIZE': config('API_REQUEST_LOG_FLUSH_SIZE', default=500, cast=int),
+    'FLUSH_INTERVAL': config('API_REQUEST_LOG_FLUSH_INTERVAL', default=2.0, cast=float),
+    'BACKGROUND': True,
+}
+
+# A sample of requests is profiled (core.middleware.ProfilingMiddleware):
+# sampled responses get a Server-Timing header and feed per-route
+# histograms that each worker publishes to the cache every PUBLISH_INTERVAL
+# seconds. EXTERNAL_SERVICES names outgoing HTTP calls by host suffix.
+PROFILING = {
+    'SAMPLE_RATE': config('PROFILING_SAMPLE_RATE', default=0.01, cast=float),
+    'SERVER_TIMING': config('PROFILING_SERVER_TIMING', default=True, cast=bool),
+    'PUBLISH_INTERVAL': config('PROFILING_PUBLISH_INTERVAL', default=10, cast=int),
+    'EXTERNAL_SERVICES': {
+        'api.flora-fauna.ai': 'florafauna',
+        'api.revery.ai': 'revery',
+        'api.remove.bg': 'removebg',
+        'api.cloudinary.com': 'cloudinary',
+        'api.avaturn.me': 'avaturn',
+        'amazonaws.com': 's3',
+    },
+}
+
+# Flag query shapes repeated THRESHOLD+ times in one request or Celery
+# task: 'log' (staging), 'raise' or 'off'. IGNORE holds SQL regexes.
+N_PLUS_ONE_DETECTION = {
+    'MODE': config('N_PLUS_ONE_MODE', default='off'),
+    'THRESHOLD': config('N_PLUS_ONE_THRESHOLD', default=5, cast=int),
+    'IGNORE': [],
+}
+
+# Sliding-window rate limits (requests per window in seconds). Tiers apply
+# to every API request; route limits add a separate limit under a prefix.
+# A tier mapped to None is not limited.
+RATE_LIMIT_TIERS = {
+    'anonymous': {'limit': config('RATE_LIMIT_ANONYMOUS_PER_HOUR', default=100, cast=int), 'window': 60 * 60},
+    'user': {'limit': config('RATE_LIMIT_USER_PER_HOUR', default=5000, cast=int), 'window': 60 * 60},
+    'staff': None,
+}
+
+RATE_LIMIT_ROUTES = [
+    ('/api/v1/auth/', {'anonymous': {'limit': 20, 'window': 60}}),
+    ('/api/v1/try-on/', {'user': {'limit': 60, 'window': 60}}),
+    ('/api/v1/recommendations/bulk/', {'user': {'limit': 10, 'window': 60}}),
+]
+
+# Proxies in front of the app that append to X-Forwarded-For (nginx: 1).
+# Client addresses are read from the entry the outermost of them appended;
+# with 0 only REMOTE_ADDR is used, since the header itself is client-set.
+TRUSTED_PROXY_COUNT = config('TRUSTED_PROXY_COUNT', default=0, cast=int)
+
+# AWS S3 (used by core.utils.S3Storage outside DEBUG)
+AWS_ACCESS_KEY_ID = config('AWS_ACCESS_KEY_ID', default='')
+AWS_SECRET_ACCESS_KEY = config('AWS_SECRET_ACCESS_KEY', default='')
+AWS_STORAGE_BUCKET_NAME = config('AWS_STORAGE_BUCKET_NAME', default='')
+AWS_S3_REGION_NAME = config('AWS_S3_REGION_NAME', default='us-east-1')
+AWS_S3_CUSTOM_DOMAIN = config(
+    'AWS_S3_CUSTOM_DOMAIN', default=f'{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com'
+)
+AWS_S3_MAX_POOL_CONNECTIONS = config('AWS_S3_MAX_POOL_CONNECTIONS', default=50, cast=int)
+# Objects from this size on (bytes) are sent as parallel multipart uploads
+AWS_S3_MULTIPART_THRESHOLD = config('AWS_S3_MULTIPART_THRESHOLD', default=8 * 1024 * 1024, cast=int)
+AWS_S3_MULTIPART_CHUNKSIZE = config('AWS_S3_MULTIPART_CHUNKSIZE', default=8 * 1024 * 1024, cast=int)
+AWS_S3_MAX_CONCURRENCY = config('AWS_S3_MAX_CONCURRENCY', default=10, cast=int)
+
+# Responsive image renditions of garments and avatars (core.renditions):
+# bounding-box sizes in px and encoder options per format, best first.
+# Formats the installed Pillow cannot encode are skipped.
+IMAGE_RENDITIONS = {
+    'WIDTHS': [64, 150, 300, 600, 1200],
+    'FORMATS': {
+        'avif': {'quality': 50, 'speed': 8},
+        'webp': {'quality': 80, 'method': 4},
+    },
+    'DEFAULT_WIDTH': 300,
+}
+
+# Presigned direct-to-storage uploads (core.uploads)
+DIRECT_UPLOAD_MAX_SIZE = config('DIRECT_UPLOAD_MAX_SIZE', default=25 * 1024 * 1024, cast=int)
+DIRECT_UPLOAD_EXPIRES = config('DIRECT_UPLOAD_EXPIRES', default=900, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'accounts.validators.CustomPasswordValidator'},
@@ -145,6 +240,17 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # orjson-backed JSON (same JSON as the stock classes, which they
+    # fall back to when orjson is not installed)
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -190,13 +296,51 @@ CORS_ALLOWED_ORIGINS = [
 # OAUTH2_PROVIDER_APPLICATION_MODEL = 'oauth2_provider.Application'
 # OAUTH2_PROVIDER_REFRESH_TOKEN_MODEL = 'oauth2_provider.RefreshToken'
 
-# Celery Configuration (disabled for development)
-# CELERY_BROKER_URL = config('REDIS_URL')
-# CELERY_RESULT_BACKEND = config('REDIS_URL')
-# CELERY_ACCEPT_CONTENT = ['json']
-# CELERY_TASK_SERIALIZER = 'json'
-# CELERY_RESULT_SERIALIZER = 'json'
-# CELERY_TIMEZONE = TIME_ZONE
+# Celery Configuration
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=config('REDIS_URL', default='redis://localhost:6379/0'))
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=CELERY_BROKER_URL)
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_RESULT_SERIALIZER = 'json'
+CELERY_TIMEZONE = TIME_ZONE
+# Run tasks inline when no worker is available (local development)
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+
+CELERY_BEAT_SCHEDULE = {
+    'rollup-api-requests': {
+        'task': 'analytics.tasks.rollup_api_requests',
+        'schedule': crontab(minute=5),
+    },
+    'prune-api-request-logs': {
+        'task': 'analytics.tasks.prune_api_request_logs',
+        'schedule': crontab(minute=15, hour=3),
+    },
+    'requeue-stalled-garments': {
+        'task': 'garments.tasks.requeue_stalled_garments',
+        'schedule': crontab(minute='*/10'),
+    },
+    'fail-stale-try-on-sessions': {
+        'task': 'try_on.tasks.fail_stale_sessions',
+        'schedule': crontab(minute='*/5'),
+    },
+}
+
+# Lifetime of the single-use tickets browsers open websockets with (seconds)
+WEBSOCKET_TICKET_TIMEOUT = config('WEBSOCKET_TICKET_TIMEOUT', default=30, cast=int)
+
+# Channel layer used to push try-on progress to websocket clients.
+# Each uvicorn worker holds thousands of consumers, so per-channel queues
+# are kept short and undelivered messages expire quickly.
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'CONFIG': {
+            'hosts': [config('CHANNEL_REDIS_URL', default=config('REDIS_URL', default='redis://localhost:6379/0'))],
+            'capacity': config('CHANNEL_LAYER_CAPACITY', default=200, cast=int),
+            'expiry': 30,
+        },
+    }
+}
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # Development
@@ -1,17 +1,47 @@
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
 from rest_framework_simplejwt.tokens import RefreshToken
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+from .n_plus_one import detect_n_plus_one
 
 User = get_user_model()
 
 
+class QueryGuardedAPIClient(APIClient):
+    """API client that fails a request which repeats a query shape."""
+    
+    n_plus_one_mode = 'raise'
+    n_plus_one_threshold = None
+    
+    def request(self, **kwargs):
+        label = f"{kwargs.get('REQUEST_METHOD', 'GET')} {kwargs.get('PATH_INFO', '')}"
+        with detect_n_plus_one(label, mode=self.n_plus_one_mode, threshold=self.n_plus_one_threshold):
+            return super().request(**kwargs)
+
+
 class AuthenticatedAPITestCase(APITestCase):
-    """Base test case with authentication helpers."""
+    """Base test case with authentication helpers.
+    
+    Every request made through ``self.client`` raises ``NPlusOneError`` if
+    it runs the same query shape ``N_PLUS_ONE_DETECTION['THRESHOLD']`` times
+    or more; see ``assertNoNPlusOne`` and ``allow_n_plus_one``.
+    """
+    
+    client_class = QueryGuardedAPIClient
     
     def setUp(self):
         """Set up test user and authentication."""
         self.user = User.objects.create_user(
             email='test@example.com',
+            username='testuser',
             password='testpass123'
         )
         self.user.is_verified = True
@@ -25,9 +55,13 @@ class AuthenticatedAPITestCase(APITestCase):
         # Set authorization header
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access_token}')
     
-    def create_user(self, email='another@example.com', password='pass123'):
+    def create_user(self, email='another@example.com', password='pass123', username=None):
         """Helper to create additional users."""
-        user = User.objects.create_user(email=email, password=password)
+        user = User.objects.create_user(
+            email=email,
+            username=username or email.split('@')[0],
+            password=password
+        )
         user.is_verified = True
         user.save()
         return user
@@ -39,4 +73,130 @@ class AuthenticatedAPITestCase(APITestCase):
     
     def logout(self):
         """Remove authentication."""
-        self.client.credentials()
\ No newline at end of file
+        self.client.credentials()
+    
+    def assertNoNPlusOne(self, label='block', threshold=None):
+        """Context manager failing if its block repeats a query shape."""
+        return detect_n_plus_one(label, mode='raise', threshold=threshold)
+    
+    @contextmanager
+    def allow_n_plus_one(self):
+        """Let requests in the block repeat queries."""
+        self.client.n_plus_one_mode = 'off'
+        try:
+            yield
+        finally:
+            self.client.n_plus_one_mode = QueryGuardedAPIClient.n_plus_one_mode
+
+
+class BenchmarkAPITestCase(AuthenticatedAPITestCase):
+    """Authenticated test case that measures requests against a JSON baseline.
+    
+    ``benchmark()`` records the query count, median wall time and peak
+    traced allocations of a request and fails if any of them regressed past
+    the entry stored in ``BASELINE_PATH``. Query counts must not grow at
+    all; time and memory get a tolerance since they vary between machines.
+    Set ``MIORA_UPDATE_BENCHMARKS=1`` to (re)write the baseline instead.
+    """
+    
+    BASELINE_PATH = Path(__file__).resolve().parent / 'benchmarks' / 'baseline.json'
+    REPEAT = 5
+    TIME_TOLERANCE = 3.0
+    TIME_FLOOR_MS = 25
+    MEMORY_TOLERANCE = 1.5
+    MEMORY_FLOOR_KB = 256
+    
+    _results = None
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._results = {}
+    
+    @classmethod
+    def tearDownClass(cls):
+        if cls._results and os.environ.get('MIORA_UPDATE_BENCHMARKS'):
+            baseline = cls.load_baseline()
+            baseline.update(cls._results)
+            cls.BASELINE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            cls.BASELINE_PATH.write_text(json.dumps(baseline, indent=2, sort_keys=True) + '\n')
+        super().tearDownClass()
+    
+    @classmethod
+    def load_baseline(cls):
+        if not cls.BASELINE_PATH.exists():
+            return {}
+        return json.loads(cls.BASELINE_PATH.read_text())
+    
+    def benchmark(self, name, request, expected_status=None, repeat=None):
+        """Measure ``request()`` and compare it with the baseline entry ``name``.
+        
+        The first call warms caches and counts queries; the timed calls run
+        without tracing, and a final traced call measures allocations.
+        Returns the measurements.
+        """
+        repeat = repeat or self.REPEAT
+        
+        # Counted with a wrapper: CaptureQueriesContext misses queries once
+        # the connection's bounded query log is full.
+        queries = []
+        
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+        
+        with connection.execute_wrapper(count_query):
+            response = request()
+        if expected_status is not None:
+            self.assertEqual(response.status_code, expected_status, getattr(response, 'data', None))
+        
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            request()
+            timings.append((time.perf_counter() - start) * 1000)
+        
+        tracemalloc.start()
+        try:
+            request()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        
+        result = {
+            'queries': len(queries),
+            'time_ms': round(statistics.median(timings), 2),
+            'peak_kb': round(peak / 1024, 1),
+        }
+        self._results[name] = result
+        
+        if not os.environ.get('MIORA_UPDATE_BENCHMARKS'):
+            self.assert_within_baseline(name, result)
+        return result
+    
+    def assert_within_baseline(self, name, result):
+        baseline = self.load_baseline().get(name)
+        if baseline is None:
+            self.fail(
+                f'No benchmark baseline for {name!r}; '
+                f'run the suite with MIORA_UPDATE_BENCHMARKS=1 to record one.'
+            )
+        
+        self.assertLessEqual(
+            result['queries'], baseline['queries'],
+            f'{name}: {result["queries"]} queries, baseline is {baseline["queries"]}'
+        )
+        
+        time_limit = max(baseline['time_ms'] * self.TIME_TOLERANCE,
+                         baseline['time_ms'] + self.TIME_FLOOR_MS)
+        self.assertLessEqual(
+            result['time_ms'], time_limit,
+            f'{name}: {result["time_ms"]}ms, baseline is {baseline["time_ms"]}ms'
+        )
+        
+        memory_limit = max(baseline['peak_kb'] * self.MEMORY_TOLERANCE,
+                           baseline['peak_kb'] + self.MEMORY_FLOOR_KB)
+        self.assertLessEqual(
+            result['peak_kb'], memory_limit,
+            f'{name}: {result["peak_kb"]}KB peak, baseline is {baseline["peak_kb"]}KB'
+        )
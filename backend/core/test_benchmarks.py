@@ -0,0 +1,341 @@
+from django.test import TestCase, tag
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from decimal import Decimal
+from unittest import skipUnless
+import importlib.util
+import time
+import tracemalloc
+import uuid
+
+import numpy as np
+from PIL import Image
+
+from avatars.models import Avatar
+from garments.colors import extract_palette
+from garments.models import Garment, BrandSizeChart
+from garments.size_charts import brand_size_charts
+from try_on.cloth import ClothSimulator
+from try_on.models import TryOnSession, TryOnSessionGarment, Outfit, OutfitGarment
+from try_on.serializers import TryOnSessionSerializer
+from .renderers import ORJSONRenderer
+from .test_base import AuthenticatedAPITestCase, BenchmarkAPITestCase
+
+BRANDS = [f'Brand {i}' for i in range(20)]
+CATEGORIES = ['shirt', 't-shirt', 'sweater', 'jacket', 'pants', 'jeans']
+SIZES = ['XS', 'S', 'M', 'L', 'XL']
+
+
+def _size_data(offset):
+    return {
+        size: {'chest': 84 + 5 * i + offset, 'waist': 68 + 5 * i + offset, 'hips': 86 + 5 * i + offset}
+        for i, size in enumerate(SIZES)
+    }
+
+
+@tag('benchmark')
+class TryOnRequestPathBenchmark(BenchmarkAPITestCase):
+    """Query count, latency and allocations of the try-on request path.
+
+    Seeds a wardrobe of a few thousand garments, a session history and a
+    catalogue of brand size charts so list and lookup costs show up.
+    """
+
+    GARMENTS = 2000
+    SESSIONS = 200
+    GARMENTS_PER_SESSION = 3
+    OUTFITS = 20
+
+    def setUp(self):
+        super().setUp()
+        self.avatar = Avatar.objects.get(user=self.user)
+
+        BrandSizeChart.objects.bulk_create([
+            BrandSizeChart(
+                brand=brand,
+                garment_type=category,
+                gender='unisex',
+                size_system='INT',
+                size_data=_size_data(b % 5)
+            )
+            for b, brand in enumerate(BRANDS)
+            for category in CATEGORIES
+        ])
+        # bulk_create sends no signals; drop charts indexed by earlier tests
+        brand_size_charts.clear()
+        self.addCleanup(brand_size_charts.clear)
+
+        self.garments = Garment.objects.bulk_create([
+            Garment(
+                user=self.user,
+                name=f'Garment {i}',
+                category=CATEGORIES[i % len(CATEGORIES)],
+                brand=BRANDS[i % len(BRANDS)],
+                original_image_url=f'https://example.com/garments/{i}.jpg',
+                processing_status='completed',
+                # Every other garment falls back on its brand chart
+                size_chart=_size_data(i % 7) if i % 2 else {},
+            )
+            for i in range(self.GARMENTS)
+        ])
+
+        sessions = TryOnSession.objects.bulk_create([
+            TryOnSession(user=self.user, avatar=self.avatar, session_name=f'Session {i}')
+            for i in range(self.SESSIONS)
+        ])
+        TryOnSessionGarment.objects.bulk_create([
+            TryOnSessionGarment(
+                session=session,
+                garment=self.garments[(s * self.GARMENTS_PER_SESSION + layer) % self.GARMENTS],
+                layer_order=layer + 1,
+                selected_size='M'
+            )
+            for s, session in enumerate(sessions)
+            for layer in range(self.GARMENTS_PER_SESSION)
+        ])
+
+        self.outfits = Outfit.objects.bulk_create([
+            Outfit(user=self.user, avatar=self.avatar, name=f'Outfit {i}')
+            for i in range(self.OUTFITS)
+        ])
+        OutfitGarment.objects.bulk_create([
+            OutfitGarment(
+                outfit=outfit,
+                garment=self.garments[o * 4 + layer],
+                layer_order=layer + 1,
+                selected_size='M'
+            )
+            for o, outfit in enumerate(self.outfits)
+            for layer in range(4)
+        ])
+
+    def test_create_session(self):
+        """Benchmark TryOnSessionViewSet.create with a three-layer outfit."""
+        url = reverse('try_on:tryon-session-list')
+        data = {
+            'avatar_id': str(self.avatar.id),
+            'garments': [
+                {'garment_id': str(self.garments[i].id), 'layer_order': i + 1, 'selected_size': 'M'}
+                for i in range(3)
+            ]
+        }
+
+        self.benchmark(
+            'try_on.sessions.create',
+            lambda: self.client.post(url, data, format='json'),
+            expected_status=status.HTTP_202_ACCEPTED
+        )
+
+    def test_list_sessions(self):
+        """Benchmark the first page of TryOnSessionViewSet.list."""
+        url = reverse('try_on:tryon-session-list')
+
+        self.benchmark(
+            'try_on.sessions.list',
+            lambda: self.client.get(url),
+            expected_status=status.HTTP_200_OK
+        )
+
+    def test_duplicate_outfit(self):
+        """Benchmark OutfitViewSet.duplicate of a four-garment outfit."""
+        url = reverse('try_on:outfit-duplicate', kwargs={'pk': self.outfits[0].pk})
+
+        self.benchmark(
+            'try_on.outfits.duplicate',
+            lambda: self.client.post(url),
+            expected_status=status.HTTP_201_CREATED
+        )
+
+    def test_size_recommendation(self):
+        """Benchmark GetSizeRecommendationView for a brand-chart garment."""
+        url = reverse('recommendations:get_recommendation')
+        data = {
+            'avatar_id': str(self.avatar.id),
+            'garment_id': str(self.garments[0].id),
+            'fit_preference': 'regular'
+        }
+
+        self.benchmark(
+            'recommendations.get',
+            lambda: self.client.post(url, data, format='json'),
+            expected_status=status.HTTP_200_OK
+        )
+
+
+@tag('benchmark')
+class JSONRendererBenchmark(AuthenticatedAPITestCase):
+    """Stock ``JSONRenderer`` against ``ORJSONRenderer`` on API payloads.
+    
+    Both must produce identical bytes on these payloads, which have no
+    non-finite or exponent-form floats (see ``ORJSONRenderer``); the
+    orjson renderer must be faster.
+    Timings are the best of ``REPEAT`` runs of ``ROUNDS`` renders.
+    """
+    
+    SESSIONS = 20
+    ROWS = 1000
+    ROUNDS = 20
+    REPEAT = 5
+    
+    def setUp(self):
+        super().setUp()
+        avatar = Avatar.objects.get(user=self.user)
+        garments = Garment.objects.bulk_create([
+            Garment(
+                user=self.user,
+                name=f'Garment {i}',
+                category=CATEGORIES[i % len(CATEGORIES)],
+                brand=BRANDS[i % len(BRANDS)],
+                original_image_url=f'https://example.com/garments/{i}.jpg',
+                price=Decimal('49.90'),
+                size_chart=_size_data(i % 7),
+                material_properties={'stretchiness': 0.2, 'density': 0.15},
+            )
+            for i in range(self.SESSIONS * 3)
+        ])
+        sessions = TryOnSession.objects.bulk_create([
+            TryOnSession(user=self.user, avatar=avatar, session_name=f'Session {i}')
+            for i in range(self.SESSIONS)
+        ])
+        TryOnSessionGarment.objects.bulk_create([
+            TryOnSessionGarment(
+                session=session,
+                garment=garments[s * 3 + layer],
+                layer_order=layer + 1,
+                selected_size='M'
+            )
+            for s, session in enumerate(sessions)
+            for layer in range(3)
+        ])
+    
+    def _compare(self, name, data):
+        stock, fast = JSONRenderer(), ORJSONRenderer()
+        self.assertEqual(fast.render(data), stock.render(data))
+        
+        timings = {}
+        for label, renderer in (('stock', stock), ('orjson', fast)):
+            best = float('inf')
+            for _ in range(self.REPEAT):
+                start = time.perf_counter()
+                for _ in range(self.ROUNDS):
+                    renderer.render(data)
+                best = min(best, time.perf_counter() - start)
+            timings[label] = best / self.ROUNDS * 1000
+        
+        self.assertLess(
+            timings['orjson'], timings['stock'],
+            f'{name}: orjson {timings["orjson"]:.2f}ms vs stock {timings["stock"]:.2f}ms'
+        )
+        return timings
+    
+    def test_nested_try_on_sessions(self):
+        """Session list: sessions with their avatar and three full garments."""
+        sessions = TryOnSession.objects.select_related('avatar').prefetch_related('garments__garment')
+        data = {'results': TryOnSessionSerializer(sessions, many=True).data}
+        
+        self._compare('try_on.sessions', data)
+    
+    def test_raw_values(self):
+        """Rows of UUIDs, Decimals and datetimes built in views (e.g. bulk results)."""
+        now = timezone.now()
+        data = {
+            'results': [
+                [uuid.uuid4(), 'M', Decimal('0.8125'), now, ['L'], {'chest': Decimal('2.5')}]
+                for _ in range(self.ROWS)
+            ]
+        }
+        
+        self._compare('raw_values', data)
+
+
+@tag('benchmark')
+class DominantColorBenchmark(TestCase):
+    """Full-resolution KMeans against the sampled Lab histogram palette.
+    
+    The photo is a striped garment on a studio backdrop with sensor noise.
+    KMeans (the previous ``_extract_metadata``) clusters every pixel;
+    ``extract_palette`` samples at most ``MAX_PIXELS`` of them.
+    """
+    
+    WIDTH, HEIGHT = 1200, 900
+    REPEAT = 3
+    
+    @classmethod
+    def photo(cls, width, height):
+        rng = np.random.default_rng(7)
+        pixels = np.full((height, width, 3), 245, dtype=np.int16)
+        pixels[height // 6:height * 5 // 6, width // 4:width * 3 // 4] = (180, 30, 40)
+        for row in range(height // 6, height * 5 // 6, height // 12):
+            pixels[row:row + height // 40, width // 4:width * 3 // 4] = (20, 40, 150)
+        pixels += rng.integers(-6, 7, size=pixels.shape, dtype=np.int16)
+        return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    
+    def measure(self, function):
+        best = float('inf')
+        for _ in range(self.REPEAT):
+            start = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - start)
+        
+        tracemalloc.start()
+        try:
+            function()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return result, best * 1000, peak / 1024 / 1024
+    
+    @staticmethod
+    def kmeans_color(image):
+        from sklearn.cluster import KMeans
+        
+        pixels = np.array(image).reshape(-1, 3)
+        kmeans = KMeans(n_clusters=3, random_state=42)
+        kmeans.fit(pixels)
+        return '#{:02x}{:02x}{:02x}'.format(*kmeans.cluster_centers_.astype(int)[0])
+    
+    @skipUnless(importlib.util.find_spec('sklearn'), 'scikit-learn is not installed')
+    def test_against_kmeans(self):
+        image = self.photo(self.WIDTH, self.HEIGHT)
+        
+        _, kmeans_ms, kmeans_mb = self.measure(lambda: self.kmeans_color(image))
+        palette, palette_ms, palette_mb = self.measure(lambda: extract_palette(image))
+        
+        self.assertEqual(palette[0].hex[:2], '#b', palette[0].to_dict())
+        self.assertLess(
+            palette_ms * 5, kmeans_ms,
+            f'palette {palette_ms:.1f}ms vs KMeans {kmeans_ms:.1f}ms'
+        )
+        self.assertLess(
+            palette_mb * 5, kmeans_mb,
+            f'palette {palette_mb:.1f}MB vs KMeans {kmeans_mb:.1f}MB peak'
+        )
+    
+    def test_full_resolution_upload(self):
+        """A 12MP upload stays well inside the processing budget."""
+        image = self.photo(4000, 3000)
+        
+        palette, elapsed_ms, peak_mb = self.measure(lambda: extract_palette(image))
+        
+        self.assertEqual([color.hex[:2] for color in palette[:2]], ['#b', '#1'])
+        self.assertLess(elapsed_ms, 500)
+        self.assertLess(peak_mb, 32)
+
+
+@tag('benchmark')
+class ClothSolveBenchmark(TestCase):
+    """The mass-spring cloth solve against the inline latency budget."""
+    
+    def test_solve_latency_budget(self):
+        """A 5k-vertex solve stays within the inline latency budget."""
+        simulator = ClothSimulator()
+        body = {'height': 170, 'chest': 96, 'waist': 82, 'hips': 98}
+        
+        # Warm-up solve; the second one is measured
+        simulator.simulate(body, {'chest': 100}, 'dress')
+        result = simulator.simulate(body, {'chest': 100}, 'dress')
+        
+        self.assertGreaterEqual(simulator.vertex_count, 5000)
+        self.assertLess(result.solve_time_ms, 200)
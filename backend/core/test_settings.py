@@ -30,4 +30,20 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
     }
-} 
\ No newline at end of file
+}
+
+# Run Celery tasks inline and keep channel groups in memory
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = True
+
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    }
+}
+
+# Flush buffered API request logs explicitly instead of from a thread
+API_REQUEST_LOG_BUFFER = {**API_REQUEST_LOG_BUFFER, 'BACKGROUND': False}
+
+# Profile only where a test asks for it
+PROFILING = {**PROFILING, 'SAMPLE_RATE': 0.0}
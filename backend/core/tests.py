@@ -0,0 +1,922 @@
+from django.test import TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+import threading
+import uuid
+from unittest import mock
+import numpy as np
+from PIL import Image
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.http import HttpResponse
+from rest_framework_simplejwt.tokens import RefreshToken
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from asgiref.testing import ApplicationCommunicator
+import boto3
+from moto import mock_s3
+
+from .middleware import RateLimitMiddleware
+from .images import ImageSource
+from . import dag, renditions
+from .n_plus_one import NPlusOneError, detect_n_plus_one, fingerprint
+from .parsers import ORJSONParser
+from . import profiling
+from .rate_limit import RateLimitRule, SlidingWindowRateLimiter
+from .renderers import ORJSONRenderer
+from .test_base import AuthenticatedAPITestCase
+from .utils import S3Storage, process_uploaded_image
+from .websocket import issue_ticket
+
+User = get_user_model()
+
+
+@override_settings(
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'rate-limit-tests',
+        }
+    },
+    RATE_LIMIT_TIERS={
+        'anonymous': {'limit': 3, 'window': 60},
+        'user': {'limit': 10, 'window': 60},
+        'staff': None,
+    },
+    RATE_LIMIT_ROUTES=[
+        ('/api/v1/try-on/', {'user': {'limit': 2, 'window': 60}}),
+    ]
+)
+class RateLimitMiddlewareTest(TestCase):
+    """Test cases for the sliding-window rate limiter."""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.factory = RequestFactory()
+        self.middleware = RateLimitMiddleware(lambda request: HttpResponse())
+        self.user = User.objects.create_user(
+            email='limited@example.com',
+            username='limited',
+            password='testpass123'
+        )
+
+    def _request(self, path='/api/v1/garments/', user=None, **extra):
+        request = self.factory.get(path, **extra)
+        request.user = user or AnonymousUser()
+        return self.middleware(request)
+
+    def test_anonymous_limit_without_queries(self):
+        """Test anonymous clients are limited per IP with no database access."""
+        with self.assertNumQueries(0):
+            statuses = [self._request().status_code for _ in range(4)]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(self._request(REMOTE_ADDR='10.0.0.2').status_code, 200)
+        self.assertIn('Retry-After', self._request())
+
+    def test_forwarded_for_cannot_be_forged(self):
+        """Test rotating X-Forwarded-For does not give a fresh bucket."""
+        statuses = [
+            self._request(HTTP_X_FORWARDED_FOR=f'203.0.113.{i}').status_code
+            for i in range(4)
+        ]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        
+        # Behind one proxy, the address it appended is the client's
+        with override_settings(TRUSTED_PROXY_COUNT=1):
+            statuses = [
+                self._request(HTTP_X_FORWARDED_FOR=f'203.0.113.{i}, 198.51.100.7').status_code
+                for i in range(4)
+            ]
+            self.assertEqual(statuses, [200, 200, 200, 429])
+            self.assertEqual(
+                self._request(HTTP_X_FORWARDED_FOR='198.51.100.8').status_code, 200
+            )
+    
+    def test_route_limit_for_users(self):
+        """Test per-route limits stack on top of the user tier."""
+        statuses = [
+            self._request('/api/v1/try-on/sessions/', user=self.user).status_code
+            for _ in range(3)
+        ]
+
+        self.assertEqual(statuses, [200, 200, 429])
+        response = self._request(user=self.user)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-RateLimit-Limit'], '10')
+
+    def test_jwt_clients_use_user_tier(self):
+        """Test bearer tokens are counted per user, not per IP."""
+        token = RefreshToken.for_user(self.user).access_token
+        statuses = [
+            self._request(HTTP_AUTHORIZATION=f'Bearer {token}').status_code
+            for _ in range(5)
+        ]
+
+        self.assertEqual(statuses, [200] * 5)
+
+    def test_staff_not_limited(self):
+        """Test the staff tier is exempt."""
+        self.user.is_staff = True
+        statuses = [self._request(user=self.user).status_code for _ in range(15)]
+        self.assertEqual(set(statuses), {200})
+
+    def test_sliding_window_weights_previous_window(self):
+        """Test the previous window counts in proportion to its overlap."""
+        limiter = SlidingWindowRateLimiter()
+        rule = RateLimitRule('test', limit=10, window=60)
+
+        for _ in range(10):
+            limiter.hit(rule, 'client', now=1000 * 60 + 30)
+
+        # Halfway into the next window half of the previous 10 still count
+        results = [limiter.hit(rule, 'client', now=1001 * 60 + 30) for _ in range(6)]
+        self.assertEqual([result.allowed for result in results], [True] * 5 + [False])
+        self.assertEqual(results[-1].retry_after, 6)
+
+
+@mock_s3
+@override_settings(
+    DEBUG=False,
+    AWS_ACCESS_KEY_ID='testing',
+    AWS_SECRET_ACCESS_KEY='testing',
+    AWS_STORAGE_BUCKET_NAME='miora-test',
+    AWS_S3_REGION_NAME='us-east-1',
+    AWS_S3_CUSTOM_DOMAIN='cdn.example.com',
+    AWS_S3_MULTIPART_THRESHOLD=5 * 1024 * 1024,
+    AWS_S3_MULTIPART_CHUNKSIZE=5 * 1024 * 1024,
+)
+class S3StorageTest(TestCase):
+    """S3Storage against a mocked bucket."""
+    
+    def setUp(self):
+        S3Storage.reset_client()
+        self.addCleanup(S3Storage.reset_client)
+        boto3.client('s3', region_name='us-east-1').create_bucket(Bucket='miora-test')
+    
+    def _object(self, key):
+        return S3Storage.get_client().get_object(Bucket='miora-test', Key=key)
+    
+    def test_client_is_reused(self):
+        """Every call goes through one pooled client."""
+        self.assertIs(S3Storage.get_client(), S3Storage.get_client())
+        self.assertEqual(S3Storage.get_client().meta.config.max_pool_connections, 50)
+    
+    def test_small_upload(self):
+        """Small files are a single PUT with the usual headers."""
+        url = S3Storage.upload_file(b'thumbnail', 'a/thumb.png', 'image/png')
+        
+        self.assertEqual(url, 'https://cdn.example.com/a/thumb.png')
+        obj = self._object('a/thumb.png')
+        self.assertEqual(obj['Body'].read(), b'thumbnail')
+        self.assertEqual(obj['ContentType'], 'image/png')
+        self.assertEqual(obj['CacheControl'], 'max-age=86400')
+    
+    def test_large_upload_is_multipart(self):
+        """Files above the threshold are uploaded in parts."""
+        content = bytes(range(256)) * (44 * 1024)  # ~11MB, three parts
+        
+        S3Storage.upload_file(content, 'a/model.glb', 'model/gltf-binary')
+        
+        obj = self._object('a/model.glb')
+        self.assertEqual(obj['Body'].read(), content)
+        self.assertEqual(obj['ContentType'], 'model/gltf-binary')
+        self.assertTrue(obj['ETag'].strip('"').endswith('-3'))
+    
+    def test_upload_files_keeps_order(self):
+        """Parallel uploads return URLs in input order."""
+        files = [(f'texture {i}'.encode(), f'a/texture_{i}.png', 'image/png') for i in range(8)]
+        
+        urls = S3Storage.upload_files(files)
+        
+        self.assertEqual(urls, [f'https://cdn.example.com/a/texture_{i}.png' for i in range(8)])
+        self.assertEqual(self._object('a/texture_5.png')['Body'].read(), b'texture 5')
+    
+    def test_delete_files_in_batches(self):
+        """Deletes are sent in batches of at most 1000 keys."""
+        client = S3Storage.get_client()
+        keys = [f'b/{i}.png' for i in range(1200)]
+        for key in keys[:10]:
+            client.put_object(Bucket='miora-test', Key=key, Body=b'x')
+        
+        calls = []
+        original = client.delete_objects
+        
+        def delete_objects(**kwargs):
+            calls.append(len(kwargs['Delete']['Objects']))
+            return original(**kwargs)
+        
+        client.delete_objects = delete_objects
+        failed = S3Storage.delete_files(keys)
+        
+        self.assertEqual(failed, [])
+        self.assertEqual(calls, [1000, 200])
+        self.assertEqual(client.list_objects_v2(Bucket='miora-test')['KeyCount'], 0)
+    
+    def test_presigned_upload_and_streamed_read(self):
+        """A presigned PUT targets the key; the stored object streams back."""
+        upload = S3Storage.presigned_upload('uploads/u/garments/a.png', 'image/png', 900)
+        
+        self.assertEqual(upload['method'], 'PUT')
+        self.assertIn('miora-test', upload['url'])
+        self.assertIn('uploads/u/garments/a.png', upload['url'])
+        self.assertIsNone(S3Storage.file_info('uploads/u/garments/a.png'))
+        
+        S3Storage.upload_file(b'png bytes', 'uploads/u/garments/a.png', 'image/png')
+        
+        self.assertEqual(
+            S3Storage.file_info('uploads/u/garments/a.png'),
+            {'size': 9, 'content_type': 'image/png'}
+        )
+        with S3Storage.open_file('https://cdn.example.com/uploads/u/garments/a.png') as file:
+            self.assertEqual(file.read(), b'png bytes')
+
+
+class KeysetPaginationTest(AuthenticatedAPITestCase):
+    """Test cases for keyset pagination on the garment list."""
+    
+    def setUp(self):
+        super().setUp()
+        from garments.models import Garment
+        
+        garments = Garment.objects.bulk_create([
+            Garment(
+                user=self.user,
+                name=f'Garment {i}',
+                category='shirt',
+                original_image_url=f'https://example.com/{i}.jpg'
+            )
+            for i in range(25)
+        ])
+        # Pairs of garments share a timestamp so the id tie-break matters
+        now = timezone.now()
+        for i, garment in enumerate(garments):
+            Garment.objects.filter(pk=garment.pk).update(created_at=now - timedelta(minutes=i // 2))
+        
+        self.expected = [
+            str(pk) for pk in Garment.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        ]
+        self.url = reverse('garments:garment-list')
+    
+    def _walk(self, url, link):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data[link]
+        return ids, pages
+    
+    def test_forward_and_backward(self):
+        """Following next links visits every row once; previous links walk back."""
+        ids, pages = self._walk(f'{self.url}?page_size=10', 'next')
+        
+        self.assertEqual(ids, self.expected)
+        self.assertEqual([len(page['results']) for page in pages], [10, 10, 5])
+        self.assertIsNone(pages[0]['previous'])
+        self.assertNotIn('count', pages[0])
+        
+        backwards, _ = self._walk(pages[-1]['previous'], 'previous')
+        self.assertEqual(backwards, self.expected[10:20] + self.expected[:10])
+    
+    def test_deep_pages_run_the_same_queries(self):
+        """No COUNT, and a deep page needs no more queries than the first."""
+        first = self.client.get(f'{self.url}?page_size=5')
+        
+        with CaptureQueriesContext(connection) as first_queries:
+            self.client.get(f'{self.url}?page_size=5')
+        
+        url = first.data['next']
+        for _ in range(3):
+            url = self.client.get(url).data['next']
+        with CaptureQueriesContext(connection) as deep_queries:
+            response = self.client.get(url)
+        
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(deep_queries), len(first_queries))
+        self.assertFalse(any('COUNT(' in query['sql'] for query in deep_queries))
+    
+    def test_seek_is_an_index_range_scan(self):
+        """The cursor bounds the composite index instead of filtering a scan."""
+        from garments.models import Garment
+        from .pagination import KeysetPagination
+        
+        paginator = KeysetPagination()
+        paginator.fields = [('created_at', True), ('id', True)]
+        newest = Garment.objects.order_by('-created_at', '-id')[10]
+        queryset = Garment.objects.filter(user=self.user).filter(
+            paginator._seek([newest.created_at, newest.id], reverse=False)
+        ).order_by('-created_at', '-id')[:6]
+        
+        plan = queryset.explain()
+        self.assertIn('garments_user_id_3ff1b6_idx', plan)
+        self.assertIn('created_at<?', plan.replace(' ', ''))
+    
+    def test_include_count(self):
+        """The total is only counted when asked for."""
+        response = self.client.get(f'{self.url}?page_size=10&include_count=true')
+        
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 10)
+    
+    def test_invalid_cursor(self):
+        """Garbage cursors are rejected with 404."""
+        response = self.client.get(f'{self.url}?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+
+class ORJSONRendererTest(TestCase):
+    """Test cases for the orjson renderer and parser."""
+    
+    def setUp(self):
+        self.payload = ReturnDict({
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'price': Decimal('19.99'),
+            'created_at': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'naive': datetime(2024, 5, 1, 12, 30),
+            'offset': datetime(2024, 5, 1, 14, 30, tzinfo=dt_timezone(timedelta(hours=2))),
+            'zoned': timezone.localtime(timezone.now(), timezone.get_default_timezone()),
+            'date_worn': date(2024, 5, 1),
+            'at': time(9, 15),
+            'duration': timedelta(minutes=5),
+            'label': gettext_lazy('Regular'),
+            'scores': np.array([0.5, 0.25]),
+            'text': 'line\u2028separator – ünïcode',
+            'nested': [{1: 'int key', 'ok': True, 'none': None}],
+        }, serializer=None)
+    
+    def test_matches_stock_renderer(self):
+        """Output is what JSONRenderer produces, up to float exponents."""
+        self.assertEqual(
+            ORJSONRenderer().render(self.payload),
+            JSONRenderer().render(self.payload)
+        )
+        
+        large = {'views': 1e16}
+        self.assertEqual(ORJSONRenderer().render(large), b'{"views":1e16}')
+        self.assertEqual(JSONRenderer().render(large), b'{"views":1e+16}')
+        self.assertEqual(json.loads(ORJSONRenderer().render(large)), large)
+    
+    def test_non_finite_floats(self):
+        """NaN and Infinity become null where the strict stock renderer raises."""
+        for value in (float('nan'), float('inf'), np.array([1.0, np.nan])):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render({'score': value})
+                self.assertIn(b'null', ORJSONRenderer().render({'score': value}))
+    
+    def test_indent_and_empty(self):
+        """Pretty-printing is delegated; None renders as an empty body."""
+        media_type = 'application/json; indent=2'
+        self.assertEqual(
+            ORJSONRenderer().render(self.payload, media_type),
+            JSONRenderer().render(self.payload, media_type)
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+    
+    def test_parser(self):
+        """Parses JSON bodies and rejects invalid or non-finite input."""
+        parser = ORJSONParser()
+        body = '{"name": "Tee", "price": 19.99, "tags": ["ü"]}'
+        
+        self.assertEqual(
+            parser.parse(io.BytesIO(body.encode())),
+            {'name': 'Tee', 'price': 19.99, 'tags': ['ü']}
+        )
+        self.assertEqual(
+            parser.parse(io.BytesIO(body.encode('latin-1')), parser_context={'encoding': 'latin-1'}),
+            json.loads(body)
+        )
+        for invalid in (b'{"a": ', b'{"a": NaN}'):
+            with self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(invalid))
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'websocket-tests',
+    }
+})
+class WebsocketRoutingTest(TransactionTestCase):
+    """Test cases for the ASGI websocket routes and ticket authentication."""
+    
+    def setUp(self):
+        from avatars.models import Avatar
+        from try_on.models import TryOnSession
+        from core.asgi import application
+        
+        self.application = application
+        self.user = User.objects.create_user(
+            email='ws@example.com', username='wsuser', password='testpass123'
+        )
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.session = TryOnSession.objects.create(
+            user=self.user, avatar=Avatar.objects.get(user=self.user)
+        )
+    
+    async def _connect(self, path):
+        """Open a websocket; returns the communicator and whether it was accepted."""
+        path, _, query = path.partition('?')
+        communicator = ApplicationCommunicator(self.application, {
+            'type': 'websocket',
+            'path': path,
+            'query_string': query.encode(),
+            'headers': [(b'origin', b'http://testserver')],
+            'subprotocols': [],
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        response = await communicator.receive_output(timeout=5)
+        return communicator, response['type'] == 'websocket.accept'
+    
+    async def _close(self, communicator):
+        await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+        await communicator.wait(timeout=5)
+    
+    async def _receive_json(self, communicator):
+        return json.loads((await communicator.receive_output(timeout=5))['text'])
+    
+    def test_try_on_progress_reaches_the_owner(self):
+        """Authenticated owners connect and receive the session's events."""
+        ticket = issue_ticket(self.user)
+        
+        async def run():
+            communicator, accepted = await self._connect(
+                f'/ws/try-on/{self.session.id}/?ticket={ticket}'
+            )
+            self.assertTrue(accepted)
+            self.assertEqual((await self._receive_json(communicator))['type'], 'connection_established')
+            
+            await get_channel_layer().group_send(f'tryon_{self.session.id}', {
+                'type': 'tryon_progress',
+                'session_id': str(self.session.id),
+                'stage': 'layer_completed',
+                'layer': 1,
+                'completed_layers': 1,
+                'total_layers': 2,
+            })
+            event = await self._receive_json(communicator)
+            await self._close(communicator)
+            return event
+        
+        event = async_to_sync(run)()
+        self.assertEqual(event['type'], 'simulation_progress')
+        self.assertEqual(event['completed_layers'], 1)
+    
+    def test_rejects_anonymous_and_other_users(self):
+        """Missing or invalid tokens and other users' sessions are refused."""
+        other = User.objects.create_user(email='other@example.com', username='other', password='testpass123')
+        other_token = str(RefreshToken.for_user(other).access_token)
+        
+        async def connects(path):
+            communicator, accepted = await self._connect(path)
+            if accepted:
+                await self._close(communicator)
+            return accepted
+        
+        base = f'/ws/try-on/{self.session.id}/'
+        self.assertFalse(async_to_sync(connects)(base))
+        self.assertFalse(async_to_sync(connects)(f'{base}?ticket=invalid'))
+        self.assertFalse(async_to_sync(connects)(f'{base}?ticket={issue_ticket(other)}'))
+        self.assertTrue(async_to_sync(connects)(f'/ws/notifications/?ticket={issue_ticket(other)}'))
+        # Access tokens are not accepted in the URL
+        self.assertFalse(async_to_sync(connects)(f'/ws/notifications/?token={other_token}'))
+    
+    def test_tickets_are_single_use(self):
+        """A ticket read back from a log cannot open a second connection."""
+        async def connects(path):
+            communicator, accepted = await self._connect(path)
+            if accepted:
+                await self._close(communicator)
+            return accepted
+        
+        response = self.client.post(
+            reverse('accounts:ws_ticket'), HTTP_AUTHORIZATION=f'Bearer {self.token}'
+        )
+        self.assertEqual(response.status_code, 201)
+        
+        path = f'/ws/notifications/?ticket={response.json()["ticket"]}'
+        self.assertTrue(async_to_sync(connects)(path))
+        self.assertFalse(async_to_sync(connects)(path))
+
+
+@override_settings(PROFILING={'SAMPLE_RATE': 1.0, 'SERVER_TIMING': True, 'PUBLISH_INTERVAL': 0})
+class ProfilingMiddlewareTest(AuthenticatedAPITestCase):
+    """Test cases for sampled request profiling."""
+    
+    def setUp(self):
+        super().setUp()
+        profiling.route_metrics.clear()
+        self.addCleanup(profiling.route_metrics.clear)
+    
+    def test_server_timing_header(self):
+        """Sampled responses break down where the request spent its time."""
+        response = self.client.get(reverse('garments:garment-list'))
+        
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'cache;dur=', 'serializer;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertNotIn('db;dur=0.0;desc="0 queries"', timing)
+    
+    @override_settings(PROFILING={'SAMPLE_RATE': 0.0})
+    def test_unsampled_request(self):
+        """Requests outside the sample are not profiled."""
+        response = self.client.get(reverse('garments:garment-list'))
+        
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(profiling.route_metrics.snapshot(), {})
+    
+    def test_route_histograms(self):
+        """Requests are aggregated under their URL pattern, not their path."""
+        from garments.models import Garment
+        
+        for i in range(3):
+            garment = Garment.objects.create(
+                user=self.user, name=f'Garment {i}', category='shirt',
+                original_image_url=f'https://example.com/{i}.jpg'
+            )
+            self.client.get(reverse('garments:garment-detail', args=[garment.id]))
+        
+        routes = profiling.route_metrics.snapshot()
+        route = 'GET /api/v1/garments/garments/(?P<pk>[^/.]+)/$'
+        self.assertIn(route, routes, list(routes))
+        self.assertEqual(routes[route]['requests'], 3)
+        self.assertGreater(routes[route]['db_queries'], 0)
+        self.assertEqual(sum(routes[route]['timings']['total']['buckets']), 3)
+    
+    def test_external_calls(self):
+        """Outgoing HTTP calls are timed per service."""
+        from urllib3.connectionpool import HTTPConnectionPool
+        from urllib3.util.retry import Retry
+        
+        self.assertEqual(profiling.external_service('api.remove.bg'), 'removebg')
+        self.assertEqual(profiling.external_service('miora.s3.amazonaws.com'), 's3')
+        self.assertEqual(profiling.external_service('example.com'), 'other')
+        
+        token = profiling.start_profile()
+        try:
+            pool = HTTPConnectionPool('api.revery.ai', port=1, retries=False, timeout=0.1)
+            with self.assertRaises(Exception):
+                pool.urlopen('GET', '/')
+        finally:
+            profile = profiling.end_profile(token)
+        
+        self.assertEqual(profile.external['revery']['calls'], 1)
+        self.assertIn('ext-revery;dur=', profile.server_timing(profile.total_ms))
+        
+        # Retries re-enter urlopen but are one call
+        token = profiling.start_profile()
+        try:
+            pool = HTTPConnectionPool('api.revery.ai', port=1, retries=Retry(2, backoff_factor=0), timeout=0.1)
+            with self.assertRaises(Exception):
+                pool.urlopen('GET', '/')
+        finally:
+            profile = profiling.end_profile(token)
+        
+        self.assertEqual(profile.external['revery']['calls'], 1)
+    
+    def test_metrics_endpoint(self):
+        """Admins can read the per-route histograms."""
+        url = reverse('analytics:route_performance')
+        self.client.get(reverse('garments:garment-list'))
+        
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 403)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url, {'route': 'garments'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['sample_rate'], 1.0)
+        rows = {row['route']: row for row in response.data['routes']}
+        self.assertIn('GET /api/v1/garments/garments/$', rows, list(rows))
+        total = rows['GET /api/v1/garments/garments/$']['timings']['total']
+        self.assertEqual(total['count'], 1)
+        self.assertIsNotNone(total['p95_ms'])
+    
+    def test_percentile(self):
+        """Percentiles resolve to the upper bound of their bucket."""
+        histogram = {'count': 0, 'sum_ms': 0.0, 'buckets': [0] * len(profiling.BUCKETS_MS)}
+        self.assertIsNone(profiling.percentile(histogram, 0.5))
+        
+        histogram['buckets'][0] = 9
+        histogram['buckets'][4] = 1
+        histogram['count'] = 10
+        self.assertEqual(profiling.percentile(histogram, 0.5), 5)
+        self.assertEqual(profiling.percentile(histogram, 0.95), 100)
+
+
+class NPlusOneDetectorTest(AuthenticatedAPITestCase):
+    """Test cases for the repeated query detector."""
+    
+    def setUp(self):
+        super().setUp()
+        from garments.models import Garment
+        
+        Garment.objects.bulk_create([
+            Garment(user=self.user, name=f'Garment {i}', category='shirt')
+            for i in range(6)
+        ])
+    
+    def load_owners(self):
+        from garments.models import Garment
+        return [garment.user.email for garment in Garment.objects.all()]
+    
+    def test_fingerprint(self):
+        """Queries differing only in literals share a shape."""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a'"),
+            fingerprint("SELECT  *  FROM t WHERE id = 22 AND name = 'b''c'")
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+            'SELECT * FROM t WHERE id IN (...)'
+        )
+    
+    def test_reports_call_site(self):
+        """Repeated lazy loads raise with the line that issued them."""
+        with self.assertRaises(NPlusOneError) as context:
+            with self.assertNoNPlusOne('owners'):
+                self.load_owners()
+        
+        message = str(context.exception)
+        self.assertIn('6x at core/tests.py', message)
+        self.assertIn('SELECT "users"', message)
+    
+    def test_below_threshold(self):
+        """Queries repeated fewer than THRESHOLD times pass."""
+        with self.assertNoNPlusOne('owners', threshold=7) as detector:
+            self.load_owners()
+        
+        self.assertEqual(detector.repeated, [])
+    
+    def test_log_mode(self):
+        """Log mode reports without raising."""
+        with self.assertLogs('miora.api', level='WARNING') as logs:
+            with detect_n_plus_one('owners', mode='log'):
+                self.load_owners()
+        
+        self.assertIn('Repeated queries in owners', logs.output[0])
+    
+    def test_requests_are_guarded(self):
+        """Test client requests fail on N+1 unless explicitly allowed."""
+        from insights.models import WearEvent
+        from insights.views import WearEventListCreateView
+        from garments.models import Garment
+        
+        for i, garment in enumerate(Garment.objects.all()):
+            WearEvent.objects.create(user=self.user, garment=garment, date_worn=date(2024, 1, i + 1))
+        url = reverse('insights:wear-events')
+        
+        # Without select_related each event loads its garment
+        unjoined = lambda view: WearEvent.objects.filter(user=view.request.user).order_by('-date_worn', '-id')
+        with mock.patch.object(WearEventListCreateView, 'get_queryset', unjoined):
+            with self.assertRaises(NPlusOneError):
+                self.client.get(url)
+            with self.allow_n_plus_one():
+                response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, 200)
+
+
+class ImageSourceTest(TestCase):
+    """Test cases for reduced-resolution image decoding."""
+    
+    def encode(self, size=(2400, 1600), format='JPEG', mode='RGB'):
+        buffer = io.BytesIO()
+        Image.new(mode, size, 'teal').save(buffer, format=format)
+        return buffer.getvalue()
+    
+    def test_jpeg_decodes_at_reduced_scale(self):
+        """Small outputs come from a DCT-scaled decode, never the full image."""
+        source = ImageSource.open(self.encode())
+        
+        self.assertEqual(source.size, (2400, 1600))
+        self.assertEqual(source.decoded_scales, ())
+        
+        thumbnail = source.fit((300, 300))
+        self.assertEqual(thumbnail.size, (300, 200))
+        self.assertEqual(source.decoded_scales, (8,))
+        
+        preview = source.fit((1000, 1000))
+        self.assertEqual(preview.size, (1000, 667))
+        self.assertEqual(source.decoded_scales, (2, 8))
+    
+    def test_levels_are_cached(self):
+        source = ImageSource.open(self.encode())
+        
+        self.assertIs(source.fit((300, 300)), source.fit((300, 300)))
+        self.assertIs(source.level(4), source.level(4))
+        self.assertEqual(source.fit_pixels(60000).size, (300, 200))
+    
+    def test_other_formats_halve_one_decode(self):
+        source = ImageSource.open(self.encode(format='PNG', mode='RGBA'))
+        
+        self.assertEqual(source.fit((300, 300)).size, (300, 200))
+        self.assertEqual(source.decoded_scales, (1, 8))
+        self.assertEqual(source.level(8).mode, 'RGBA')
+    
+    def test_palette_and_bilevel_pngs_scale(self):
+        """Modes Image.reduce rejects are converted before scaling."""
+        for mode, scaled_mode in (('P', 'RGB'), ('1', 'L'), ('I;16', 'L')):
+            with self.subTest(mode=mode):
+                source = ImageSource.open(self.encode(format='PNG', mode=mode))
+                
+                self.assertEqual(source.mode, mode)
+                thumbnail = source.fit((300, 300))
+                self.assertEqual(thumbnail.size, (300, 200))
+                self.assertEqual(thumbnail.mode, scaled_mode)
+    
+    def test_parallel_stages_share_one_decode(self):
+        """Threads asking for the same fit decode and resize it once."""
+        source = ImageSource.open(self.encode())
+        open_image = source._open
+        
+        def slow_open():
+            threading.Event().wait(0.05)
+            return open_image()
+        
+        with mock.patch.object(source, '_open', side_effect=slow_open) as opened:
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                images = list(pool.map(lambda _: source.fit((300, 300)), range(4)))
+        
+        self.assertEqual(opened.call_count, 1)
+        self.assertTrue(all(image is images[0] for image in images))
+    
+    def test_never_upscales(self):
+        source = ImageSource.open(self.encode(size=(200, 100)))
+        
+        self.assertEqual(source.fit((1920, 1920)).size, (200, 100))
+        self.assertEqual(source.decoded_scales, (1,))
+    
+    def test_process_uploaded_image(self):
+        output = process_uploaded_image(io.BytesIO(self.encode(size=(4000, 3000))), max_size=(1920, 1920))
+        
+        self.assertEqual(Image.open(output).size, (1920, 1440))
+
+
+class RenditionsTest(TestCase):
+    """Test cases for responsive image renditions."""
+    
+    def source(self, size):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'teal').save(buffer, format='JPEG')
+        return ImageSource.open(buffer.getvalue())
+    
+    def test_render_sizes_from_one_reduced_decode(self):
+        source = self.source((4000, 3000))
+        
+        result = renditions.render(source, formats={'webp': {'quality': 80}, 'jpeg': {'quality': 80}})
+        
+        self.assertEqual(source.decoded_scales, (2,))
+        self.assertEqual(
+            [(r.box, r.format, r.width, r.height) for r in result[:4]],
+            [(1200, 'webp', 1200, 900), (1200, 'jpeg', 1200, 900), (600, 'webp', 600, 450), (600, 'jpeg', 600, 450)]
+        )
+        self.assertEqual([r.box for r in result[::2]], [1200, 600, 300, 150, 64])
+        self.assertEqual(Image.open(io.BytesIO(result[-2].data)).format, 'WEBP')
+        self.assertEqual(result[-1].key('garments/u/g'), 'garments/u/g/renditions/64.jpg')
+    
+    def test_no_upscaling(self):
+        result = renditions.render(self.source((40, 30)), formats={'webp': {}})
+        
+        self.assertEqual([(r.box, r.width) for r in result], [(64, 40)])
+        
+        result = renditions.render(self.source((400, 300)), formats={'webp': {}})
+        self.assertEqual([r.box for r in result], [300, 150, 64])
+    
+    def test_manifest_and_choice(self):
+        result = renditions.render(self.source((800, 600)), formats={'avif': {}, 'webp': {}})
+        urls = [f'https://cdn.example.com/{r.box}.{r.format}' for r in result]
+        manifest = renditions.build_manifest(result, urls)
+        
+        self.assertEqual(manifest['formats'], ['avif', 'webp'])
+        self.assertEqual([size['width'] for size in manifest['sizes']], [64, 150, 300, 600])
+        self.assertEqual(renditions.choose(manifest, 200)['width'], 300)
+        self.assertEqual(renditions.choose(manifest, 5000)['width'], 600)
+        self.assertIsNone(renditions.choose({}, 200))
+        
+        from rest_framework import serializers
+        from rest_framework.request import Request
+        
+        class ImageSerializer(serializers.Serializer):
+            image = renditions.RenditionField()
+        
+        request = Request(RequestFactory().get('/', {'image_width': '100', 'dpr': '2'}))
+        image = ImageSerializer({'renditions': manifest}, context={'request': request}).data['image']
+        
+        self.assertEqual(image['width'], 300)
+        self.assertEqual(list(image['sources']), ['avif', 'webp'])
+        self.assertEqual(image['sources']['webp'], 'https://cdn.example.com/300.webp')
+        self.assertTrue(image['srcset']['avif'].startswith('https://cdn.example.com/64.avif 64w, '))
+        
+        # Malformed or non-finite query values fall back to the defaults
+        for params, width in (({'image_width': '150', 'dpr': 'nan'}, 150),
+                              ({'image_width': '150', 'dpr': 'inf'}, 150),
+                              ({'image_width': 'wide'}, 300)):
+            with self.subTest(params=params):
+                request = Request(RequestFactory().get('/', params))
+                field = ImageSerializer(context={'request': request}).fields['image']
+                self.assertEqual(field.requested_width(), width)
+
+
+class DAGExecutorTest(TestCase):
+    """Test cases for the checkpointed stage executor."""
+
+    class MemoryStore(dag.CheckpointStore):
+        def __init__(self, saved=None):
+            self.saved = dict(saved or {})
+            self.events = []
+
+        def load(self):
+            return dict(self.saved)
+
+        def started(self, stage):
+            self.events.append(('started', stage))
+
+        def completed(self, stage, output, elapsed_ms):
+            self.saved[stage] = output
+            self.events.append(('completed', stage))
+
+        def failed(self, stage, error, elapsed_ms):
+            self.events.append(('failed', stage))
+
+    def test_independent_stages_run_in_parallel(self):
+        import threading
+        barrier = threading.Barrier(2, timeout=5)
+
+        def branch(name):
+            def run(context, inputs):
+                # Deadlocks (and times out) unless both branches run at once
+                barrier.wait()
+                return {name: inputs['root']['value'] + 1}
+            return run
+
+        graph = dag.DAG([
+            dag.Stage('join', lambda context, inputs: {**inputs['left'], **inputs['right']},
+                      ('left', 'right')),
+            dag.Stage('left', branch('left'), ('root',)),
+            dag.Stage('right', branch('right'), ('root',)),
+            dag.Stage('root', lambda context, inputs: {'value': 1}),
+        ])
+
+        self.assertEqual(graph.order[0], 'root')
+        outputs = dag.execute(graph, None)
+        self.assertEqual(outputs['join'], {'left': 2, 'right': 2})
+
+    def test_failure_checkpoints_siblings_and_resumes(self):
+        calls = []
+        broken = {'fail': True}
+
+        def stage(name):
+            def run(context, inputs):
+                calls.append(name)
+                if name == 'bad' and broken['fail']:
+                    raise ValueError('boom')
+                return {'name': name}
+            return run
+
+        graph = dag.DAG([
+            dag.Stage('root', stage('root')),
+            dag.Stage('bad', stage('bad'), ('root',)),
+            dag.Stage('good', stage('good'), ('root',)),
+            dag.Stage('after', stage('after'), ('bad',)),
+        ])
+        store = self.MemoryStore()
+
+        with self.assertRaises(dag.StageFailed) as failure:
+            dag.execute(graph, None, store)
+        self.assertEqual(failure.exception.stage, 'bad')
+        self.assertEqual(set(store.saved), {'root', 'good'})
+        self.assertNotIn('after', calls)
+
+        calls.clear()
+        broken['fail'] = False
+        outputs = dag.execute(graph, None, store)
+        self.assertCountEqual(calls, ['bad', 'after'])
+        self.assertEqual(set(outputs), {'root', 'bad', 'good', 'after'})
+
+    def test_invalid_graphs(self):
+        noop = lambda context, inputs: {}
+
+        with self.assertRaises(ValueError):
+            dag.DAG([dag.Stage('a', noop, ('missing',))])
+        with self.assertRaises(ValueError):
+            dag.DAG([dag.Stage('a', noop, ('b',)), dag.Stage('b', noop, ('a',))])
+        with self.assertRaises(ValueError):
+            dag.DAG([dag.Stage('a', noop), dag.Stage('a', noop)])
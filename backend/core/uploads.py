@@ -0,0 +1,141 @@
+from typing import Any, Dict
+import uuid
+import logging
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from PIL import Image
+from rest_framework import serializers
+
+from .utils import S3Storage
+
+logger = logging.getLogger('miora.api')
+
+ALLOWED_IMAGE_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+}
+
+# Content type each accepted image format must have been uploaded as
+IMAGE_FORMATS = {
+    'JPEG': 'image/jpeg',
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+}
+
+LOCAL_UPLOAD_SALT = 'miora.uploads.local'
+
+
+def upload_prefix(user, kind: str) -> str:
+    """Storage prefix a user's direct uploads of ``kind`` are confined to."""
+    return f'uploads/{user.id}/{kind}/'
+
+
+def create_upload(user, kind: str, content_type: str) -> Dict[str, Any]:
+    """Reserve a key and presign the request that uploads to it."""
+    key = f'{upload_prefix(user, kind)}{uuid.uuid4().hex}{ALLOWED_IMAGE_TYPES[content_type]}'
+    expires_in = settings.DIRECT_UPLOAD_EXPIRES
+
+    return {
+        'key': key,
+        'expires_in': expires_in,
+        'max_size': settings.DIRECT_UPLOAD_MAX_SIZE,
+        **S3Storage.presigned_upload(key, content_type, expires_in)
+    }
+
+
+def validate_upload_key(user, kind: str, key: str) -> str:
+    """Check that ``key`` is an uploaded image of ``user``; returns the key.
+
+    The stored bytes must open as an image of the declared type; files
+    that do not are deleted.
+    """
+    if not key.startswith(upload_prefix(user, kind)) or '..' in key:
+        raise serializers.ValidationError('Unknown upload key.')
+
+    info = S3Storage.file_info(key)
+    if info is None:
+        raise serializers.ValidationError('File has not been uploaded.')
+
+    if info['size'] > settings.DIRECT_UPLOAD_MAX_SIZE:
+        S3Storage.delete_file(key)
+        raise serializers.ValidationError(
+            f"Image size cannot exceed {settings.DIRECT_UPLOAD_MAX_SIZE / 1024 / 1024}MB"
+        )
+
+    if info['content_type'] not in ALLOWED_IMAGE_TYPES:
+        raise serializers.ValidationError(
+            f"Image format must be one of {list(ALLOWED_IMAGE_TYPES)}"
+        )
+
+    # The content type is whatever the client sent; check the bytes too
+    try:
+        with S3Storage.open_file(key) as upload, Image.open(upload) as image:
+            image_format = image.format
+            image.verify()
+    except Exception as e:
+        logger.info(f'Rejected upload {key}: {str(e)}')
+        image_format = None
+
+    if IMAGE_FORMATS.get(image_format) != info['content_type']:
+        S3Storage.delete_file(key)
+        raise serializers.ValidationError('File is not a valid image of its type.')
+
+    return key
+
+
+class DirectUploadSerializer(serializers.Serializer):
+    """Serializer for requesting a presigned image upload."""
+    content_type = serializers.ChoiceField(choices=list(ALLOWED_IMAGE_TYPES))
+    size = serializers.IntegerField(min_value=1, required=False)
+
+    def validate_size(self, value):
+        if value > settings.DIRECT_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Image size cannot exceed {settings.DIRECT_UPLOAD_MAX_SIZE / 1024 / 1024}MB"
+            )
+        return value
+
+
+def local_upload_url(key: str, content_type: str) -> str:
+    token = signing.dumps({'key': key, 'content_type': content_type}, salt=LOCAL_UPLOAD_SALT)
+    return reverse('local_upload', kwargs={'token': token})
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LocalUploadView(View):
+    """Stand-in for the presigned S3 PUT when files are stored locally (DEBUG)."""
+
+    def put(self, request, token):
+        if not settings.DEBUG:
+            raise Http404
+
+        try:
+            upload = signing.loads(
+                token, salt=LOCAL_UPLOAD_SALT, max_age=settings.DIRECT_UPLOAD_EXPIRES
+            )
+        except signing.BadSignature:
+            return HttpResponse(status=403)
+
+        if request.content_type != upload['content_type']:
+            return HttpResponse(status=403)
+
+        # Read the stream directly: request.body is capped at
+        # DATA_UPLOAD_MAX_MEMORY_SIZE, which direct uploads may exceed.
+        body = request.read(settings.DIRECT_UPLOAD_MAX_SIZE + 1)
+        if len(body) > settings.DIRECT_UPLOAD_MAX_SIZE:
+            return HttpResponse(status=413)
+
+        if default_storage.exists(upload['key']):
+            default_storage.delete(upload['key'])
+        default_storage.save(upload['key'], ContentFile(body))
+
+        return HttpResponse(status=200)
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from .uploads import LocalUploadView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -18,6 +19,9 @@ urlpatterns = [
     path('api/v1/community/', include('community.urls')),
     path('api/v1/insights/', include('insights.urls')),
     
+    # Target of presigned uploads when files are stored locally (DEBUG only)
+    path('api/v1/uploads/local/<str:token>/', LocalUploadView.as_view(), name='local_upload'),
+    
     # API Documentation
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
@@ -1,10 +1,16 @@
 import hashlib
+import mimetypes
+import os
 import secrets
-from typing import Dict, Any
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from PIL import Image
 import io
+from .images import ImageSource
 
 
 def generate_secure_token(length: int = 32) -> str:
@@ -20,8 +26,8 @@ def hash_token(token: str) -> str:
 def process_uploaded_image(image_file, max_size: tuple = (1920, 1920), 
                           quality: int = 85) -> ContentFile:
     """Process uploaded image - resize and optimize."""
-    # Open image
-    image = Image.open(image_file)
+    # Decode straight to (about) the output size
+    image = ImageSource.open(image_file).fit(max_size)
     
     # Convert RGBA to RGB if necessary
     if image.mode in ('RGBA', 'LA', 'P'):
@@ -31,9 +37,6 @@ def process_uploaded_image(image_file, max_size: tuple = (1920, 1920),
         background.paste(image, mask=image.split()[-1] if image.mode == 'RGBA' else None)
         image = background
     
-    # Resize if too large
-    image.thumbnail(max_size, Image.Resampling.LANCZOS)
-    
     # Save to bytes
     output = io.BytesIO()
     image.save(output, format='JPEG', quality=quality, optimize=True)
@@ -88,51 +91,196 @@ def validate_image_file(file) -> Dict[str, Any]:
 
 
 class S3Storage:
-    """Utility class for S3 operations."""
+    """Utility class for S3 operations.
+    
+    All calls share one boto3 client per process, so credentials are
+    resolved and TLS connections are set up once and then reused from a
+    pool of ``AWS_S3_MAX_POOL_CONNECTIONS``. Objects at or above
+    ``AWS_S3_MULTIPART_THRESHOLD`` bytes go up as multipart uploads with
+    parts sent in parallel. In DEBUG files are kept in ``default_storage``.
+    """
+    
+    # delete_objects accepts at most this many keys per request
+    DELETE_BATCH_SIZE = 1000
+    
+    _client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+    
+    @classmethod
+    def get_client(cls):
+        """Process-wide S3 client (recreated after a fork)."""
+        if cls._client is not None and cls._client_pid == os.getpid():
+            return cls._client
+        
+        from django.conf import settings
+        import boto3
+        from botocore.config import Config
+        
+        with cls._client_lock:
+            if cls._client is None or cls._client_pid != os.getpid():
+                cls._client = boto3.session.Session().client(
+                    's3',
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID or None,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY or None,
+                    region_name=settings.AWS_S3_REGION_NAME,
+                    config=Config(
+                        max_pool_connections=settings.AWS_S3_MAX_POOL_CONNECTIONS,
+                        retries={'max_attempts': 5, 'mode': 'adaptive'}
+                    )
+                )
+                cls._client_pid = os.getpid()
+        return cls._client
+    
+    @classmethod
+    def reset_client(cls):
+        """Drop the shared client, e.g. after changing credentials."""
+        with cls._client_lock:
+            cls._client = None
+            cls._client_pid = None
+    
+    @staticmethod
+    def transfer_config():
+        from django.conf import settings
+        from boto3.s3.transfer import TransferConfig
+        
+        return TransferConfig(
+            multipart_threshold=settings.AWS_S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.AWS_S3_MULTIPART_CHUNKSIZE,
+            max_concurrency=settings.AWS_S3_MAX_CONCURRENCY,
+            use_threads=True
+        )
     
     @staticmethod
     def upload_file(file_content: bytes, key: str, content_type: str = 'image/jpeg') -> str:
         """Upload file to S3."""
         from django.conf import settings
-        import boto3
         
         if not settings.DEBUG:
-            s3_client = boto3.client(
-                's3',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_S3_REGION_NAME
-            )
+            client = S3Storage.get_client()
             
-            s3_client.put_object(
-                Bucket=settings.AWS_STORAGE_BUCKET_NAME,
-                Key=key,
-                Body=file_content,
-                ContentType=content_type,
-                CacheControl='max-age=86400'
-            )
+            if len(file_content) >= settings.AWS_S3_MULTIPART_THRESHOLD:
+                # Multipart upload, parts transferred in parallel
+                client.upload_fileobj(
+                    io.BytesIO(file_content),
+                    settings.AWS_STORAGE_BUCKET_NAME,
+                    key,
+                    ExtraArgs={'ContentType': content_type, 'CacheControl': 'max-age=86400'},
+                    Config=S3Storage.transfer_config()
+                )
+            else:
+                client.put_object(
+                    Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                    Key=key,
+                    Body=file_content,
+                    ContentType=content_type,
+                    CacheControl='max-age=86400'
+                )
             
             return f"https://{settings.AWS_S3_CUSTOM_DOMAIN}/{key}"
         else:
             # Local storage in development
             return default_storage.save(key, ContentFile(file_content))
     
+    @staticmethod
+    def upload_files(files: List[Tuple[bytes, str, str]]) -> List[str]:
+        """Upload several ``(content, key, content_type)`` files concurrently.
+        
+        Returns the URLs in the order given; raises if any upload failed.
+        """
+        from django.conf import settings
+        
+        if len(files) < 2:
+            return [S3Storage.upload_file(*file) for file in files]
+        
+        workers = min(len(files), settings.AWS_S3_MAX_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda file: S3Storage.upload_file(*file), files))
+    
+    @staticmethod
+    def key_from_url(url_or_key: str) -> str:
+        """Storage key for a value returned by ``upload_file`` (or a key)."""
+        from django.conf import settings
+        
+        prefix = f"https://{settings.AWS_S3_CUSTOM_DOMAIN}/"
+        return url_or_key[len(prefix):] if url_or_key.startswith(prefix) else url_or_key
+    
+    @staticmethod
+    def presigned_upload(key: str, content_type: str, expires_in: int) -> Dict[str, Any]:
+        """Request a client can send to store a file at ``key`` itself.
+        
+        In DEBUG this points at ``LocalUploadView`` instead of S3.
+        """
+        from django.conf import settings
+        
+        if not settings.DEBUG:
+            url = S3Storage.get_client().generate_presigned_url(
+                'put_object',
+                Params={
+                    'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
+                    'Key': key,
+                    'ContentType': content_type
+                },
+                ExpiresIn=expires_in,
+                HttpMethod='PUT'
+            )
+        else:
+            from .uploads import local_upload_url
+            url = local_upload_url(key, content_type)
+        
+        return {'method': 'PUT', 'url': url, 'headers': {'Content-Type': content_type}}
+    
+    @staticmethod
+    def file_info(key: str) -> Optional[Dict[str, Any]]:
+        """``{'size', 'content_type'}`` of a stored file, None if missing."""
+        from django.conf import settings
+        
+        try:
+            if not settings.DEBUG:
+                head = S3Storage.get_client().head_object(
+                    Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                    Key=key
+                )
+                return {'size': head['ContentLength'], 'content_type': head.get('ContentType', '')}
+            
+            if not default_storage.exists(key):
+                return None
+            return {'size': default_storage.size(key), 'content_type': mimetypes.guess_type(key)[0] or ''}
+        except Exception:
+            return None
+    
+    @staticmethod
+    def open_file(url_or_key: str):
+        """Readable, seekable file with a stored object's content.
+        
+        S3 objects are streamed in (multipart ranges in parallel for large
+        ones) into a spooled file that moves to disk past
+        ``FILE_UPLOAD_MAX_MEMORY_SIZE``.
+        """
+        from django.conf import settings
+        
+        key = S3Storage.key_from_url(url_or_key)
+        if settings.DEBUG:
+            return default_storage.open(key)
+        
+        file = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        S3Storage.get_client().download_fileobj(
+            settings.AWS_STORAGE_BUCKET_NAME,
+            key,
+            file,
+            Config=S3Storage.transfer_config()
+        )
+        file.seek(0)
+        return file
+    
     @staticmethod
     def delete_file(key: str) -> bool:
         """Delete file from S3."""
         from django.conf import settings
-        import boto3
         
         try:
             if not settings.DEBUG:
-                s3_client = boto3.client(
-                    's3',
-                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                    region_name=settings.AWS_S3_REGION_NAME
-                )
-                
-                s3_client.delete_object(
+                S3Storage.get_client().delete_object(
                     Bucket=settings.AWS_STORAGE_BUCKET_NAME,
                     Key=key
                 )
@@ -141,4 +289,37 @@ class S3Storage:
             
             return True
         except Exception:
-            return False
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    def delete_files(keys: List[str]) -> List[str]:
+        """Delete many files with batched ``delete_objects`` calls.
+        
+        Returns the keys that could not be deleted.
+        """
+        from django.conf import settings
+        
+        failed = []
+        keys = list(dict.fromkeys(keys))
+        
+        if settings.DEBUG:
+            for key in keys:
+                try:
+                    default_storage.delete(key)
+                except Exception:
+                    failed.append(key)
+            return failed
+        
+        client = S3Storage.get_client()
+        for start in range(0, len(keys), S3Storage.DELETE_BATCH_SIZE):
+            batch = keys[start:start + S3Storage.DELETE_BATCH_SIZE]
+            try:
+                response = client.delete_objects(
+                    Bucket=settings.AWS_STORAGE_BUCKET_NAME,
+                    Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                )
+                failed.extend(error['Key'] for error in response.get('Errors', []))
+            except Exception:
+                failed.extend(batch)
+        
+        return failed
@@ -1,20 +1,99 @@
 import json
 import asyncio
+import secrets
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
 from try_on.models import TryOnSession
 from avatars.models import Avatar
 
 User = get_user_model()
 
+TICKET_PREFIX = 'websocket:ticket:'
+
+
+@database_sync_to_async
+def get_jwt_user(raw_token):
+    """User for a JWT access token, or AnonymousUser if it is not valid."""
+    try:
+        token = AccessToken(raw_token)
+        return User.objects.get(**{jwt_settings.USER_ID_FIELD: token[jwt_settings.USER_ID_CLAIM]})
+    except (TokenError, KeyError, User.DoesNotExist):
+        return AnonymousUser()
+
+
+def issue_ticket(user) -> str:
+    """A single-use ticket that authenticates ``user``'s next websocket.
+    
+    It stands in for the access token in the connect URL, which access
+    logs record; a logged ticket has been used or has expired.
+    """
+    ticket = secrets.token_urlsafe(32)
+    cache.set(f'{TICKET_PREFIX}{ticket}', user.pk, timeout=settings.WEBSOCKET_TICKET_TIMEOUT)
+    return ticket
+
+
+@database_sync_to_async
+def redeem_ticket(ticket):
+    """User a ticket was issued to, or AnonymousUser if unknown or used."""
+    key = f'{TICKET_PREFIX}{ticket}'
+    user_id = cache.get(key)
+    # Only the connection whose delete removed the key gets in
+    if user_id is None or not cache.delete(key):
+        return AnonymousUser()
+    try:
+        return User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Authenticate websocket connections for API users.
+    
+    Browsers cannot set headers on a websocket handshake, so they connect
+    with ``?ticket=`` from ``issue_ticket`` (the accounts ``ws-ticket``
+    endpoint) rather than the access token itself. Other clients may send
+    an ``Authorization: Bearer`` access token. ``scope['user']`` is set
+    either way.
+    """
+    
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        raw_token = self._token(scope)
+        if raw_token:
+            scope['user'] = await get_jwt_user(raw_token)
+        else:
+            ticket = self._ticket(scope)
+            scope['user'] = await redeem_ticket(ticket) if ticket else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+    
+    def _token(self, scope):
+        for name, value in scope.get('headers', []):
+            if name == b'authorization':
+                parts = value.decode('latin-1').split()
+                if len(parts) == 2 and parts[0].lower() == 'bearer':
+                    return parts[1]
+        return None
+    
+    def _ticket(self, scope):
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        return query.get('ticket', [None])[0]
+
 class TryOnConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.session_id = self.scope['url_route']['kwargs']['session_id']
         self.room_group_name = f'tryon_{self.session_id}'
         self.user = self.scope['user']
         
-        if self.user.is_anonymous:
+        if self.user.is_anonymous or not await self._owns_session():
             await self.close()
             return
         
@@ -145,6 +224,35 @@ class TryOnConsumer(AsyncWebsocketConsumer):
             'timestamp': event['timestamp']
         }))
 
+    async def tryon_progress(self, event):
+        # Per-layer progress from the background simulation job
+        await self.send(text_data=json.dumps({
+            'type': 'simulation_progress',
+            'stage': event['stage'],
+            'layer': event.get('layer'),
+            'completed_layers': event.get('completed_layers', 0),
+            'total_layers': event['total_layers'],
+            'result': event.get('result'),
+            'timestamp': self._get_timestamp()
+        }))
+
+    async def tryon_completed(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'simulation_completed',
+            'overall_fit_score': event['overall_fit_score'],
+            'confidence': event['confidence'],
+            'garment_results': event['garment_results'],
+            'processing_time_ms': event['processing_time_ms'],
+            'timestamp': self._get_timestamp()
+        }))
+
+    async def tryon_failed(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'simulation_failed',
+            'error': event['error'],
+            'timestamp': self._get_timestamp()
+        }))
+
     async def send_error(self, message):
         await self.send(text_data=json.dumps({
             'type': 'error',
@@ -156,6 +264,10 @@ class TryOnConsumer(AsyncWebsocketConsumer):
         from datetime import datetime
         return datetime.now().isoformat()
 
+    @database_sync_to_async
+    def _owns_session(self):
+        return TryOnSession.objects.filter(id=self.session_id, user=self.user).exists()
+
     @database_sync_to_async
     def _update_avatar(self, avatar_data):
         # Update avatar in database
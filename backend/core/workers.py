@@ -0,0 +1,20 @@
+from uvicorn.workers import UvicornWorker
+
+
+class MioraUvicornWorker(UvicornWorker):
+    """Gunicorn worker running ``core.asgi`` on uvicorn.
+    
+    uvloop and httptools for the event loop and HTTP parsing, websocket
+    pings so dead clients are dropped, and no lifespan protocol (Django
+    does not implement it).
+    """
+    
+    CONFIG_KWARGS = {
+        'loop': 'uvloop',
+        'http': 'httptools',
+        'ws': 'websockets',
+        'lifespan': 'off',
+        'ws_ping_interval': 20.0,
+        'ws_ping_timeout': 20.0,
+        'ws_max_size': 1024 * 1024,
+    }
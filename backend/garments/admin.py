@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Garment, GarmentProcessingLog, BrandSizeChart
+from .models import Garment, GarmentAsset, GarmentProcessingLog, BrandSizeChart
 
 @admin.register(Garment)
 class GarmentAdmin(admin.ModelAdmin):
@@ -8,6 +8,13 @@ class GarmentAdmin(admin.ModelAdmin):
     search_fields = ['name', 'brand', 'user__email']
     readonly_fields = ['id', 'created_at', 'updated_at']
 
+@admin.register(GarmentAsset)
+class GarmentAssetAdmin(admin.ModelAdmin):
+    list_display = ['content_hash', 'status', 'valid', 'ref_count', 'created_at']
+    list_filter = ['status', 'valid']
+    search_fields = ['content_hash']
+    readonly_fields = ['id', 'content_hash', 'ref_count', 'created_at', 'updated_at']
+
 @admin.register(BrandSizeChart)
 class BrandSizeChartAdmin(admin.ModelAdmin):
     list_display = ['brand', 'garment_type', 'gender', 'size_system']
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class GarmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'garments'
-    verbose_name = 'Garments'
\ No newline at end of file
+    verbose_name = 'Garments'
+
+    def ready(self):
+        import garments.signals  # noqa
\ No newline at end of file
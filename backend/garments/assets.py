@@ -0,0 +1,156 @@
+from datetime import timedelta
+import logging
+import uuid
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.utils import S3Storage
+from .models import GarmentAsset
+
+logger = logging.getLogger('miora.garments')
+
+# An asset left 'processing' this long is assumed abandoned by its worker
+PROCESSING_TIMEOUT = timedelta(minutes=30)
+
+
+def link(garment, content_hash: str) -> GarmentAsset:
+    """Attach ``garment`` to the asset for ``content_hash``, creating it if new.
+
+    Takes a reference on the asset. If it has already been processed its
+    artifacts and validation outcome are copied onto the garment.
+    """
+    with transaction.atomic():
+        while True:
+            asset, _ = GarmentAsset.objects.get_or_create(content_hash=content_hash)
+            # Zero rows means the last reference was released and the asset
+            # deleted in between; create it again
+            if GarmentAsset.objects.filter(pk=asset.pk).update(ref_count=F('ref_count') + 1):
+                break
+
+        type(garment).objects.filter(pk=garment.pk).update(asset=asset)
+        garment.asset = asset
+
+        if asset.status == 'completed':
+            sync(asset, garments=type(garment).objects.filter(pk=garment.pk),
+                 processing_status=asset.processing_status)
+            garment.refresh_from_db()
+
+    return asset
+
+
+def detach(garment) -> GarmentAsset:
+    """Move ``garment`` off a shared asset onto a new one of its own.
+
+    Reprocessing the new asset leaves the artifacts of other garments
+    sharing the image alone. A garment alone on its asset keeps it.
+    """
+    with transaction.atomic():
+        shared = GarmentAsset.objects.select_for_update().get(pk=garment.asset_id)
+        if shared.ref_count <= 1:
+            garment.asset = shared
+            return shared
+
+        # Not keyed by content, so later uploads still link to the shared one
+        asset = GarmentAsset.objects.create(content_hash=uuid.uuid4().hex, ref_count=1)
+        GarmentAsset.objects.filter(pk=shared.pk).update(ref_count=F('ref_count') - 1)
+        type(garment).objects.filter(pk=garment.pk).update(asset=asset)
+
+    garment.asset = asset
+    return asset
+
+
+def stalled():
+    """Assets whose processing outlived ``PROCESSING_TIMEOUT``."""
+    return GarmentAsset.objects.filter(
+        status='processing', updated_at__lt=timezone.now() - PROCESSING_TIMEOUT
+    )
+
+
+def acquire(asset: GarmentAsset, force: bool = False) -> bool:
+    """Claim the processing of ``asset``; False if another task holds it.
+
+    Pending and failed assets can be claimed, as can ones whose processing
+    stalled for ``PROCESSING_TIMEOUT``. ``force`` claims it regardless.
+    """
+    now = timezone.now()
+    assets = GarmentAsset.objects.filter(pk=asset.pk)
+    if not force:
+        assets = assets.filter(
+            Q(status__in=['pending', 'failed'])
+            | Q(status='processing', updated_at__lt=now - PROCESSING_TIMEOUT)
+        )
+    claimed = assets.update(status='processing', updated_at=now) > 0
+    if claimed:
+        asset.status = 'processing'
+        asset.updated_at = now
+    return claimed
+
+
+def sync(asset: GarmentAsset, garments=None, **fields) -> int:
+    """Copy the asset's artifacts onto its garments (all linked ones by default).
+
+    Raw uploads the processed image replaces are deleted once committed.
+    ``fields`` are further garment values to set, such as the status.
+    """
+    if garments is None:
+        garments = asset.garments.all()
+
+    replaced = []
+    if asset.processed_image_url:
+        replaced = [
+            S3Storage.key_from_url(url)
+            for url in garments.exclude(original_image_url=asset.processed_image_url)
+                               .values_list('original_image_url', flat=True)
+        ]
+        replaced = [key for key in replaced if key.startswith('uploads/')]
+
+    updated = garments.update(**asset.artifacts(), updated_at=timezone.now(), **fields)
+
+    if replaced:
+        transaction.on_commit(lambda: S3Storage.delete_files(replaced))
+    return updated
+
+
+def fail(asset: GarmentAsset, final: bool = True):
+    """Give up processing ``asset`` so another upload can claim it.
+
+    When ``final``, garments still waiting on it are marked failed too.
+    """
+    GarmentAsset.objects.filter(pk=asset.pk).update(status='failed', updated_at=timezone.now())
+    asset.status = 'failed'
+    if final:
+        asset.garments.filter(
+            processing_status__in=['pending', 'processing']
+        ).update(processing_status='failed', updated_at=timezone.now())
+
+
+def release(asset_id):
+    """Drop one reference; the last one deletes the asset and its files."""
+    with transaction.atomic():
+        asset = GarmentAsset.objects.select_for_update().filter(pk=asset_id).first()
+        if asset is None:
+            return
+
+        if asset.ref_count > 1:
+            GarmentAsset.objects.filter(pk=asset.pk).update(ref_count=F('ref_count') - 1)
+            return
+
+        keys = [
+            S3Storage.key_from_url(url)
+            for url in [asset.processed_image_url, asset.thumbnail_url, asset.model_3d_url,
+                        *asset.texture_urls, *_rendition_urls(asset.renditions)]
+            if url
+        ]
+        asset.delete()
+
+    if keys:
+        logger.info(f'Deleting {len(keys)} files of unreferenced asset {asset.content_hash}')
+        transaction.on_commit(lambda: S3Storage.delete_files(keys))
+
+
+def _rendition_urls(manifest):
+    for size in (manifest or {}).get('sizes', []):
+        for source in size.get('sources', {}).values():
+            yield source.get('url')
@@ -0,0 +1,184 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger('miora.garments')
+
+# Pixels analysed per image; larger images are sampled on a regular grid
+MAX_PIXELS = 64 * 1024
+
+# Histogram bin sizes in Lab units (L spans 0-100, a and b about +-128)
+L_BIN = 10.0
+AB_BIN = 16.0
+L_BINS = 11
+AB_BINS = 17
+
+# Palette entries closer than this (CIE76 delta E) are merged
+MERGE_DISTANCE = 12.0
+
+# A border ring at least this uniform is treated as background
+BACKGROUND_DISTANCE = 10.0
+BACKGROUND_SHARE = 0.6
+
+# Pixels with alpha below this are transparent
+ALPHA_THRESHOLD = 128
+
+# D65 white point and sRGB -> XYZ matrix
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+
+
+@dataclass
+class PaletteColor:
+    """One palette entry; ``share`` is its fraction of garment pixels."""
+    rgb: Tuple[int, int, int]
+    lab: Tuple[float, float, float]
+    share: float
+
+    @property
+    def hex(self) -> str:
+        return '#{:02x}{:02x}{:02x}'.format(*self.rgb)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'hex': self.hex,
+            'rgb': list(self.rgb),
+            'lab': [round(value, 1) for value in self.lab],
+            'share': round(self.share, 4),
+        }
+
+
+def rgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """Convert ``(..., 3)`` uint8 sRGB to CIE Lab (D65)."""
+    rgb = rgb.astype(np.float32) / 255.0
+    linear = np.where(rgb > 0.04045, ((rgb + 0.055) / 1.055) ** 2.4, rgb / 12.92)
+    xyz = linear @ _RGB_TO_XYZ.T.astype(np.float32) / _WHITE.astype(np.float32)
+
+    epsilon, kappa = 216 / 24389, 24389 / 27
+    f = np.where(xyz > epsilon, np.cbrt(xyz), (kappa * xyz + 16) / 116)
+
+    lab = np.empty_like(f)
+    lab[..., 0] = 116 * f[..., 1] - 16
+    lab[..., 1] = 500 * (f[..., 0] - f[..., 1])
+    lab[..., 2] = 200 * (f[..., 1] - f[..., 2])
+    return lab
+
+
+def sample_pixels(image: Image.Image, max_pixels: int = MAX_PIXELS) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """RGB pixels on a regular grid of at most ``max_pixels``, and their alpha.
+
+    Nearest-neighbour sampling keeps real garment colors instead of the
+    blends a smoothing resize creates at edges. Returns ``(H, W, 3)``
+    uint8 and ``(H, W)`` alpha, or ``None`` when the image is opaque.
+    """
+    width, height = image.size
+    scale = min(1.0, (max_pixels / float(width * height)) ** 0.5)
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    if size != image.size:
+        image = image.resize(size, Image.Resampling.NEAREST)
+
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    if has_alpha:
+        rgba = np.asarray(image.convert('RGBA'))
+        return rgba[..., :3], rgba[..., 3]
+    return np.asarray(image.convert('RGB')), None
+
+
+def background_mask(lab: np.ndarray) -> Optional[np.ndarray]:
+    """Pixels matching a uniform border color, or ``None`` if there is none.
+
+    Product photos are usually shot on a plain backdrop that touches every
+    edge; a busy border (a cropped garment or lifestyle shot) is left alone.
+    """
+    if lab.shape[0] < 3 or lab.shape[1] < 3:
+        return None
+
+    border = np.concatenate([lab[0], lab[-1], lab[1:-1, 0], lab[1:-1, -1]])
+    background = np.median(border, axis=0)
+    close = np.linalg.norm(border - background, axis=1) < BACKGROUND_DISTANCE
+    if close.mean() < BACKGROUND_SHARE:
+        return None
+
+    return np.linalg.norm(lab - background, axis=-1) < BACKGROUND_DISTANCE
+
+
+def quantize(lab: np.ndarray, rgb: np.ndarray, max_colors: int) -> List[PaletteColor]:
+    """Rank colors with a Lab histogram, then merge perceptually close bins.
+
+    ``lab`` and ``rgb`` are ``(N, 3)``. Each bin reports its pixels' mean
+    color, so the palette holds colors that occur in the image rather than
+    bin centres.
+    """
+    total = lab.shape[0]
+    l_index = np.clip((lab[:, 0] / L_BIN).astype(np.int32), 0, L_BINS - 1)
+    a_index = np.clip(((lab[:, 1] + 128) / AB_BIN).astype(np.int32), 0, AB_BINS - 1)
+    b_index = np.clip(((lab[:, 2] + 128) / AB_BIN).astype(np.int32), 0, AB_BINS - 1)
+    bins = (l_index * AB_BINS + a_index) * AB_BINS + b_index
+
+    occupied, inverse, counts = np.unique(bins, return_inverse=True, return_counts=True)
+    sums_lab = np.stack([np.bincount(inverse, weights=lab[:, i]) for i in range(3)], axis=1)
+    sums_rgb = np.stack([np.bincount(inverse, weights=rgb[:, i]) for i in range(3)], axis=1)
+
+    # Greedy merge, largest bins first: a bin joins the first cluster whose
+    # current mean is within MERGE_DISTANCE, otherwise it starts one.
+    cluster_counts = np.zeros(len(occupied))
+    cluster_lab = np.zeros((len(occupied), 3))
+    cluster_rgb = np.zeros((len(occupied), 3))
+    means = np.zeros((len(occupied), 3))
+    clusters = 0
+    for index in np.argsort(-counts, kind='stable'):
+        mean = sums_lab[index] / counts[index]
+        distances = np.linalg.norm(means[:clusters] - mean, axis=1)
+        close = np.flatnonzero(distances < MERGE_DISTANCE)
+        if close.size:
+            target = close[0]
+        else:
+            target = clusters
+            clusters += 1
+        cluster_counts[target] += counts[index]
+        cluster_lab[target] += sums_lab[index]
+        cluster_rgb[target] += sums_rgb[index]
+        means[target] = cluster_lab[target] / cluster_counts[target]
+
+    ranked = np.argsort(-cluster_counts[:clusters], kind='stable')[:max_colors]
+    return [
+        PaletteColor(
+            rgb=tuple(int(round(value)) for value in cluster_rgb[i] / cluster_counts[i]),
+            lab=tuple(float(value) for value in means[i]),
+            share=float(cluster_counts[i] / total),
+        )
+        for i in ranked
+    ]
+
+
+def extract_palette(image: Image.Image, max_colors: int = 8,
+                    max_pixels: int = MAX_PIXELS) -> List[PaletteColor]:
+    """Garment colors of ``image``, most common first.
+
+    Transparent pixels and a uniform background touching the border are
+    ignored; if that would leave almost nothing, every pixel is used.
+    """
+    rgb, alpha = sample_pixels(image, max_pixels)
+    lab = rgb_to_lab(rgb)
+
+    keep = np.ones(rgb.shape[:2], dtype=bool)
+    if alpha is not None:
+        keep &= alpha >= ALPHA_THRESHOLD
+
+    background = background_mask(lab) if alpha is None else None
+    if background is not None and (keep & ~background).mean() >= 0.02:
+        keep &= ~background
+
+    if not keep.any():
+        keep[:] = True
+
+    return quantize(lab[keep], rgb[keep].astype(np.float64), max_colors)
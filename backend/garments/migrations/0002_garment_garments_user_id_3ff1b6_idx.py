@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("garments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="garment",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="garments_user_id_3ff1b6_idx"
+            ),
+        ),
+    ]
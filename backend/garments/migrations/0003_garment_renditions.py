@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("garments", "0002_garment_garments_user_id_3ff1b6_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garment",
+            name="renditions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("garments", "0003_garment_renditions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GarmentAsset",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("content_hash", models.CharField(max_length=64, unique=True)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("processing", "Processing"),
+                            ("completed", "Completed"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=50,
+                    ),
+                ),
+                ("ref_count", models.PositiveIntegerField(default=0)),
+                ("processed_image_url", models.URLField(blank=True, max_length=500)),
+                ("thumbnail_url", models.URLField(blank=True, max_length=500)),
+                ("renditions", models.JSONField(blank=True, default=dict)),
+                ("model_3d_url", models.URLField(blank=True, max_length=500)),
+                ("texture_urls", models.JSONField(blank=True, default=list)),
+                ("features", models.JSONField(blank=True, default=dict)),
+                ("material_properties", models.JSONField(blank=True, default=dict)),
+                ("color", models.CharField(blank=True, max_length=50)),
+                ("pattern", models.CharField(blank=True, max_length=50)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "garment_assets",
+            },
+        ),
+        migrations.AddField(
+            model_name="garment",
+            name="asset",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="garments",
+                to="garments.garmentasset",
+            ),
+        ),
+    ]
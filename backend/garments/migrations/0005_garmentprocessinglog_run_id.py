@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("garments", "0004_garmentasset"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garmentprocessinglog",
+            name="run_id",
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name="garmentprocessinglog",
+            name="processing_step",
+            field=models.CharField(
+                choices=[
+                    ("upload", "Upload"),
+                    ("image_processing", "Image Processing"),
+                    ("thumbnail", "Thumbnail"),
+                    ("color_extraction", "Color Extraction"),
+                    ("feature_detection", "Feature Detection"),
+                    ("3d_generation", "3D Generation"),
+                    ("validation", "Validation"),
+                ],
+                max_length=50,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="garmentprocessinglog",
+            index=models.Index(
+                fields=["garment", "run_id"], name="garment_pro_garment_becbcf_idx"
+            ),
+        ),
+    ]
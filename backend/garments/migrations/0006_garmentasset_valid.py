@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("garments", "0005_garmentprocessinglog_run_id"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garmentasset",
+            name="valid",
+            field=models.BooleanField(default=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("garments", "0006_garmentasset_valid"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="garment",
+            name="processing_status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("completed", "Completed"),
+                    ("needs_review", "Needs Review"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=50,
+            ),
+        ),
+    ]
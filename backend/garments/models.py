@@ -4,6 +4,74 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
 
+class GarmentAsset(models.Model):
+    """Processed artifacts of one uploaded image, keyed by its content hash.
+
+    Every garment created from the same image bytes links here instead of
+    reprocessing it. ``ref_count`` counts the linked garments; the asset
+    and its stored files are deleted when the last one goes.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    content_hash = models.CharField(max_length=64, unique=True)  # SHA256 of the uploaded bytes
+    status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='pending')
+    valid = models.BooleanField(default=True)  # Whether the 3D model passed validation
+    ref_count = models.PositiveIntegerField(default=0)
+    
+    # Artifacts copied onto linked garments
+    processed_image_url = models.URLField(max_length=500, blank=True)
+    thumbnail_url = models.URLField(max_length=500, blank=True)
+    renditions = models.JSONField(default=dict, blank=True)
+    model_3d_url = models.URLField(max_length=500, blank=True)
+    texture_urls = models.JSONField(default=list, blank=True)
+    features = models.JSONField(default=dict, blank=True)
+    material_properties = models.JSONField(default=dict, blank=True)
+    color = models.CharField(max_length=50, blank=True)
+    pattern = models.CharField(max_length=50, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'garment_assets'
+    
+    @property
+    def base_path(self):
+        """Storage prefix of the artifacts, shared by all linked garments."""
+        return f'garments/assets/{self.content_hash}'
+    
+    @property
+    def processing_status(self):
+        """Status of the garments sharing a completed asset."""
+        # Models failing validation are kept but flagged for review
+        return 'completed' if self.valid else 'needs_review'
+    
+    def artifacts(self):
+        """Garment field values for the artifacts produced so far."""
+        values = {
+            'thumbnail_url': self.thumbnail_url,
+            'renditions': self.renditions,
+            'model_3d_url': self.model_3d_url,
+            'texture_urls': self.texture_urls,
+            'features': self.features,
+            'material_properties': self.material_properties,
+            'color': self.color,
+            'pattern': self.pattern,
+        }
+        if self.processed_image_url:
+            values['original_image_url'] = self.processed_image_url
+        return values
+    
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.status}, {self.ref_count} refs)"
+
+
 class Garment(models.Model):
     CATEGORY_CHOICES = [
         ('shirt', 'Shirt'),
@@ -32,6 +100,7 @@ class Garment(models.Model):
         ('pending', 'Pending'),
         ('processing', 'Processing'),
         ('completed', 'Completed'),
+        ('needs_review', 'Needs Review'),
         ('failed', 'Failed'),
     ]
     
@@ -47,9 +116,12 @@ class Garment(models.Model):
     original_image_url = models.URLField(max_length=500)
     cleaned_image_url = models.URLField(max_length=500, blank=True)  # Background removed
     thumbnail_url = models.URLField(max_length=500, blank=True)
+    renditions = models.JSONField(default=dict, blank=True)  # Responsive sizes (core.renditions)
     model_3d_url = models.URLField(max_length=500, blank=True)
     texture_urls = models.JSONField(default=list, blank=True)
     features = models.JSONField(default=dict, blank=True)  # AI-detected features
+    # Shared processed artifacts of the uploaded image (see garments.assets)
+    asset = models.ForeignKey(GarmentAsset, on_delete=models.SET_NULL, null=True, blank=True, related_name='garments')
     
     # Garment metadata
     source_url = models.URLField(max_length=500, blank=True)
@@ -74,6 +146,8 @@ class Garment(models.Model):
             models.Index(fields=['user']),
             models.Index(fields=['category']),
             models.Index(fields=['processing_status']),
+            # Keyset pagination of a user's wardrobe
+            models.Index(fields=['user', '-created_at', '-id']),
         ]
     
     @property
@@ -89,6 +163,9 @@ class GarmentProcessingLog(models.Model):
     PROCESSING_STEP_CHOICES = [
         ('upload', 'Upload'),
         ('image_processing', 'Image Processing'),
+        ('thumbnail', 'Thumbnail'),
+        ('color_extraction', 'Color Extraction'),
+        ('feature_detection', 'Feature Detection'),
         ('3d_generation', '3D Generation'),
         ('validation', 'Validation'),
     ]
@@ -105,11 +182,15 @@ class GarmentProcessingLog(models.Model):
     status = models.CharField(max_length=50, choices=STATUS_CHOICES)
     processing_time_ms = models.IntegerField(null=True, blank=True)
     error_message = models.TextField(blank=True)
-    metadata = models.JSONField(default=dict, blank=True)
+    metadata = models.JSONField(default=dict, blank=True)  # Stage output, the checkpoint of a run
+    run_id = models.UUIDField(null=True, blank=True)  # Pipeline run the stage belongs to
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'garment_processing_logs'
+        indexes = [
+            models.Index(fields=['garment', 'run_id']),
+        ]
 
 
 class BrandSizeChart(models.Model):
@@ -0,0 +1,195 @@
+from typing import Any, Dict, Optional
+import logging
+import threading
+
+from core import dag, renditions
+from core.images import ImageSource
+from core.utils import S3Storage
+from .models import GarmentProcessingLog
+from . import assets
+from .services import GarmentProcessingService
+
+logger = logging.getLogger('miora.garments')
+
+# Stages of one garment run at most this many at a time
+MAX_WORKERS = 4
+
+
+class GarmentRun:
+    """State shared by the stages of one run of the garment pipeline.
+
+    Stages only compute and write to storage; the database is left to the
+    checkpoint store on the calling thread. Images are opened once per run
+    and shared: the processed image produced by ``image_processing`` is
+    handed to later stages in memory, or re-opened from its checkpointed
+    URL when a retry resumes after that stage.
+    """
+
+    def __init__(self, garment, base_path: str, image_data: Optional[bytes] = None):
+        self.category = garment.category
+        self.metadata = {'brand': garment.brand, 'size_chart': garment.size_chart}
+        self.source_url = garment.original_image_url
+        self.base_path = base_path
+        self.service = GarmentProcessingService()
+        self._image_data = image_data
+        self._images: Dict[str, ImageSource] = {}
+        self._lock = threading.Lock()
+
+    def source(self) -> ImageSource:
+        """The uploaded image."""
+        if self._image_data is None:
+            with S3Storage.open_file(self.source_url) as image_file:
+                self._image_data = image_file.read()
+        return ImageSource.open(self._image_data)
+
+    def image(self, url: str) -> ImageSource:
+        """A stored image, downloaded once however many stages ask for it."""
+        with self._lock:
+            image = self._images.get(url)
+            if image is None:
+                with S3Storage.open_file(url) as image_file:
+                    image = self._images[url] = ImageSource.open(image_file)
+            return image
+
+    def remember(self, url: str, image: ImageSource):
+        """Register an image this run stored at ``url``."""
+        with self._lock:
+            self._images[url] = image
+
+
+def process_image(run: GarmentRun, inputs) -> Dict[str, Any]:
+    processed = run.service.remove_background(run.source())
+    url = S3Storage.upload_file(
+        run.service.encode_processed(processed), f'{run.base_path}/processed.jpg', 'image/jpeg'
+    )
+    run.remember(url, processed)
+    return {'processed_image_url': url}
+
+
+def create_thumbnail(run: GarmentRun, inputs) -> Dict[str, Any]:
+    processed = run.image(inputs['image_processing']['processed_image_url'])
+    image_renditions = renditions.render(processed)
+    urls = S3Storage.upload_files([
+        (run.service.create_thumbnail(processed), f'{run.base_path}/thumbnail.jpg', 'image/jpeg'),
+    ] + renditions.upload_items(image_renditions, run.base_path))
+    return {
+        'thumbnail_url': urls[0],
+        'renditions': renditions.build_manifest(image_renditions, urls[1:]),
+    }
+
+
+def extract_colors(run: GarmentRun, inputs) -> Dict[str, Any]:
+    return run.service.extract_colors(run.image(inputs['image_processing']['processed_image_url']))
+
+
+def detect_features(run: GarmentRun, inputs) -> Dict[str, Any]:
+    return run.service.detect_features(run.image(inputs['image_processing']['processed_image_url']))
+
+
+def generate_3d_model(run: GarmentRun, inputs) -> Dict[str, Any]:
+    processed = run.image(inputs['image_processing']['processed_image_url'])
+    result = run.service.generate_3d_model(
+        processed.fit(run.service.PROCESSED_SIZE), category=run.category, metadata=run.metadata
+    )
+    if not result['success']:
+        raise Exception(result.get('error', '3D generation failed'))
+
+    # Save 3D model and textures, uploaded in parallel
+    uploads = [(result['model_data'], f'{run.base_path}/model.glb', 'model/gltf-binary')]
+    for idx, texture_data in enumerate(result.get('textures', [])):
+        uploads.append((texture_data, f'{run.base_path}/texture_{idx}.png', 'image/png'))
+    urls = S3Storage.upload_files(uploads)
+
+    return {
+        'model_3d_url': urls[0],
+        'texture_urls': urls[1:],
+        'material_properties': result.get('material_properties', {}),
+        'vertices': result.get('vertex_count', 0),
+    }
+
+
+def validate_model(run: GarmentRun, inputs) -> Dict[str, Any]:
+    return run.service.validate_model(inputs['3d_generation']['model_3d_url'])
+
+
+# Everything after image_processing only needs the processed image, so
+# thumbnails, colors, features and the 3D model are produced in parallel
+GARMENT_PIPELINE = dag.DAG([
+    dag.Stage('image_processing', process_image),
+    dag.Stage('thumbnail', create_thumbnail, ('image_processing',)),
+    dag.Stage('color_extraction', extract_colors, ('image_processing',)),
+    dag.Stage('feature_detection', detect_features, ('image_processing',)),
+    dag.Stage('3d_generation', generate_3d_model, ('image_processing',)),
+    dag.Stage('validation', validate_model, ('3d_generation',)),
+])
+
+
+class LogCheckpointStore(dag.CheckpointStore):
+    """Checkpoints kept as the ``GarmentProcessingLog`` rows of one run.
+
+    Each stage gets a log; a completed one stores the stage output in
+    ``metadata``, which a retry of the same ``run_id`` restores.
+    """
+
+    def __init__(self, garment, run_id):
+        self.garment = garment
+        self.run_id = run_id
+        self.logs: Dict[str, GarmentProcessingLog] = {}
+
+    def load(self):
+        logs = GarmentProcessingLog.objects.filter(
+            garment=self.garment, run_id=self.run_id, status='completed'
+        )
+        return {log.processing_step: log.metadata for log in logs}
+
+    def started(self, stage):
+        self.logs[stage] = GarmentProcessingLog.objects.create(
+            garment=self.garment,
+            processing_step=stage,
+            status='started',
+            run_id=self.run_id
+        )
+
+    def completed(self, stage, output, elapsed_ms):
+        log = self.logs.pop(stage)
+        log.status = 'completed'
+        log.processing_time_ms = elapsed_ms
+        log.metadata = output
+        log.save()
+
+    def failed(self, stage, error, elapsed_ms):
+        log = self.logs.pop(stage)
+        log.status = 'failed'
+        log.processing_time_ms = elapsed_ms
+        log.error_message = str(error)
+        log.save()
+
+
+def run(garment, run_id, image_data: Optional[bytes] = None) -> Dict[str, Dict[str, Any]]:
+    """Run (or resume) the pipeline for ``garment`` into its shared asset."""
+    context = GarmentRun(garment, garment.asset.base_path, image_data)
+    return dag.execute(
+        GARMENT_PIPELINE, context, LogCheckpointStore(garment, run_id), max_workers=MAX_WORKERS
+    )
+
+
+def publish(asset, outputs: Dict[str, Dict[str, Any]]):
+    """Store a run's outputs on ``asset`` and every garment sharing it."""
+    colors = outputs['color_extraction']
+    features = outputs['feature_detection']
+    model = outputs['3d_generation']
+
+    asset.processed_image_url = outputs['image_processing']['processed_image_url']
+    asset.thumbnail_url = outputs['thumbnail']['thumbnail_url']
+    asset.renditions = outputs['thumbnail']['renditions']
+    asset.color = colors.get('dominant_color', '')
+    asset.pattern = features.get('pattern', '')
+    asset.features = {**(asset.features or {}), **features, 'palette': colors.get('palette', [])}
+    asset.model_3d_url = model['model_3d_url']
+    asset.texture_urls = model['texture_urls']
+    asset.material_properties = model['material_properties']
+    asset.valid = outputs['validation'].get('valid', True)
+    asset.status = 'completed'
+    asset.save()
+
+    assets.sync(asset, processing_status=asset.processing_status)
@@ -1,17 +1,22 @@
 from rest_framework import serializers
 from .models import Garment, GarmentProcessingLog, BrandSizeChart
 from django.conf import settings
+from core.renditions import RenditionField
+from core.uploads import validate_upload_key
 
 
 class GarmentSerializer(serializers.ModelSerializer):
     """Serializer for garment details."""
     processing_logs = serializers.SerializerMethodField()
+    # Smallest adequate rendition for the client (see RenditionField)
+    image = RenditionField()
     
     class Meta:
         model = Garment
         fields = '__all__'
         read_only_fields = ('id', 'user', 'created_at', 'updated_at', 
-                           'thumbnail_url', 'model_3d_url', 'texture_urls')
+                           'thumbnail_url', 'renditions', 'model_3d_url', 'texture_urls',
+                           'asset')
     
     def get_processing_logs(self, obj):
         # Only include logs if requested
@@ -51,7 +56,9 @@ class GarmentUploadSerializer(serializers.Serializer):
     """Serializer for garment upload."""
     name = serializers.CharField(max_length=200)
     category = serializers.ChoiceField(choices=Garment.CATEGORY_CHOICES)
-    image = serializers.ImageField()
+    image = serializers.ImageField(required=False)
+    # Key of an image uploaded directly to storage (see ``upload_url``)
+    image_key = serializers.CharField(max_length=255, required=False)
     brand = serializers.CharField(max_length=100, required=False, allow_blank=True)
     source_url = serializers.URLField(required=False, allow_blank=True)
     price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
@@ -75,6 +82,14 @@ class GarmentUploadSerializer(serializers.Serializer):
             )
         
         return value
+    
+    def validate_image_key(self, value):
+        return validate_upload_key(self.context['request'].user, 'garments', value)
+    
+    def validate(self, data):
+        if ('image' in data) == ('image_key' in data):
+            raise serializers.ValidationError("Provide either an image or an image_key.")
+        return data
 
 
 class GarmentProcessingLogSerializer(serializers.ModelSerializer):
@@ -1,9 +1,12 @@
 import numpy as np
 from PIL import Image
 import cv2
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 import logging
 import io
+from core.images import ImageSource
+from core import renditions
+from .colors import MAX_PIXELS, extract_palette
 
 logger = logging.getLogger('miora.garments')
 
@@ -11,26 +14,37 @@ logger = logging.getLogger('miora.garments')
 class GarmentProcessingService:
     """Service for processing garment images and generating 3D models."""
     
-    def process_image(self, image: Image.Image) -> Dict[str, Any]:
-        """Process garment image."""
+    # Bounding box of the stored processed image
+    PROCESSED_SIZE = (1920, 1920)
+    THUMBNAIL_SIZE = (300, 300)
+    
+    def process_image(self, image: Union[Image.Image, ImageSource]) -> Dict[str, Any]:
+        """Process garment image.
+        
+        Given an ``ImageSource``, every stage decodes the image only at the
+        resolution it works at, sharing decoded levels with the others.
+        """
         try:
+            source = self._as_source(image)
+            
             # Remove background
-            processed_image = self._remove_background(image)
+            processed = self.remove_background(source)
             
             # Extract metadata
-            metadata = self._extract_metadata(processed_image)
+            metadata = self._extract_metadata(processed)
             
-            # Generate thumbnail
-            thumbnail = self._create_thumbnail(processed_image)
+            # Generate thumbnail and responsive renditions
+            thumbnail_bytes = self.create_thumbnail(processed)
+            image_renditions = renditions.render(processed)
             
             # Convert to bytes
-            processed_bytes = self._image_to_bytes(processed_image, 'JPEG')
-            thumbnail_bytes = self._image_to_bytes(thumbnail, 'JPEG')
+            processed_bytes = self.encode_processed(processed)
             
             return {
                 'success': True,
                 'processed_image': processed_bytes,
                 'thumbnail': thumbnail_bytes,
+                'renditions': image_renditions,
                 'metadata': metadata
             }
             
@@ -95,45 +109,64 @@ class GarmentProcessingService:
             logger.error(f'Model validation error: {str(e)}')
             return {'valid': False, 'errors': [str(e)]}
     
-    def _remove_background(self, image: Image.Image) -> Image.Image:
+    @staticmethod
+    def _as_source(image: Union[Image.Image, ImageSource]) -> ImageSource:
+        return image if isinstance(image, ImageSource) else ImageSource.from_image(image)
+    
+    def remove_background(self, image: Union[Image.Image, ImageSource]) -> ImageSource:
         """Remove background from image."""
         # Placeholder - integrate with background removal model
-        # Could use rembg or similar
-        return image
+        # Could use rembg or similar; wrap its output with ImageSource.from_image
+        return self._as_source(image)
     
-    def _extract_metadata(self, image: Image.Image) -> Dict[str, Any]:
-        """Extract metadata from image."""
-        # Convert to numpy array
-        img_array = np.array(image)
+    def encode_processed(self, image: Union[Image.Image, ImageSource]) -> bytes:
+        """The stored processed image: JPEG within ``PROCESSED_SIZE``."""
+        return self._image_to_bytes(self._as_source(image).fit(self.PROCESSED_SIZE), 'JPEG')
+    
+    def create_thumbnail(self, image: Union[Image.Image, ImageSource]) -> bytes:
+        """JPEG thumbnail within ``THUMBNAIL_SIZE``."""
+        return self._image_to_bytes(self._create_thumbnail(image, self.THUMBNAIL_SIZE), 'JPEG')
+    
+    def extract_colors(self, image: Union[Image.Image, ImageSource]) -> Dict[str, Any]:
+        """Dominant color and ranked palette of the garment."""
+        source = self._as_source(image)
         
-        # Get dominant colors (simplified)
-        pixels = img_array.reshape(-1, 3)
-        # K-means clustering for dominant colors
-        from sklearn.cluster import KMeans
-        kmeans = KMeans(n_clusters=3, random_state=42)
-        kmeans.fit(pixels)
-        dominant_colors = kmeans.cluster_centers_.astype(int)
+        # Ranked garment palette from a sampled, background-masked pixel set
+        palette = extract_palette(source.fit_pixels(MAX_PIXELS, Image.Resampling.NEAREST))
         
-        # Convert to hex
-        dominant_color = '#{:02x}{:02x}{:02x}'.format(*dominant_colors[0])
+        return {
+            'dominant_color': palette[0].hex if palette else '',
+            'palette': [color.to_dict() for color in palette],
+        }
+    
+    def detect_features(self, image: Union[Image.Image, ImageSource]) -> Dict[str, Any]:
+        """Shape features of the garment image."""
+        # Placeholder - integrate with a garment attribute model (pattern, sleeves, ...)
+        source = self._as_source(image)
         
         return {
-            'dominant_color': dominant_color,
-            'width': image.width,
-            'height': image.height,
-            'aspect_ratio': round(image.width / image.height, 2)
+            'width': source.width,
+            'height': source.height,
+            'aspect_ratio': round(source.width / source.height, 2)
         }
     
-    def _create_thumbnail(self, image: Image.Image, size=(300, 300)) -> Image.Image:
+    def _extract_metadata(self, image: Union[Image.Image, ImageSource]) -> Dict[str, Any]:
+        """Extract metadata from image."""
+        return {**self.extract_colors(image), **self.detect_features(image)}
+    
+    def _create_thumbnail(self, image: Union[Image.Image, ImageSource], size=(300, 300)) -> Image.Image:
         """Create thumbnail."""
-        thumbnail = image.copy()
-        thumbnail.thumbnail(size, Image.Resampling.LANCZOS)
-        return thumbnail
+        return self._as_source(image).fit(size)
     
-    def _image_to_bytes(self, image: Image.Image, format: str = 'PNG') -> bytes:
+    def _image_to_bytes(self, image: Image.Image, format: str = 'PNG', quality: int = 85) -> bytes:
         """Convert image to bytes."""
         buffer = io.BytesIO()
-        image.save(buffer, format=format, quality=95 if format == 'JPEG' else None)
+        if format == 'JPEG':
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.save(buffer, format=format, quality=quality, optimize=True)
+        else:
+            image.save(buffer, format=format)
         return buffer.getvalue()
     
     def _generate_mesh(self, image: np.ndarray, category: str) -> bytes:
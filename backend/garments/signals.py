@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import BrandSizeChart, Garment
+from . import assets
+from .size_charts import brand_size_charts
+
+
+@receiver(post_save, sender=BrandSizeChart)
+@receiver(post_delete, sender=BrandSizeChart)
+def invalidate_brand_size_charts(sender, instance, **kwargs):
+    """Reload every worker's index, this one's included, once committed.
+
+    Clearing it at once would reload the uncommitted charts inside this
+    transaction and keep serving them if it rolls back.
+    """
+    transaction.on_commit(brand_size_charts.bump)
+
+
+@receiver(post_delete, sender=Garment)
+def release_garment_asset(sender, instance, **kwargs):
+    """Drop the garment's reference to its shared processed artifacts."""
+    if instance.asset_id:
+        assets.release(instance.asset_id)
@@ -0,0 +1,161 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+import threading
+import time
+import uuid
+import logging
+import numpy as np
+
+from django.core.cache import caches
+
+logger = logging.getLogger('miora.garments')
+
+
+@dataclass(frozen=True)
+class ParsedSizeChart:
+    """A brand size chart parsed into a ``(sizes, fields)`` float array."""
+    brand: str
+    garment_type: str
+    gender: str
+    size_system: str
+    sizes: Tuple[str, ...]
+    fields: Tuple[str, ...]
+    values: np.ndarray
+
+    @classmethod
+    def parse(cls, brand, garment_type, gender, size_system, size_data) -> 'ParsedSizeChart':
+        size_data = size_data if isinstance(size_data, dict) else {}
+        sizes = tuple(size_data)
+        fields = {}
+        for row in size_data.values():
+            for field in (row if isinstance(row, dict) else {}):
+                fields.setdefault(field, None)
+        fields = tuple(fields)
+
+        values = np.full((len(sizes), len(fields)), np.nan, dtype=np.float64)
+        for s, size in enumerate(sizes):
+            row = size_data[size] if isinstance(size_data[size], dict) else {}
+            for f, field in enumerate(fields):
+                try:
+                    values[s, f] = float(row[field])
+                except (KeyError, TypeError, ValueError):
+                    pass
+        values.setflags(write=False)
+
+        return cls(brand, garment_type, gender or '', size_system, sizes, fields, values)
+
+    def __contains__(self, size) -> bool:
+        return size in self.sizes
+
+    def measurements(self, size: str) -> Optional[Dict[str, float]]:
+        """``{field: value}`` for one size, or None if the chart lacks it."""
+        try:
+            row = self.values[self.sizes.index(size)]
+        except ValueError:
+            return None
+        return {
+            field: float(value)
+            for field, value in zip(self.fields, row)
+            if not np.isnan(value)
+        }
+
+
+class BrandSizeChartIndex:
+    """Per-process index of every ``BrandSizeChart``.
+
+    Loaded lazily on first use and reloaded whenever the shared version key
+    in the cache (Redis) differs from the one it was loaded at.
+    ``BrandSizeChart`` saves and deletes bump that key. The key is read at
+    most once per ``check_interval`` seconds, so a bulk recommendation
+    costs one cache round trip rather than one per lookup. Other workers
+    pick up a change within that interval; the worker that made it drops
+    its index at once. If the version cannot be read (no cache) the index
+    is reloaded once per interval rather than served stale indefinitely.
+    """
+
+    VERSION_KEY = 'garments:brand_size_charts:version'
+    CHECK_INTERVAL = 5.0
+
+    def __init__(self, alias: str = 'default', check_interval: Optional[float] = None):
+        self.alias = alias
+        self.check_interval = self.CHECK_INTERVAL if check_interval is None else check_interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = None
+        self._charts: Dict[Tuple[str, str, str, str], ParsedSizeChart] = {}
+        self._by_garment: Dict[Tuple[str, str, str], Optional[ParsedSizeChart]] = {}
+
+    def get(self, brand: str, garment_type: str, gender: str = '',
+            size_system: Optional[str] = None) -> Optional[ParsedSizeChart]:
+        """Chart for a brand/type/gender.
+
+        Without ``size_system`` this only answers when the brand has a
+        single chart for that garment type and gender.
+        """
+        self._ensure_current()
+        if size_system is not None:
+            return self._charts.get((brand, garment_type, gender or '', size_system))
+        return self._by_garment.get((brand, garment_type, gender or ''))
+
+    def bump(self):
+        """Invalidate this process' index and every other worker's."""
+        self.clear()
+        try:
+            caches[self.alias].set(self.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        except Exception as e:
+            logger.warning(f'Could not bump brand size chart version: {str(e)}')
+
+    def clear(self):
+        """Drop the loaded charts of this process only."""
+        with self._lock:
+            self._version = None
+            self._checked_at = None
+            self._charts = {}
+            self._by_garment = {}
+
+    def _current_version(self) -> Optional[str]:
+        cache = caches[self.alias]
+        try:
+            version = cache.get(self.VERSION_KEY)
+            if version is None:
+                # First reader (or the key was evicted): agree on a new one.
+                cache.add(self.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+                version = cache.get(self.VERSION_KEY)
+            return version
+        except Exception as e:
+            logger.warning(f'Brand size chart version unavailable: {str(e)}')
+            return None
+
+    def _ensure_current(self):
+        checked_at = self._checked_at
+        if checked_at is not None and time.monotonic() - checked_at < self.check_interval:
+            return
+
+        version = self._current_version()
+        with self._lock:
+            if version is None or version != self._version or self._checked_at is None:
+                self._load(version)
+            self._checked_at = time.monotonic()
+
+    def _load(self, version):
+        from .models import BrandSizeChart
+
+        charts = {}
+        by_garment = {}
+        rows = BrandSizeChart.objects.values_list(
+            'brand', 'garment_type', 'gender', 'size_system', 'size_data'
+        )
+        for brand, garment_type, gender, size_system, size_data in rows:
+            chart = ParsedSizeChart.parse(brand, garment_type, gender, size_system, size_data)
+            charts[(chart.brand, chart.garment_type, chart.gender, chart.size_system)] = chart
+
+            # Several size systems for one garment make the short key ambiguous
+            key = (chart.brand, chart.garment_type, chart.gender)
+            by_garment[key] = None if key in by_garment else chart
+
+        self._charts = charts
+        self._by_garment = by_garment
+        self._version = version
+
+
+brand_size_charts = BrandSizeChartIndex()
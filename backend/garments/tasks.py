@@ -1,81 +1,76 @@
 from celery import shared_task
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 import time
+import uuid
 import logging
-from PIL import Image
-import io
 from .models import Garment, GarmentProcessingLog
-from .services import GarmentProcessingService
+from . import assets, pipeline
+from core.utils import S3Storage, calculate_file_hash
 
 logger = logging.getLogger('miora.garments')
 
 
 @shared_task(bind=True, max_retries=3)
-def process_garment_image(self, garment_id, image_data=None):
-    """Process garment image and generate 3D model."""
+def process_garment_image(self, garment_id, image_data=None, force=False, run_id=None):
+    """Process garment image and generate 3D model.
+    
+    The stages run as a DAG (see ``garments.pipeline``), each checkpointed
+    in ``GarmentProcessingLog`` under ``run_id``; a retry resumes the run
+    after its completed stages. Images whose bytes were processed before
+    are linked to the existing artifacts instead (see ``garments.assets``);
+    ``force`` reprocesses them for this garment alone, on an asset of its own.
+    """
+    owner = False
     try:
-        garment = Garment.objects.get(id=garment_id)
-        
-        # Create processing log
-        log = GarmentProcessingLog.objects.create(
-            garment=garment,
-            processing_step='image_processing',
-            status='started'
-        )
-        
-        start_time = time.time()
+        garment = Garment.objects.select_related('asset').get(id=garment_id)
+        
+        # Link to the artifacts of identical images
+        asset = garment.asset
+        if asset is not None and force:
+            # Other users' garments sharing the image keep their artifacts
+            asset = assets.detach(garment)
+        if asset is None:
+            if image_data is None:
+                with S3Storage.open_file(garment.original_image_url) as image_file:
+                    image_data = image_file.read()
+            asset = assets.link(garment, calculate_file_hash(image_data))
+        
+        if asset.status == 'completed' and not force:
+            GarmentProcessingLog.objects.create(
+                garment=garment,
+                processing_step='image_processing',
+                status='completed',
+                metadata={'deduplicated': True, 'asset': str(asset.id)}
+            )
+            
+            logger.info(f'Garment {garment_id} reuses processed asset {asset.content_hash}')
+            return {'success': True, 'garment_id': str(garment_id), 'deduplicated': True}
         
         # Update garment status
         garment.processing_status = 'processing'
         garment.save()
         
-        # Initialize service
-        service = GarmentProcessingService()
+        owner = assets.acquire(asset, force=force)
+        if not owner:
+            # The task processing the same image fills this garment in
+            GarmentProcessingLog.objects.create(
+                garment=garment,
+                processing_step='image_processing',
+                status='completed',
+                metadata={'deduplicated': True, 'asset': str(asset.id), 'waiting': True}
+            )
+            
+            logger.info(f'Garment {garment_id} waits for asset {asset.content_hash}')
+            return {'success': True, 'garment_id': str(garment_id), 'deduplicated': True}
         
-        # Load image
-        if image_data:
-            image = Image.open(io.BytesIO(image_data))
-        else:
-            # Load from existing URL
-            image_file = default_storage.open(garment.original_image_url)
-            image = Image.open(image_file)
+        start_time = time.time()
+        run_id = run_id or str(uuid.uuid4())
         
-        # Process image
-        processed_result = service.process_image(image)
+        outputs = pipeline.run(garment, run_id, image_data)
+        pipeline.publish(asset, outputs)
         
-        if processed_result['success']:
-            # Save processed image
-            processed_path = f'garments/{garment.user.id}/{garment.id}/processed.jpg'
-            processed_file = ContentFile(processed_result['processed_image'])
-            garment.original_image_url = default_storage.save(processed_path, processed_file)
-            
-            # Generate thumbnail
-            thumbnail_path = f'garments/{garment.user.id}/{garment.id}/thumbnail.jpg'
-            thumbnail_file = ContentFile(processed_result['thumbnail'])
-            garment.thumbnail_url = default_storage.save(thumbnail_path, thumbnail_file)
-            
-            # Extract metadata
-            if processed_result.get('metadata'):
-                garment.color = processed_result['metadata'].get('dominant_color', '')
-                garment.pattern = processed_result['metadata'].get('pattern', '')
-            
-            garment.save()
-            
-            # Update log
-            processing_time = int((time.time() - start_time) * 1000)
-            log.processing_time_ms = processing_time
-            log.status = 'completed'
-            log.save()
-            
-            # Queue 3D generation
-            generate_garment_3d_model.delay(garment_id)
-            
-            logger.info(f'Garment {garment_id} image processed in {processing_time}ms')
-            return {'success': True, 'garment_id': str(garment_id)}
-            
-        else:
-            raise Exception(processed_result.get('error', 'Image processing failed'))
+        processing_time = int((time.time() - start_time) * 1000)
+        logger.info(f'Garment {garment_id} processed in {processing_time}ms')
+        return {'success': True, 'garment_id': str(garment_id)}
             
     except Garment.DoesNotExist:
         logger.error(f'Garment {garment_id} not found')
@@ -83,143 +78,42 @@ def process_garment_image(self, garment_id, image_data=None):
         
     except Exception as e:
         logger.error(f'Garment processing failed for {garment_id}: {str(e)}')
+        final = self.request.retries >= self.max_retries
         
-        # Update status
-        if 'garment' in locals():
+        # Stays 'processing' while retries remain
+        if 'garment' in locals() and final:
             garment.processing_status = 'failed'
             garment.save()
         
-        if 'log' in locals():
-            log.status = 'failed'
-            log.error_message = str(e)
-            log.save()
+        if owner:
+            # Let the retry (or another upload of the image) claim it again
+            assets.fail(asset, final=final)
         
-        # Retry the task
-        raise self.retry(exc=e, countdown=120)  # Retry after 2 minutes
-
-
-@shared_task(bind=True, max_retries=3)
-def generate_garment_3d_model(self, garment_id):
-    """Generate 3D model from processed garment image."""
-    try:
-        garment = Garment.objects.get(id=garment_id)
-        
-        # Create processing log
-        log = GarmentProcessingLog.objects.create(
-            garment=garment,
-            processing_step='3d_generation',
-            status='started'
-        )
-        
-        start_time = time.time()
-        
-        # Initialize service
-        service = GarmentProcessingService()
-        
-        # Load processed image
-        image_file = default_storage.open(garment.original_image_url)
-        image = Image.open(image_file)
-        
-        # Generate 3D model
-        result = service.generate_3d_model(
-            image,
-            category=garment.category,
-            metadata={
-                'brand': garment.brand,
-                'size_chart': garment.size_chart
-            }
+        # Retry the task; checkpointed stages are not run again
+        raise self.retry(
+            exc=e,
+            kwargs={**(self.request.kwargs or {}), 'run_id': run_id},
+            countdown=30 * 2 ** self.request.retries
         )
-        
-        if result['success']:
-            # Save 3D model
-            model_path = f'garments/{garment.user.id}/{garment.id}/model.glb'
-            model_file = ContentFile(result['model_data'])
-            garment.model_3d_url = default_storage.save(model_path, model_file)
-            
-            # Save textures
-            texture_urls = []
-            for idx, texture_data in enumerate(result.get('textures', [])):
-                texture_path = f'garments/{garment.user.id}/{garment.id}/texture_{idx}.png'
-                texture_file = ContentFile(texture_data)
-                texture_url = default_storage.save(texture_path, texture_file)
-                texture_urls.append(texture_url)
-            
-            garment.texture_urls = texture_urls
-            
-            # Update material properties
-            garment.material_properties = result.get('material_properties', {})
-            
-            # Mark as completed
-            garment.processing_status = 'completed'
-            garment.save()
-            
-            # Update log
-            processing_time = int((time.time() - start_time) * 1000)
-            log.processing_time_ms = processing_time
-            log.status = 'completed'
-            log.metadata = {'vertices': result.get('vertex_count', 0)}
-            log.save()
-            
-            # Create validation log
-            validate_garment_model.delay(garment_id)
-            
-            logger.info(f'3D model generated for garment {garment_id} in {processing_time}ms')
-            return {'success': True, 'garment_id': str(garment_id)}
-            
-        else:
-            raise Exception(result.get('error', '3D generation failed'))
-            
-    except Garment.DoesNotExist:
-        logger.error(f'Garment {garment_id} not found')
-        return {'success': False, 'error': 'Garment not found'}
-        
-    except Exception as e:
-        logger.error(f'3D generation failed for garment {garment_id}: {str(e)}')
-        
-        if 'log' in locals():
-            log.status = 'failed'
-            log.error_message = str(e)
-            log.save()
-        
-        # Don't update garment status to failed yet, let retry handle it
-        raise self.retry(exc=e, countdown=300)  # Retry after 5 minutes
 
 
 @shared_task
-def validate_garment_model(garment_id):
-    """Validate generated 3D model."""
-    try:
-        garment = Garment.objects.get(id=garment_id)
-        
-        # Create validation log
-        log = GarmentProcessingLog.objects.create(
-            garment=garment,
-            processing_step='validation',
-            status='started'
-        )
-        
-        # Initialize service
-        service = GarmentProcessingService()
-        
-        # Validate model
-        validation_result = service.validate_model(garment.model_3d_url)
-        
-        if validation_result['valid']:
-            log.status = 'completed'
-            log.metadata = validation_result.get('details', {})
-        else:
-            log.status = 'failed'
-            log.error_message = validation_result.get('errors', [])
-            
-            # Mark garment for review
-            garment.processing_status = 'needs_review'
-            garment.save()
-        
-        log.save()
-        
-        logger.info(f'Validation completed for garment {garment_id}')
-        return {'success': True, 'valid': validation_result['valid']}
-        
-    except Garment.DoesNotExist:
-        logger.error(f'Garment {garment_id} not found')
-        return {'success': False, 'error': 'Garment not found'}
\ No newline at end of file
+def requeue_stalled_garments():
+    """Re-dispatch garments waiting on assets whose processing task died.
+    
+    The dispatched task takes over the stale claim (see ``assets.acquire``)
+    and fills in every garment waiting on the asset when it publishes.
+    """
+    requeued = 0
+    for asset in assets.stalled():
+        garment = asset.garments.filter(
+            processing_status__in=['pending', 'processing']
+        ).order_by('created_at').first()
+        if garment is None:
+            continue
+        
+        logger.warning(f'Asset {asset.content_hash} stalled; requeueing garment {garment.id}')
+        process_garment_image.delay(garment.id)
+        requeued += 1
+    
+    return {'success': True, 'requeued': requeued}
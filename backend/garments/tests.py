@@ -1,3 +1,610 @@
-from django.test import TestCase
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from unittest.mock import patch
+from celery.exceptions import Retry
+from datetime import timedelta
+import io
+import shutil
+import tempfile
+import time
+import numpy as np
+from PIL import Image
 
-# Create your tests here.
+from .models import BrandSizeChart
+from .models import Garment, GarmentAsset, GarmentProcessingLog
+from . import assets, pipeline
+from .tasks import process_garment_image, requeue_stalled_garments
+from .colors import extract_palette, rgb_to_lab
+from .services import GarmentProcessingService
+from core.images import ImageSource
+from core.utils import S3Storage
+from .size_charts import BrandSizeChartIndex, ParsedSizeChart, brand_size_charts
+from core.test_base import AuthenticatedAPITestCase
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'brand-size-chart-tests',
+    }
+})
+class BrandSizeChartIndexTest(TestCase):
+    """Test cases for the in-process brand size chart index."""
+
+    def setUp(self):
+        self.addCleanup(brand_size_charts.clear)
+        self.chart = BrandSizeChart.objects.create(
+            brand='Acme',
+            garment_type='shirt',
+            gender='male',
+            size_system='INT',
+            size_data={
+                'S': {'chest': '88', 'waist': 74},
+                'M': {'chest': 94, 'waist': 80, 'length': 72},
+            }
+        )
+
+    def test_parse_numeric_arrays(self):
+        """Test size data is parsed into a float array with NaN gaps."""
+        chart = ParsedSizeChart.parse('Acme', 'shirt', 'male', 'INT', self.chart.size_data)
+
+        self.assertEqual(chart.sizes, ('S', 'M'))
+        self.assertEqual(chart.fields, ('chest', 'waist', 'length'))
+        self.assertEqual(chart.values.dtype, np.float64)
+        self.assertTrue(np.isnan(chart.values[0, 2]))
+        self.assertEqual(chart.measurements('S'), {'chest': 88.0, 'waist': 74.0})
+        self.assertIsNone(chart.measurements('XL'))
+
+    def test_lookups_hit_memory_after_first_load(self):
+        """Test the index loads once per version."""
+        index = BrandSizeChartIndex()
+
+        with self.assertNumQueries(1):
+            self.assertIn('M', index.get('Acme', 'shirt', 'male'))
+            index.get('Acme', 'shirt', 'male', 'INT')
+            self.assertIsNone(index.get('Acme', 'pants', 'male'))
+
+    def test_save_and_delete_invalidate_other_workers(self):
+        """Test the shared version key reloads an already loaded index."""
+        index = BrandSizeChartIndex(check_interval=0)
+        index.get('Acme', 'shirt', 'male')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chart.size_data = {'L': {'chest': 100}}
+            self.chart.save()
+        self.assertEqual(index.get('Acme', 'shirt', 'male').sizes, ('L',))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chart.delete()
+        self.assertIsNone(index.get('Acme', 'shirt', 'male'))
+
+    def test_rolled_back_change_never_loaded(self):
+        """Test the saving process keeps its charts until the change commits."""
+        class Rollback(Exception):
+            pass
+
+        brand_size_charts.get('Acme', 'shirt', 'male')
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(Rollback), transaction.atomic():
+                self.chart.size_data = {'L': {'chest': 100}}
+                self.chart.save()
+                self.assertEqual(brand_size_charts.get('Acme', 'shirt', 'male').sizes, ('S', 'M'))
+                raise Rollback
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(brand_size_charts.get('Acme', 'shirt', 'male').sizes, ('S', 'M'))
+
+    def test_version_checked_once_per_interval(self):
+        """Test lookups within the interval skip the cache and the database."""
+        index = BrandSizeChartIndex(check_interval=60)
+        index.get('Acme', 'shirt', 'male')
+
+        with patch('garments.size_charts.caches') as caches, self.assertNumQueries(0):
+            for _ in range(200):
+                index.get('Acme', 'shirt', 'male')
+        caches.__getitem__.assert_not_called()
+
+        # Another worker's change shows once the interval has passed
+        BrandSizeChartIndex().bump()
+        BrandSizeChart.objects.filter(pk=self.chart.pk).update(size_data={'L': {'chest': 100}})
+        self.assertEqual(index.get('Acme', 'shirt', 'male').sizes, ('S', 'M'))
+        with patch('garments.size_charts.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertEqual(index.get('Acme', 'shirt', 'male').sizes, ('L',))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_without_cache_reloads_once_per_interval(self):
+        """Test an unreadable version does not reload on every lookup."""
+        index = BrandSizeChartIndex(check_interval=60)
+
+        with self.assertNumQueries(1):
+            for _ in range(50):
+                index.get('Acme', 'shirt', 'male')
+
+    def test_ambiguous_size_systems(self):
+        """Test several size systems only resolve with an explicit system."""
+        BrandSizeChart.objects.create(
+            brand='Acme',
+            garment_type='shirt',
+            gender='male',
+            size_system='EU',
+            size_data={'48': {'chest': 96}}
+        )
+        index = BrandSizeChartIndex()
+
+        self.assertIsNone(index.get('Acme', 'shirt', 'male'))
+        self.assertEqual(index.get('Acme', 'shirt', 'male', 'EU').sizes, ('48',))
+
+
+@override_settings(DEBUG=True, DIRECT_UPLOAD_MAX_SIZE=64 * 1024)
+class GarmentDirectUploadTest(AuthenticatedAPITestCase):
+    """Test cases for presigned garment image uploads (local storage)."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage_settings = override_settings(MEDIA_ROOT=media_root)
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (32, 32), 'navy').save(buffer, format='PNG')
+        self.image = buffer.getvalue()
+
+    def _presign(self):
+        response = self.client.post(
+            reverse('garments:garment-upload-url'), {'content_type': 'image/png'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data
+
+    def test_presigned_upload_flow(self):
+        """Client PUTs to the presigned URL; only the garment id is queued."""
+        upload = self._presign()
+        self.assertEqual(upload['method'], 'PUT')
+        self.assertTrue(upload['key'].startswith(f'uploads/{self.user.id}/garments/'))
+
+        response = self.client.generic(
+            'PUT', upload['url'], self.image, content_type='image/png'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with patch('garments.views.process_garment_image') as task:
+            task.delay.return_value.id = 'task-id'
+            response = self.client.post(reverse('garments:garment-upload'), {
+                'name': 'Navy Tee',
+                'category': 't-shirt',
+                'image_key': upload['key'],
+            }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        garment = Garment.objects.get(id=response.data['garment']['id'])
+        self.assertEqual(garment.original_image_url, upload['key'])
+        task.delay.assert_called_once_with(garment.id)
+
+    def test_rejects_missing_or_foreign_keys(self):
+        """Keys must exist and belong to the requesting user."""
+        upload = self._presign()
+        data = {'name': 'Navy Tee', 'category': 't-shirt', 'image_key': upload['key']}
+
+        response = self.client.post(reverse('garments:garment-upload'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        data['image_key'] = upload['key'].replace(str(self.user.id), str(self.create_user().id))
+        response = self.client.post(reverse('garments:garment-upload'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rejects_uploads_that_are_not_images(self):
+        """The uploaded bytes must decode as the declared image type."""
+        for body in (b'<?php echo 1; ?>', self.image[:40]):
+            upload = self._presign()
+            self.client.generic('PUT', upload['url'], body, content_type='image/png')
+
+            response = self.client.post(reverse('garments:garment-upload'), {
+                'name': 'Navy Tee',
+                'category': 't-shirt',
+                'image_key': upload['key'],
+            }, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIsNone(S3Storage.file_info(upload['key']))
+
+    def test_local_upload_enforces_signature_and_size(self):
+        """The local PUT target checks the token, content type and size."""
+        upload = self._presign()
+
+        response = self.client.generic('PUT', upload['url'], self.image, content_type='image/jpeg')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        response = self.client.generic(
+            'PUT', upload['url'], b'x' * (64 * 1024 + 1), content_type='image/png'
+        )
+        self.assertEqual(response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        tampered = upload['url'].replace('/local/', '/local/x')
+        response = self.client.generic('PUT', tampered, self.image, content_type='image/png')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ColorPaletteTest(TestCase):
+    """Test cases for garment palette extraction."""
+
+    def garment_on_backdrop(self, mode='RGB'):
+        pixels = np.full((200, 300, 3), 240, dtype=np.uint8)
+        pixels[40:160, 60:240] = (30, 90, 40)
+        pixels[40:70, 60:240] = (230, 200, 20)
+        return Image.fromarray(pixels).convert(mode)
+
+    def test_lab_reference_values(self):
+        lab = rgb_to_lab(np.array([[255, 255, 255], [0, 0, 0], [255, 0, 0]], dtype=np.uint8))
+        np.testing.assert_allclose(lab[0], [100, 0, 0], atol=0.1)
+        np.testing.assert_allclose(lab[1], [0, 0, 0], atol=0.1)
+        np.testing.assert_allclose(lab[2], [53.24, 80.09, 67.20], atol=0.1)
+
+    def test_ranked_palette_without_background(self):
+        """The backdrop is masked; garment colors are ranked by area."""
+        palette = extract_palette(self.garment_on_backdrop())
+
+        self.assertEqual([color.hex for color in palette], ['#1e5a28', '#e6c814'])
+        self.assertAlmostEqual(palette[0].share, 0.75, places=2)
+        self.assertAlmostEqual(palette[1].share, 0.25, places=2)
+
+    def test_transparent_pixels_ignored(self):
+        """Cut-out images use their alpha channel instead of the border."""
+        image = self.garment_on_backdrop('RGBA')
+        pixels = np.array(image)
+        pixels[:100] = (0, 0, 0, 0)
+        palette = extract_palette(Image.fromarray(pixels))
+
+        hexes = [color.hex for color in palette]
+        self.assertNotIn('#000000', hexes)
+        self.assertIn('#f0f0f0', hexes)
+
+    def test_solid_image(self):
+        """An image that is all 'background' still gets a color."""
+        palette = extract_palette(Image.new('RGB', (50, 50), (200, 10, 10)))
+
+        self.assertEqual([color.hex for color in palette], ['#c80a0a'])
+
+    def test_metadata_palette(self):
+        metadata = GarmentProcessingService()._extract_metadata(self.garment_on_backdrop())
+
+        self.assertEqual(metadata['dominant_color'], '#1e5a28')
+        self.assertEqual(len(metadata['palette']), 2)
+        self.assertEqual(metadata['palette'][1]['hex'], '#e6c814')
+
+    def test_process_image_decodes_reduced_levels(self):
+        """No stage of a large JPEG upload needs the full-resolution decode."""
+        buffer = io.BytesIO()
+        Image.fromarray(np.array(self.garment_on_backdrop().resize((4000, 2667)))).save(buffer, format='JPEG')
+        source = ImageSource.open(buffer.getvalue())
+
+        result = GarmentProcessingService().process_image(source)
+
+        self.assertTrue(result['success'], result.get('error'))
+        self.assertNotIn(1, source.decoded_scales)
+        self.assertEqual(Image.open(io.BytesIO(result['processed_image'])).size, (1920, 1280))
+        self.assertEqual(Image.open(io.BytesIO(result['thumbnail'])).size, (300, 200))
+        self.assertEqual(result['metadata']['width'], 4000)
+        self.assertEqual(result['metadata']['dominant_color'][:3], '#1e')
+
+
+class GarmentFitScoresTest(AuthenticatedAPITestCase):
+    """Test cases for wardrobe fit scores."""
+
+    def test_scores_for_active_avatar(self):
+        Garment.objects.create(user=self.user, name='Tee', category='t-shirt',
+                               original_image_url='https://example.com/tee.jpg')
+
+        response = self.client.get(reverse('garments:garment-fit-scores'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_malformed_avatar_id(self):
+        response = self.client.get(reverse('garments:garment-fit-scores'), {'avatar_id': 'not-a-uuid'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class GarmentRenditionTest(AuthenticatedAPITestCase):
+    """Test cases for rendition selection in garment responses."""
+
+    def setUp(self):
+        super().setUp()
+        sizes = [(64, 48), (150, 113), (300, 225), (600, 450), (1200, 900)]
+        self.garment = Garment.objects.create(
+            user=self.user, name='Tee', category='t-shirt',
+            original_image_url='https://cdn.example.com/processed.jpg',
+            renditions={
+                'formats': ['avif', 'webp'],
+                'sizes': [
+                    {
+                        'width': width, 'height': height,
+                        'sources': {
+                            name: {'url': f'https://cdn.example.com/{width}.{name}', 'bytes': width}
+                            for name in ('avif', 'webp')
+                        },
+                    }
+                    for width, height in sizes
+                ],
+            }
+        )
+
+    def test_list_uses_small_rendition(self):
+        response = self.client.get(reverse('garments:garment-list'))
+
+        image = response.data['results'][0]['image']
+        self.assertEqual(image['width'], 150)
+        self.assertEqual(image['sources']['avif'], 'https://cdn.example.com/150.avif')
+
+    def test_detail_and_client_overrides(self):
+        url = reverse('garments:garment-detail', args=[self.garment.id])
+
+        self.assertEqual(self.client.get(url).data['image']['width'], 600)
+        self.assertEqual(self.client.get(url, {'image_width': 64}).data['image']['width'], 64)
+        self.assertEqual(self.client.get(url, {'image_width': 150, 'dpr': 3}).data['image']['width'], 600)
+
+    def test_without_renditions(self):
+        Garment.objects.filter(id=self.garment.id).update(renditions={})
+
+        response = self.client.get(reverse('garments:garment-list'))
+        self.assertIsNone(response.data['results'][0]['image'])
+
+
+@override_settings(DEBUG=True)
+class GarmentDeduplicationTest(AuthenticatedAPITestCase):
+    """Test cases for sharing processed artifacts between identical images."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage_settings = override_settings(MEDIA_ROOT=media_root)
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'navy').save(buffer, format='PNG')
+        self.image = buffer.getvalue()
+
+    def _upload(self, name):
+        image = io.BytesIO(self.image)
+        image.name = 'tee.png'
+        return self.client.post(reverse('garments:garment-upload'), {
+            'name': name,
+            'category': 't-shirt',
+            'image': image,
+        }, format='multipart')
+
+    def test_identical_upload_reuses_artifacts(self):
+        with patch.object(GarmentProcessingService, 'remove_background', autospec=True,
+                          side_effect=GarmentProcessingService.remove_background) as process:
+            # The eager task checkpoints every stage inside the first request
+            with self.allow_n_plus_one():
+                first = self._upload('Navy Tee')
+            second = self._upload('Same Tee')
+
+        self.assertEqual(process.call_count, 1)
+        self.assertIsNone(second.data['task_id'])
+
+        original = Garment.objects.get(id=first.data['garment']['id'])
+        duplicate = Garment.objects.get(id=second.data['garment']['id'])
+        self.assertEqual(original.processing_status, 'completed')
+        self.assertEqual(duplicate.processing_status, 'completed')
+        self.assertEqual(duplicate.asset_id, original.asset_id)
+        self.assertEqual(duplicate.original_image_url, original.original_image_url)
+        self.assertEqual(duplicate.model_3d_url, original.model_3d_url)
+        self.assertEqual(duplicate.features['palette'], original.features['palette'])
+        self.assertTrue(original.model_3d_url.startswith(original.asset.base_path))
+        self.assertEqual(original.asset.ref_count, 2)
+
+    def test_duplicate_of_invalid_model_needs_review(self):
+        with patch.object(GarmentProcessingService, 'validate_model',
+                          return_value={'valid': False, 'errors': ['Non-manifold mesh']}):
+            with self.allow_n_plus_one():
+                first = self._upload('Navy Tee')
+        second = self._upload('Same Tee')
+
+        original = Garment.objects.get(id=first.data['garment']['id'])
+        duplicate = Garment.objects.get(id=second.data['garment']['id'])
+        self.assertFalse(original.asset.valid)
+        self.assertEqual(original.processing_status, 'needs_review')
+        self.assertEqual(duplicate.processing_status, 'needs_review')
+
+    def test_waiting_garments_filled_in(self):
+        content_hash = 'a' * 64
+        owner = Garment.objects.create(user=self.user, name='A', category='shirt',
+                                       original_image_url='uploads/a.png')
+        waiting = Garment.objects.create(user=self.user, name='B', category='shirt',
+                                         original_image_url='uploads/b.png')
+
+        asset = assets.link(owner, content_hash)
+        self.assertEqual(assets.link(waiting, content_hash), asset)
+        self.assertTrue(assets.acquire(asset))
+        self.assertFalse(assets.acquire(asset))
+
+        asset.processed_image_url = f'{asset.base_path}/processed.jpg'
+        asset.color = 'navy'
+        asset.save()
+        with patch('garments.assets.S3Storage.delete_files') as delete_files:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(assets.sync(asset), 2)
+
+        delete_files.assert_called_once()
+        self.assertCountEqual(delete_files.call_args[0][0], ['uploads/a.png', 'uploads/b.png'])
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.original_image_url, asset.processed_image_url)
+        self.assertEqual(waiting.color, 'navy')
+
+        assets.fail(asset)
+        waiting.refresh_from_db()
+        self.assertEqual(waiting.processing_status, 'failed')
+        self.assertTrue(assets.acquire(asset))
+
+    def test_force_reprocess_leaves_shared_garments(self):
+        with self.allow_n_plus_one():
+            first = self._upload('Navy Tee')
+        second = self._upload('Same Tee')
+        original = Garment.objects.get(id=first.data['garment']['id'])
+        duplicate = Garment.objects.get(id=second.data['garment']['id'])
+        shared = original.asset
+
+        with patch.object(GarmentProcessingService, 'extract_colors',
+                          return_value={'dominant_color': 'red', 'palette': []}):
+            with self.allow_n_plus_one():
+                process_garment_image.apply(args=(duplicate.id,), kwargs={'force': True})
+
+        original.refresh_from_db()
+        duplicate.refresh_from_db()
+        self.assertEqual(duplicate.processing_status, 'completed')
+        self.assertEqual(duplicate.color, 'red')
+        self.assertNotEqual(duplicate.asset_id, shared.id)
+        self.assertTrue(duplicate.model_3d_url.startswith(duplicate.asset.base_path))
+
+        self.assertEqual(original.asset_id, shared.id)
+        self.assertNotEqual(original.color, 'red')
+        self.assertEqual(original.original_image_url, shared.processed_image_url)
+        self.assertEqual(original.asset.ref_count, 1)
+
+    def test_stalled_asset_requeues_waiting_garment(self):
+        owner = Garment.objects.create(user=self.user, name='A', category='shirt',
+                                       original_image_url='uploads/a.png',
+                                       processing_status='completed')
+        waiting = Garment.objects.create(user=self.user, name='B', category='shirt',
+                                         original_image_url='uploads/b.png',
+                                         processing_status='processing')
+        asset = assets.link(owner, 'c' * 64)
+        assets.link(waiting, 'c' * 64)
+        self.assertTrue(assets.acquire(asset))
+
+        with patch('garments.tasks.process_garment_image.delay') as delay:
+            self.assertEqual(requeue_stalled_garments()['requeued'], 0)
+
+            GarmentAsset.objects.filter(pk=asset.pk).update(
+                updated_at=timezone.now() - assets.PROCESSING_TIMEOUT - timedelta(minutes=1)
+            )
+            self.assertEqual(requeue_stalled_garments()['requeued'], 1)
+
+        delay.assert_called_once_with(waiting.id)
+        # The requeued task can take over the abandoned claim
+        self.assertTrue(assets.acquire(asset))
+
+    def test_last_reference_deletes_files(self):
+        garments = [
+            Garment.objects.create(user=self.user, name=name, category='shirt',
+                                   original_image_url='uploads/a.png')
+            for name in ('A', 'B')
+        ]
+        for garment in garments:
+            asset = assets.link(garment, 'b' * 64)
+        GarmentAsset.objects.filter(pk=asset.pk).update(
+            processed_image_url=f'{asset.base_path}/processed.jpg',
+            texture_urls=[f'{asset.base_path}/texture_0.png']
+        )
+
+        with patch('garments.assets.S3Storage.delete_files') as delete_files:
+            with self.captureOnCommitCallbacks(execute=True):
+                garments[0].delete()
+            self.assertEqual(GarmentAsset.objects.get(pk=asset.pk).ref_count, 1)
+            delete_files.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                garments[1].delete()
+
+        self.assertFalse(GarmentAsset.objects.filter(pk=asset.pk).exists())
+        delete_files.assert_called_once_with([
+            f'{asset.base_path}/processed.jpg', f'{asset.base_path}/texture_0.png'
+        ])
+
+
+@override_settings(DEBUG=True)
+class GarmentPipelineTest(TestCase):
+    """Test cases for the checkpointed garment processing pipeline."""
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        storage_settings = override_settings(MEDIA_ROOT=media_root)
+        storage_settings.enable()
+        self.addCleanup(storage_settings.disable)
+
+        from django.contrib.auth import get_user_model
+        user = get_user_model().objects.create_user(
+            email='pipeline@example.com', username='pipeline', password='x'
+        )
+        buffer = io.BytesIO()
+        Image.new('RGB', (96, 64), 'crimson').save(buffer, format='PNG')
+        self.image = buffer.getvalue()
+        self.garment = Garment.objects.create(
+            user=user, name='Red Tee', category='t-shirt', original_image_url='uploads/red.png'
+        )
+
+    def test_stages_and_checkpoints(self):
+        result = process_garment_image(self.garment.id, image_data=self.image)
+
+        self.assertTrue(result['success'])
+        self.garment.refresh_from_db()
+        self.assertEqual(self.garment.processing_status, 'completed')
+        self.assertTrue(self.garment.thumbnail_url)
+        self.assertTrue(self.garment.model_3d_url)
+        self.assertEqual(self.garment.features['aspect_ratio'], 1.5)
+        self.assertTrue(self.garment.color)
+
+        logs = GarmentProcessingLog.objects.filter(garment=self.garment)
+        self.assertEqual(
+            {log.processing_step for log in logs}, set(pipeline.GARMENT_PIPELINE.stages)
+        )
+        self.assertEqual({log.status for log in logs}, {'completed'})
+        self.assertEqual(len({log.run_id for log in logs}), 1)
+
+    def test_retry_resumes_after_completed_stages(self):
+        service = pipeline.GarmentProcessingService
+        generate = service.generate_3d_model
+        failures = [{'success': False, 'error': 'Reconstruction timed out'}]
+
+        def flaky(self, *args, **kwargs):
+            return failures.pop() if failures else generate(self, *args, **kwargs)
+
+        with patch.object(service, 'remove_background', autospec=True,
+                          side_effect=service.remove_background) as remove_background, \
+                patch.object(service, 'extract_colors', autospec=True,
+                             side_effect=service.extract_colors) as extract_colors, \
+                patch.object(service, 'generate_3d_model', autospec=True, side_effect=flaky):
+            # Without throw, apply() runs the retry eagerly too
+            result = process_garment_image.apply(
+                args=[self.garment.id], kwargs={'image_data': self.image}, throw=False
+            )
+        self.assertTrue(result.get()['success'])
+
+        # The retry ran only the failed stage and what depends on it
+        self.assertEqual(remove_background.call_count, 1)
+        self.assertEqual(extract_colors.call_count, 1)
+
+        self.garment.refresh_from_db()
+        self.assertEqual(self.garment.processing_status, 'completed')
+        logs = GarmentProcessingLog.objects.filter(garment=self.garment, processing_step='3d_generation')
+        self.assertEqual(sorted(log.status for log in logs), ['completed', 'failed'])
+        self.assertEqual(len({log.run_id for log in logs}), 1)
+
+    def test_failed_only_after_last_retry(self):
+        kwargs = {'image_data': self.image}
+        with patch.object(pipeline, 'run', side_effect=RuntimeError('Reconstruction timed out')):
+            # The eager retry propagates its own retry request
+            with self.assertRaises(Retry):
+                process_garment_image.apply(args=[self.garment.id], kwargs=kwargs, throw=False)
+
+            # Retries remain, so the garment is still processing
+            self.garment.refresh_from_db()
+            self.assertEqual(self.garment.processing_status, 'processing')
+
+            process_garment_image.apply(
+                args=[self.garment.id], kwargs=kwargs,
+                retries=process_garment_image.max_retries, throw=False
+            )
+
+        self.garment.refresh_from_db()
+        self.assertEqual(self.garment.processing_status, 'failed')
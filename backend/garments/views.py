@@ -2,7 +2,7 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.shortcuts import get_object_or_404
+from rest_framework.generics import get_object_or_404
 from django.db.models import Q
 from .models import Garment, GarmentProcessingLog, BrandSizeChart
 from .serializers import (
@@ -12,13 +12,21 @@ from .serializers import (
     BrandSizeChartSerializer
 )
 from .tasks import process_garment_image
+from . import assets
+from avatars.models import Avatar
+from try_on.services import VirtualTryOnService
+from core.uploads import DirectUploadSerializer, create_upload, upload_prefix
+from core.pagination import KeysetPagination
+from core.parsers import ORJSONParser
+from core.utils import S3Storage, calculate_file_hash
 import uuid
 
 
 class GarmentViewSet(viewsets.ModelViewSet):
     """ViewSet for garment management."""
     permission_classes = [permissions.IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         queryset = Garment.objects.filter(user=self.request.user)
@@ -40,7 +48,7 @@ class GarmentViewSet(viewsets.ModelViewSet):
                 Q(name__icontains=search) | Q(brand__icontains=search)
             )
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
     
     def get_serializer_class(self):
         if self.action == 'upload':
@@ -52,22 +60,36 @@ class GarmentViewSet(viewsets.ModelViewSet):
         # Include processing logs if requested
         if self.request.query_params.get('include_logs') == 'true':
             context['include_logs'] = True
+        # List cards are small; ?image_width= and ?dpr= override
+        context['image_width'] = 150 if self.action == 'list' else 600
         return context
     
+    @action(detail=False, methods=['post'])
+    def upload_url(self, request):
+        """Presign a direct upload of a garment image to storage."""
+        serializer = DirectUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        upload = create_upload(request.user, 'garments', serializer.validated_data['content_type'])
+        return Response(upload, status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['post'])
     def upload(self, request):
-        """Upload a new garment."""
-        serializer = GarmentUploadSerializer(data=request.data)
+        """Upload a new garment.
+        
+        Takes either an ``image_key`` from ``upload_url`` or, for older
+        clients, the image itself as multipart data.
+        """
+        serializer = GarmentUploadSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         
-        # Save uploaded image temporarily
-        image = serializer.validated_data.pop('image')
-        image_path = f'garments/temp/{uuid.uuid4()}_{image.name}'
+        image = serializer.validated_data.pop('image', None)
+        image_path = serializer.validated_data.pop('image_key', None)
         
         # Create garment record
         garment = Garment.objects.create(
             user=request.user,
-            original_image_url=image_path,
+            original_image_url=image_path or '',
             processing_status='pending',
             **serializer.validated_data
         )
@@ -79,8 +101,27 @@ class GarmentViewSet(viewsets.ModelViewSet):
             status='completed'
         )
         
-        # Queue processing task
-        task = process_garment_image.delay(garment.id, image)
+        if image is not None:
+            # Identical images share their processed artifacts
+            image_data = image.read()
+            asset = assets.link(garment, calculate_file_hash(image_data))
+            if asset.status == 'completed':
+                return Response({
+                    'garment': GarmentSerializer(garment).data,
+                    'task_id': None,
+                    'detail': 'Garment uploaded; this image was already processed.'
+                }, status=status.HTTP_201_CREATED)
+            
+            # Store it so only the key goes through the task queue
+            garment.original_image_url = S3Storage.upload_file(
+                image_data,
+                f'{upload_prefix(request.user, "garments")}{uuid.uuid4().hex}_{image.name}',
+                image.content_type
+            )
+            garment.save(update_fields=['original_image_url'])
+        
+        # Queue processing task; direct uploads are hashed there
+        task = process_garment_image.delay(garment.id)
         
         return Response({
             'garment': GarmentSerializer(garment).data,
@@ -93,17 +134,21 @@ class GarmentViewSet(viewsets.ModelViewSet):
         """Reprocess a failed garment."""
         garment = self.get_object()
         
-        if garment.processing_status not in ['failed', 'completed']:
+        if garment.processing_status not in ['failed', 'completed', 'needs_review']:
             return Response({
                 'detail': 'Garment is already being processed.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        # Completed artifacts are regenerated for this garment only; a
+        # failed garment may just link to artifacts made meanwhile
+        force = garment.processing_status in ['completed', 'needs_review']
+        
         # Reset status
         garment.processing_status = 'processing'
         garment.save()
         
         # Queue reprocessing
-        task = process_garment_image.delay(garment.id)
+        task = process_garment_image.delay(garment.id, force=force)
         
         return Response({
             'detail': 'Garment reprocessing started.',
@@ -122,6 +167,33 @@ class GarmentViewSet(viewsets.ModelViewSet):
             'logs': GarmentProcessingLogSerializer(logs, many=True).data
         })
     
+    @action(detail=False, methods=['get'])
+    def fit_scores(self, request):
+        """Get fit scores for every size of every garment in the wardrobe."""
+        avatar_id = request.query_params.get('avatar_id')
+        if avatar_id:
+            avatar = get_object_or_404(Avatar, id=avatar_id, user=request.user)
+        else:
+            avatar = get_object_or_404(Avatar, user=request.user, is_active=True)
+        
+        garments = self.get_queryset().only('id', 'size_chart')
+        size_scores = VirtualTryOnService().score_wardrobe(avatar, garments)
+        
+        results = []
+        for garment_id, scores in size_scores.items():
+            best_size = max(scores, key=scores.get) if scores else ''
+            results.append({
+                'garment_id': garment_id,
+                'best_size': best_size,
+                'fit_score': scores.get(best_size),
+                'size_scores': scores
+            })
+        
+        return Response({
+            'avatar_id': str(avatar.id),
+            'results': results
+        })
+    
     @action(detail=False, methods=['get'])
     def categories(self, request):
         """Get available garment categories with counts."""
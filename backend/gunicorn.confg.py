@@ -1,13 +1,18 @@
 import multiprocessing
+import os
 
+# Serve core.asgi:application on uvicorn workers: each worker is one event
+# loop, so slow external calls and open websockets do not tie up a process
+# and one worker per core is enough.
 bind = "0.0.0.0:8000"
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
-worker_connections = 1000
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() + 1))
+worker_class = "core.workers.MioraUvicornWorker"
 max_requests = 1000
 max_requests_jitter = 50
+# Heartbeat timeout for async workers; long-lived websockets are unaffected
 timeout = 30
-keepalive = 2
+graceful_timeout = 30
+keepalive = 5
 
 # Logging
 accesslog = "-"
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("insights", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="wearevent",
+            index=models.Index(
+                fields=["user", "-date_worn", "-id"], name="insights_we_user_id_0034d6_idx"
+            ),
+        ),
+    ]
@@ -54,6 +54,10 @@ class WearEvent(models.Model):
     
     class Meta:
         unique_together = ['user', 'garment', 'date_worn']
+        indexes = [
+            # Keyset pagination of a user's wear history
+            models.Index(fields=['user', '-date_worn', '-id']),
+        ]
 
 class StyleMilestone(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -13,7 +13,7 @@ class StyleAnalyticsService:
     def update_color_analytics(self):
         """Update color preference analytics based on user's garments and wear events."""
         garments = Garment.objects.filter(user=self.user)
-        wear_events = WearEvent.objects.filter(user=self.user)
+        wear_events = WearEvent.objects.filter(user=self.user).select_related('garment')
         
         # Analyze dominant colors
         color_counts = Counter()
@@ -32,7 +32,7 @@ class StyleAnalyticsService:
         # Analyze color combinations from outfits
         combinations = []
         # Get color combinations from outfits instead
-        outfits = Outfit.objects.filter(user=self.user)
+        outfits = Outfit.objects.filter(user=self.user).prefetch_related('garments__garment')
         for outfit in outfits:
             outfit_colors = []
             for outfit_garment in outfit.garments.all():
@@ -52,7 +52,7 @@ class StyleAnalyticsService:
 
     def update_style_preferences(self):
         """Analyze style evolution and preferences."""
-        garments = Garment.objects.filter(user=self.user).order_by('created_at')
+        garments = list(Garment.objects.filter(user=self.user).order_by('created_at'))
         
         # Style preferences based on category since 'style' field doesn't exist
         style_counts = Counter(garment.category for garment in garments if garment.category)
@@ -65,7 +65,7 @@ class StyleAnalyticsService:
             month_styles = Counter(g.category for g in month_garments if g.category)
             if month_styles:
                 timeline.append({
-                    'period': month_garments.first().created_at.strftime('%Y-%m'),
+                    'period': month_garments[0].created_at.strftime('%Y-%m'),
                     'dominant_style': month_styles.most_common(1)[0][0],
                     'style_diversity': len(month_styles)
                 })
@@ -75,7 +75,7 @@ class StyleAnalyticsService:
     def update_fit_preferences(self):
         """Analyze fit and size preferences."""
         garments = Garment.objects.filter(user=self.user)
-        wear_events = WearEvent.objects.filter(user=self.user)
+        wear_events = WearEvent.objects.filter(user=self.user).select_related('garment')
         
         # Fit preferences based on ratings (using category as proxy for fit)
         fit_ratings = {}
@@ -126,7 +126,7 @@ class StyleAnalyticsService:
 
     def update_seasonal_analytics(self):
         """Analyze seasonal preferences and weather adaptation."""
-        wear_events = WearEvent.objects.filter(user=self.user)
+        wear_events = WearEvent.objects.filter(user=self.user).select_related('garment')
         
         seasonal_data = {'spring': [], 'summer': [], 'fall': [], 'winter': []}
         weather_ratings = {}
@@ -167,7 +167,8 @@ class StyleAnalyticsService:
         
         # Garment reuse rate
         total_garments = len(garments)
-        worn_garments = len(set(event.garment_id for event in wear_events))
+        wear_counts = Counter(wear_events.values_list('garment_id', flat=True))
+        worn_garments = len(wear_counts)
         self.analytics.garment_reuse_rate = (
             worn_garments / total_garments if total_garments > 0 else 0.0
         )
@@ -175,7 +176,7 @@ class StyleAnalyticsService:
         # Cost per wear
         cost_per_wear = {}
         for garment in garments:
-            wear_count = wear_events.filter(garment=garment).count()
+            wear_count = wear_counts[garment.id]
             if wear_count > 0 and garment.price:
                 cost_per_wear[garment.id] = garment.price / wear_count
         
@@ -5,6 +5,8 @@ from rest_framework import status
 from .models import StyleAnalytics, WearEvent, StyleMilestone
 from .services import StyleAnalyticsService, MilestoneService
 from garments.models import Garment
+from try_on.models import Outfit, OutfitGarment
+from core.n_plus_one import detect_n_plus_one
 
 User = get_user_model()
 
@@ -26,6 +28,23 @@ class StyleAnalyticsServiceTest(TestCase):
         analytics = StyleAnalytics.objects.get(user=self.user)
         self.assertIsNotNone(analytics.last_updated)
 
+    def test_update_all_analytics_queries(self):
+        garments = [
+            Garment.objects.create(user=self.user, name=f'Shirt {i}', category='shirt', color=color)
+            for i, color in enumerate(['red', 'blue', 'red', 'green', 'black', 'white'])
+        ]
+        for i, garment in enumerate(garments):
+            WearEvent.objects.create(user=self.user, garment=garment, date_worn=f'2024-01-0{i + 1}')
+            outfit = Outfit.objects.create(user=self.user, name=f'Outfit {i}')
+            OutfitGarment.objects.create(outfit=outfit, garment=garment, layer_order=1)
+            OutfitGarment.objects.create(outfit=outfit, garment=garments[0], layer_order=2)
+
+        with detect_n_plus_one('update_all_analytics', mode='raise'):
+            self.service.update_all_analytics()
+
+        self.assertEqual(self.service.analytics.color_frequency['red'], 6)
+        self.assertIn(['blue', 'red'], self.service.analytics.favorite_color_combinations)
+
 class InsightsAPITest(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(
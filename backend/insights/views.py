@@ -11,6 +11,7 @@ from .serializers import (
     TrendAnalysisSerializer
 )
 from .services import StyleAnalyticsService, MilestoneService
+from core.pagination import KeysetPagination
 
 class StyleAnalyticsView(generics.RetrieveAPIView):
     serializer_class = StyleAnalyticsSerializer
@@ -41,9 +42,13 @@ class UpdateAnalyticsView(APIView):
 class WearEventListCreateView(generics.ListCreateAPIView):
     serializer_class = WearEventSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-date_worn', '-id')
 
     def get_queryset(self):
-        return WearEvent.objects.filter(user=self.request.user).order_by('-date_worn')
+        return WearEvent.objects.filter(
+            user=self.request.user
+        ).select_related('garment').order_by('-date_worn', '-id')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -53,7 +58,7 @@ class WearEventDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return WearEvent.objects.filter(user=self.request.user)
+        return WearEvent.objects.filter(user=self.request.user).select_related('garment')
 
 class StyleMilestoneListView(generics.ListAPIView):
     serializer_class = StyleMilestoneSerializer
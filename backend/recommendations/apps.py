@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class RecommendationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recommendations'
-    verbose_name = 'Size Recommendations'
\ No newline at end of file
+    verbose_name = 'Size Recommendations'
+
+    def ready(self):
+        import recommendations.signals  # noqa
\ No newline at end of file
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("avatars", "0001_initial"),
+        ("recommendations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AvatarFitMatrix",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("measurements_hash", models.CharField(max_length=64)),
+                ("garment_ids", models.JSONField(default=list)),
+                ("garment_versions", models.JSONField(default=list)),
+                ("sizes", models.JSONField(default=list)),
+                ("scores", models.BinaryField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "avatar",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fit_matrix",
+                        to="avatars.avatar",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "avatar_fit_matrices",
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
+import numpy as np
 import uuid
 
 
@@ -45,4 +46,34 @@ class SizeRecommendation(models.Model):
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['garment']),
-        ]
\ No newline at end of file
+        ]
+
+
+class AvatarFitMatrix(models.Model):
+    """Materialized garment x size fit scores for one avatar.
+    
+    Scores are stored as a float32 ``(preferences, garments, sizes)`` array
+    (NaN where a garment does not offer a size) so the wardrobe read path is
+    a single row lookup instead of a scoring pass.
+    """
+    FIT_PREFERENCES = ('slim', 'regular', 'relaxed')
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    avatar = models.OneToOneField('avatars.Avatar', on_delete=models.CASCADE, related_name='fit_matrix')
+    measurements_hash = models.CharField(max_length=64)
+    garment_ids = models.JSONField(default=list)
+    garment_versions = models.JSONField(default=list)  # Fit field fingerprint per column
+    sizes = models.JSONField(default=list)
+    scores = models.BinaryField()
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'avatar_fit_matrices'
+    
+    def score_array(self):
+        """Decode the score blob into a ``(preferences, garments, sizes)`` array."""
+        return np.frombuffer(bytes(self.scores), dtype=np.float32).reshape(
+            len(self.FIT_PREFERENCES), len(self.garment_ids), len(self.sizes)
+        )
@@ -45,6 +45,51 @@ class SizeRecommendationRequestSerializer(serializers.Serializer):
         return data
 
 
+class BulkSizeRecommendationRequestSerializer(serializers.Serializer):
+    """Serializer for requesting size recommendations for many garments."""
+    MAX_GARMENTS = 200
+    
+    avatar_id = serializers.UUIDField()
+    garment_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        min_length=1,
+        max_length=MAX_GARMENTS
+    )
+    fit_preference = serializers.ChoiceField(
+        choices=['slim', 'regular', 'relaxed'],
+        default='regular'
+    )
+    
+    def validate(self, data):
+        user = self.context['request'].user
+        
+        # Validate avatar
+        try:
+            data['avatar'] = Avatar.objects.get(id=data['avatar_id'], user=user)
+        except Avatar.DoesNotExist:
+            raise serializers.ValidationError("Avatar not found")
+        
+        # Validate garments with one query, keeping the requested order
+        garment_ids = list(dict.fromkeys(data['garment_ids']))
+        garments = Garment.objects.filter(id__in=garment_ids, user=user).in_bulk()
+        
+        missing = [str(garment_id) for garment_id in garment_ids if garment_id not in garments]
+        if missing:
+            raise serializers.ValidationError({'garment_ids': f"Garments not found: {', '.join(missing)}"})
+        
+        processing = [
+            str(garment_id) for garment_id in garment_ids
+            if garments[garment_id].processing_status != 'completed'
+        ]
+        if processing:
+            raise serializers.ValidationError(
+                {'garment_ids': f"Garments still processing: {', '.join(processing)}"}
+            )
+        
+        data['garments'] = [garments[garment_id] for garment_id in garment_ids]
+        return data
+
+
 class SizeRecommendationFeedbackSerializer(serializers.Serializer):
     """Serializer for providing feedback on size recommendation."""
     recommendation_id = serializers.UUIDField()
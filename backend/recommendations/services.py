@@ -1,7 +1,12 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import json
 import numpy as np
+from django.db import transaction
 from django.db.models import Avg, Count
 import logging
+from garments.size_charts import brand_size_charts
+from try_on.fit_scoring import FitScoringEngine, union_sizes
 
 logger = logging.getLogger('miora.recommendations')
 
@@ -9,53 +14,48 @@ logger = logging.getLogger('miora.recommendations')
 class SizeRecommendationService:
     """Service for size recommendations."""
     
+    # Same bands and weights as _calculate_base_fit_score, for batch scoring
+    SCORE_THRESHOLDS = (2, 5, 8, 12, 15)
+    SCORE_LEVELS = (100, 85, 70, 50, 30, 10)
+    SCORE_WEIGHTS = (0.4, 0.3, 0.3)
+    
+    CATEGORY_ADJUSTMENTS = {
+        't-shirt': 5,
+        'sweater': 5,
+        'jacket': 3,
+        'coat': 3,
+        'dress': 0,
+        'shirt': -2,
+        'pants': -2,
+        'jeans': -3
+    }
+    
+    def __init__(self):
+        self.scoring_engine = FitScoringEngine(
+            thresholds=self.SCORE_THRESHOLDS,
+            levels=self.SCORE_LEVELS,
+            weights=self.SCORE_WEIGHTS,
+            renormalize=False
+        )
+    
     def get_recommendation(self, avatar, garment, fit_preference: str = 'regular') -> Dict[str, Any]:
         """Get size recommendation for avatar-garment combination."""
         try:
-            # Get available sizes
-            available_sizes = self._get_available_sizes(garment)
-            
-            if not available_sizes:
-                return {
-                    'success': False,
-                    'error': 'No size information available',
-                    'recommended_size': '',
-                    'confidence_score': 0
-                }
-            
-            # Calculate fit scores for each size
-            size_scores = {}
-            for size in available_sizes:
-                score = self.calculate_fit_score(avatar, garment, size, fit_preference)
-                size_scores[size] = score
-            
-            # Find best size
-            best_size = max(size_scores, key=size_scores.get)
-            best_score = size_scores[best_size]
-            
-            # Find alternative if borderline
-            alternative_size = self._find_alternative_size(
-                size_scores,
-                best_size,
-                fit_preference
-            )
+            # Precomputed scores when the avatar's fit matrix is current
+            size_scores = FitMatrixService(self).lookup(avatar, garment, fit_preference)
             
-            # Calculate confidence
-            confidence = self._calculate_confidence(
-                size_scores,
-                best_size,
-                garment
-            )
+            if size_scores is None:
+                # Get available sizes
+                available_sizes = self._get_available_sizes(garment)
+                
+                if not available_sizes:
+                    return self._no_size_information()
+                
+                # Calculate fit scores for each size in one pass
+                sizes, scores = self.score_garments(avatar, [garment], [fit_preference])
+                size_scores = _size_scores(sizes, scores[0, 0])
             
-            return {
-                'success': True,
-                'recommended_size': best_size,
-                'fit_score': round(best_score, 2),
-                'confidence_score': round(confidence, 2),
-                'alternative_size': alternative_size,
-                'size_scores': size_scores,
-                'fit_preference': fit_preference
-            }
+            return self._build_recommendation(size_scores, garment, fit_preference)
             
         except Exception as e:
             logger.error(f'Size recommendation error: {str(e)}')
@@ -66,6 +66,82 @@ class SizeRecommendationService:
                 'confidence_score': 0
             }
     
+    def get_recommendations(self, avatar, garments: Sequence,
+                            fit_preference: str = 'regular') -> List[Dict[str, Any]]:
+        """Recommend sizes for a whole wardrobe or listing in one pass.
+        
+        Garments with current fit matrix entries are served from it; the
+        rest are scored together with one brand size chart query. Results
+        are in the order of ``garments``.
+        """
+        try:
+            size_scores = FitMatrixService(self).lookup_many(avatar, garments, fit_preference)
+            
+            missing = [garment for garment in garments if size_scores.get(str(garment.id)) is None]
+            if missing:
+                sizes, scores = self.score_garments(avatar, missing, [fit_preference])
+                for g, garment in enumerate(missing):
+                    size_scores[str(garment.id)] = _size_scores(sizes, scores[0, g])
+            
+            return [
+                self._build_recommendation(size_scores[str(garment.id)], garment, fit_preference)
+                for garment in garments
+            ]
+            
+        except Exception as e:
+            logger.error(f'Bulk size recommendation error: {str(e)}')
+            return [
+                {
+                    'success': False,
+                    'error': str(e),
+                    'recommended_size': '',
+                    'confidence_score': 0
+                }
+                for _ in garments
+            ]
+    
+    def _build_recommendation(self, size_scores: Dict[str, float], garment,
+                              fit_preference: str) -> Dict[str, Any]:
+        """Pick the best size from ``size_scores`` and explain it."""
+        if not size_scores:
+            return self._no_size_information()
+        
+        # Find best size
+        best_size = max(size_scores, key=size_scores.get)
+        best_score = size_scores[best_size]
+        
+        # Find alternative if borderline
+        alternative_size = self._find_alternative_size(
+            size_scores,
+            best_size,
+            fit_preference
+        )
+        
+        # Calculate confidence
+        confidence = self._calculate_confidence(
+            size_scores,
+            best_size,
+            garment
+        )
+        
+        return {
+            'success': True,
+            'recommended_size': best_size,
+            'fit_score': round(best_score, 2),
+            'confidence_score': round(confidence, 2),
+            'alternative_size': alternative_size,
+            'size_scores': size_scores,
+            'fit_preference': fit_preference
+        }
+    
+    def _no_size_information(self) -> Dict[str, Any]:
+        return {
+            'success': False,
+            'error': 'No size information available',
+            'recommended_size': '',
+            'confidence_score': 0
+        }
+    
     def calculate_fit_score(self, avatar, garment, size: str, 
                            fit_preference: str = 'regular') -> float:
         """Calculate fit score for specific size."""
@@ -94,6 +170,61 @@ class SizeRecommendationService:
         
         return min(100, max(0, final_score))
     
+    def score_garments(self, avatar, garments: Sequence,
+                       fit_preferences: Sequence[str] = ('regular',)) -> Tuple[List[str], np.ndarray]:
+        """Score every available size of every garment in one array pass.
+        
+        Returns the union of sizes and a ``(preferences, garments, sizes)``
+        array matching ``calculate_fit_score``; sizes a garment does not
+        offer are NaN.
+        """
+        size_charts = []
+        for garment in garments:
+            size_charts.append({
+                size: self._get_size_measurements(garment, size) or {}
+                for size in self._get_available_sizes(garment)
+            })
+        sizes = union_sizes(size_charts)
+        
+        matrix, available = self.scoring_engine.size_matrix(size_charts, sizes)
+        avatar_vector = self.scoring_engine.avatar_vector(avatar)
+        base_scores = self.scoring_engine.score(avatar_vector, matrix, available)
+        
+        # Average signed difference for the fit preference adjustment
+        diffs = matrix - avatar_vector
+        has_diff = np.isfinite(diffs).any(axis=-1)
+        with np.errstate(invalid='ignore'):
+            avg_diff = np.where(
+                has_diff,
+                np.nansum(diffs, axis=-1) / np.maximum(np.isfinite(diffs).sum(axis=-1), 1),
+                0.0
+            )
+        
+        category_adjustment = np.array(
+            [self.CATEGORY_ADJUSTMENTS.get(garment.category, 0) for garment in garments],
+            dtype=np.float64
+        )[:, None]
+        
+        # Empty chart rows score 0, as in calculate_fit_score
+        empty_rows = np.array(
+            [[chart.get(size) == {} for size in sizes] for chart in size_charts],
+            dtype=bool
+        ).reshape(available.shape)
+        
+        results = np.empty((len(fit_preferences), len(garments), len(sizes)), dtype=np.float64)
+        for p, preference in enumerate(fit_preferences):
+            adjustment = np.zeros_like(avg_diff)
+            if preference == 'slim':
+                adjustment = np.where(avg_diff < 0, 5, np.where(avg_diff > 5, -10, 0))
+            elif preference == 'relaxed':
+                adjustment = np.where(
+                    (avg_diff > 0) & (avg_diff < 10), 5, np.where(avg_diff < -5, -10, 0)
+                )
+            scores = np.clip(base_scores + adjustment + category_adjustment, 0, 100)
+            results[p] = np.where(empty_rows, 0.0, scores)
+        
+        return sizes, results
+    
     def _get_available_sizes(self, garment) -> list:
         """Get available sizes for garment."""
         if garment.available_sizes:
@@ -112,17 +243,9 @@ class SizeRecommendationService:
             return garment.size_chart[size]
         
         # Check brand size chart
-        from garments.models import BrandSizeChart
-        try:
-            brand_chart = BrandSizeChart.objects.get(
-                brand=garment.brand,
-                garment_type=garment.category,
-                gender=garment.gender
-            )
-            if size in brand_chart.size_data:
-                return brand_chart.size_data[size]
-        except BrandSizeChart.DoesNotExist:
-            pass
+        brand_chart = brand_size_charts.get(garment.brand, garment.category, garment.gender)
+        if brand_chart is not None and size in brand_chart:
+            return brand_chart.measurements(size)
         
         # Fallback to standard sizes
         return self._get_standard_size_measurements(size, garment.category)
@@ -209,18 +332,7 @@ class SizeRecommendationService:
     def _adjust_for_category(self, score: float, category: str) -> float:
         """Adjust score based on garment category."""
         # Some categories are more forgiving
-        category_adjustments = {
-            't-shirt': 5,
-            'sweater': 5,
-            'jacket': 3,
-            'coat': 3,
-            'dress': 0,
-            'shirt': -2,
-            'pants': -2,
-            'jeans': -3
-        }
-        
-        adjustment = category_adjustments.get(category, 0)
+        adjustment = self.CATEGORY_ADJUSTMENTS.get(category, 0)
         return score + adjustment
     
     def _find_alternative_size(self, size_scores: Dict[str, float], 
@@ -273,3 +385,163 @@ class SizeRecommendationService:
             confidence_factors.append(0.6)
         
         return np.mean(confidence_factors) * 100
+
+
+class FitMatrixService:
+    """Maintains each avatar's materialized garment x size fit matrix."""
+    
+    MEASUREMENT_FIELDS = ('chest', 'waist', 'hips')
+    # Garment fields the scores depend on; saves touching none keep them
+    GARMENT_FIELDS = ('brand', 'category', 'gender', 'size_chart', 'available_sizes')
+    
+    def __init__(self, recommendation_service: Optional[SizeRecommendationService] = None):
+        self.recommendation_service = recommendation_service or SizeRecommendationService()
+    
+    def measurements_hash(self, avatar) -> str:
+        """Fingerprint of the avatar measurements that feed the scores."""
+        values = {}
+        for field in self.MEASUREMENT_FIELDS:
+            value = getattr(avatar, field, None)
+            values[field] = float(value) if value is not None else None
+        return hashlib.sha256(json.dumps(values, sort_keys=True).encode()).hexdigest()
+    
+    @staticmethod
+    def invalidate(user_ids) -> int:
+        """Mark the matrices of these users' avatars stale until rebuilt."""
+        from .models import AvatarFitMatrix
+        
+        return AvatarFitMatrix.objects.filter(avatar__user_id__in=user_ids).update(measurements_hash='')
+    
+    def lookup(self, avatar, garment, fit_preference: str = 'regular') -> Optional[Dict[str, float]]:
+        """Stored ``{size: score}`` for one garment, or None if missing or stale."""
+        return self.lookup_many(avatar, [garment], fit_preference).get(str(garment.id))
+    
+    def lookup_many(self, avatar, garments: Iterable,
+                    fit_preference: str = 'regular') -> Dict[str, Dict[str, float]]:
+        """Stored scores keyed by garment id; missing or stale garments are left out."""
+        from .models import AvatarFitMatrix
+        
+        if getattr(avatar, 'pk', None) is None or fit_preference not in AvatarFitMatrix.FIT_PREFERENCES:
+            return {}
+        
+        matrix = AvatarFitMatrix.objects.filter(avatar_id=avatar.pk).first()
+        if matrix is None or matrix.measurements_hash != self.measurements_hash(avatar):
+            return {}
+        
+        columns = {garment_id: g for g, garment_id in enumerate(matrix.garment_ids)}
+        rows = matrix.score_array()[AvatarFitMatrix.FIT_PREFERENCES.index(fit_preference)]
+        
+        scores = {}
+        for garment in garments:
+            garment_id = str(garment.id)
+            column = columns.get(garment_id)
+            if column is None or matrix.garment_versions[column] != _version(garment):
+                continue
+            scores[garment_id] = {
+                size: round(float(score), 2)
+                for size, score in zip(matrix.sizes, rows[column])
+                if not np.isnan(score)
+            }
+        return scores
+    
+    def rebuild(self, avatar):
+        """Score the avatar's whole wardrobe from scratch."""
+        from garments.models import Garment
+        
+        garments = list(Garment.objects.filter(user_id=avatar.user_id))
+        columns = self._score_columns(avatar, garments)
+        return self._save(avatar, columns)
+    
+    def refresh_garments(self, avatar, garments: Iterable, removed_ids: Iterable[str] = ()):
+        """Re-score only ``garments`` (and drop ``removed_ids``) in the stored matrix."""
+        from .models import AvatarFitMatrix
+        
+        with transaction.atomic():
+            matrix = AvatarFitMatrix.objects.select_for_update().filter(avatar_id=avatar.pk).first()
+            if matrix is None or matrix.measurements_hash != self.measurements_hash(avatar):
+                return self.rebuild(avatar)
+            
+            columns = self._decode_columns(matrix)
+            for garment_id in removed_ids:
+                columns.pop(str(garment_id), None)
+            columns.update(self._score_columns(avatar, list(garments)))
+            return self._save(avatar, columns)
+    
+    def _score_columns(self, avatar, garments: List) -> Dict[str, Tuple[str, Dict[str, np.ndarray]]]:
+        """``{garment_id: (version, {size: per-preference scores})}``."""
+        from .models import AvatarFitMatrix
+        
+        if not garments:
+            return {}
+        
+        sizes, scores = self.recommendation_service.score_garments(
+            avatar, garments, AvatarFitMatrix.FIT_PREFERENCES
+        )
+        columns = {}
+        for g, garment in enumerate(garments):
+            columns[str(garment.id)] = (
+                _version(garment),
+                {
+                    size: scores[:, g, s]
+                    for s, size in enumerate(sizes)
+                    if not np.isnan(scores[0, g, s])
+                }
+            )
+        return columns
+    
+    def _decode_columns(self, matrix) -> Dict[str, Tuple[str, Dict[str, np.ndarray]]]:
+        scores = matrix.score_array()
+        columns = {}
+        for g, garment_id in enumerate(matrix.garment_ids):
+            columns[garment_id] = (
+                matrix.garment_versions[g],
+                {
+                    size: scores[:, g, s]
+                    for s, size in enumerate(matrix.sizes)
+                    if not np.isnan(scores[0, g, s])
+                }
+            )
+        return columns
+    
+    def _save(self, avatar, columns: Dict[str, Tuple[str, Dict[str, np.ndarray]]]):
+        from .models import AvatarFitMatrix
+        
+        garment_ids = list(columns)
+        sizes = union_sizes(size_scores for _, size_scores in columns.values())
+        size_index = {size: s for s, size in enumerate(sizes)}
+        
+        scores = np.full(
+            (len(AvatarFitMatrix.FIT_PREFERENCES), len(garment_ids), len(sizes)),
+            np.nan,
+            dtype=np.float32
+        )
+        for g, garment_id in enumerate(garment_ids):
+            for size, values in columns[garment_id][1].items():
+                scores[:, g, size_index[size]] = values
+        
+        matrix, _ = AvatarFitMatrix.objects.update_or_create(
+            avatar=avatar,
+            defaults={
+                'measurements_hash': self.measurements_hash(avatar),
+                'garment_ids': garment_ids,
+                'garment_versions': [columns[garment_id][0] for garment_id in garment_ids],
+                'sizes': sizes,
+                'scores': scores.tobytes(),
+            }
+        )
+        return matrix
+
+
+def _version(garment) -> str:
+    """Fingerprint of the garment fields its scores depend on."""
+    values = {field: getattr(garment, field, None) for field in FitMatrixService.GARMENT_FIELDS}
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _size_scores(sizes: Sequence[str], scores: np.ndarray) -> Dict[str, float]:
+    """``{size: score}`` for the sizes a garment offers (non-NaN scores)."""
+    return {
+        size: float(score)
+        for size, score in zip(sizes, scores)
+        if not np.isnan(score)
+    }
@@ -0,0 +1,94 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+import copy
+import logging
+from avatars.models import Avatar
+from garments.models import Garment, BrandSizeChart
+from .services import FitMatrixService
+from .tasks import (
+    rebuild_avatar_fit_matrix,
+    refresh_garment_fit_scores,
+    refresh_brand_chart_fit_scores,
+)
+
+logger = logging.getLogger('miora.recommendations')
+
+
+def _enqueue(task, *args):
+    """Queue a fit matrix task once the surrounding transaction commits."""
+    def send():
+        try:
+            task.delay(*args)
+        except Exception as e:
+            logger.warning(f'Could not queue {task.name}: {str(e)}')
+    
+    transaction.on_commit(send)
+
+
+@receiver(post_save, sender=Avatar)
+def handle_avatar_saved(sender, instance, **kwargs):
+    """Rebuild the avatar's fit matrix; the task skips unchanged measurements."""
+    _enqueue(rebuild_avatar_fit_matrix, str(instance.id))
+
+
+def _fit_fields(garment) -> dict:
+    # Read from __dict__ so deferred fields are not loaded
+    return {
+        field: copy.deepcopy(garment.__dict__[field])
+        for field in FitMatrixService.GARMENT_FIELDS
+        if field in garment.__dict__
+    }
+
+
+@receiver(post_init, sender=Garment)
+def remember_garment_fit_fields(sender, instance, **kwargs):
+    instance._fit_fields = _fit_fields(instance)
+
+
+@receiver(post_save, sender=Garment)
+def handle_garment_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Rescore the garment's column when a field its scores use changed.
+    
+    Processing saves a garment several times without touching these, so
+    those saves queue nothing.
+    """
+    if update_fields is not None and not set(update_fields) & set(FitMatrixService.GARMENT_FIELDS):
+        return
+    
+    previous = getattr(instance, '_fit_fields', None)
+    instance._fit_fields = _fit_fields(instance)
+    if not created and instance._fit_fields == previous:
+        return
+    
+    _enqueue(refresh_garment_fit_scores, str(instance.id), instance.user_id)
+
+
+@receiver(post_delete, sender=Garment)
+def handle_garment_deleted(sender, instance, **kwargs):
+    """Drop the garment's column."""
+    _enqueue(refresh_garment_fit_scores, str(instance.id), instance.user_id)
+
+
+@receiver(post_save, sender=BrandSizeChart)
+@receiver(post_delete, sender=BrandSizeChart)
+def handle_brand_chart_changed(sender, instance, **kwargs):
+    """Rescore garments that use the brand chart.
+    
+    Their columns are fingerprinted by garment fields only, so the
+    matrices of their owners are marked stale at once; lookups score
+    live until the queued rebuild.
+    """
+    FitMatrixService.invalidate(
+        Garment.objects.filter(
+            brand=instance.brand,
+            category=instance.garment_type,
+            gender=instance.gender,
+        ).values('user_id')
+    )
+    _enqueue(
+        refresh_brand_chart_fit_scores,
+        instance.brand,
+        instance.garment_type,
+        instance.gender,
+    )
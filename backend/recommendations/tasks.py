@@ -0,0 +1,86 @@
+from celery import shared_task
+import logging
+from .models import AvatarFitMatrix
+from .services import FitMatrixService
+
+logger = logging.getLogger('miora.recommendations')
+
+
+@shared_task(bind=True, max_retries=3)
+def rebuild_avatar_fit_matrix(self, avatar_id):
+    """Rescore an avatar's wardrobe after its measurements change."""
+    from avatars.models import Avatar
+    
+    try:
+        avatar = Avatar.objects.get(id=avatar_id)
+    except Avatar.DoesNotExist:
+        return {'success': False, 'error': 'Avatar not found'}
+    
+    try:
+        service = FitMatrixService()
+        current_hash = AvatarFitMatrix.objects.filter(
+            avatar=avatar
+        ).values_list('measurements_hash', flat=True).first()
+        
+        if current_hash == service.measurements_hash(avatar):
+            return {'success': True, 'rebuilt': False}
+        
+        matrix = service.rebuild(avatar)
+        logger.info(f'Rebuilt fit matrix for avatar {avatar_id} ({len(matrix.garment_ids)} garments)')
+        return {'success': True, 'rebuilt': True}
+        
+    except Exception as e:
+        logger.error(f'Fit matrix rebuild failed for avatar {avatar_id}: {str(e)}')
+        raise self.retry(exc=e, countdown=30)
+
+
+@shared_task(bind=True, max_retries=3)
+def refresh_garment_fit_scores(self, garment_id, user_id):
+    """Update one garment's column in the fit matrix of each of the owner's avatars."""
+    from garments.models import Garment
+    
+    try:
+        garment = Garment.objects.filter(id=garment_id).first()
+        service = FitMatrixService()
+        
+        matrices = AvatarFitMatrix.objects.filter(avatar__user_id=user_id).select_related('avatar')
+        for matrix in matrices:
+            if garment is None:
+                service.refresh_garments(matrix.avatar, [], removed_ids=[garment_id])
+            else:
+                service.refresh_garments(matrix.avatar, [garment])
+        
+        return {'success': True, 'matrices': len(matrices)}
+        
+    except Exception as e:
+        logger.error(f'Fit score refresh failed for garment {garment_id}: {str(e)}')
+        raise self.retry(exc=e, countdown=30)
+
+
+@shared_task(bind=True, max_retries=3)
+def refresh_brand_chart_fit_scores(self, brand, garment_type, gender):
+    """Rescore the garments that fall back on a brand size chart."""
+    from garments.models import Garment
+    from garments.size_charts import brand_size_charts
+    
+    try:
+        # This worker's index may predate the change by a check interval
+        brand_size_charts.clear()
+        garments = Garment.objects.filter(brand=brand, category=garment_type, gender=gender)
+        
+        garments_by_user = {}
+        for garment in garments:
+            garments_by_user.setdefault(garment.user_id, []).append(garment)
+        
+        service = FitMatrixService()
+        matrices = AvatarFitMatrix.objects.filter(
+            avatar__user_id__in=list(garments_by_user)
+        ).select_related('avatar')
+        for matrix in matrices:
+            service.refresh_garments(matrix.avatar, garments_by_user[matrix.avatar.user_id])
+        
+        return {'success': True, 'matrices': len(matrices)}
+        
+    except Exception as e:
+        logger.error(f'Fit score refresh failed for {brand} {garment_type} chart: {str(e)}')
+        raise self.retry(exc=e, countdown=30)
@@ -1,3 +1,251 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+from unittest.mock import patch
+import uuid
+import numpy as np
 
-# Create your tests here.
+from analytics.models import SizeAnalytics
+from avatars.models import Avatar
+from garments.models import Garment, BrandSizeChart
+from garments.size_charts import brand_size_charts
+from .models import AvatarFitMatrix, SizeRecommendation
+from .services import SizeRecommendationService, FitMatrixService
+
+User = get_user_model()
+
+
+class FitMatrixTest(TestCase):
+    """Test the materialized avatar fit matrix."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='fit@example.com',
+            username='fituser',
+            password='testpass123'
+        )
+        self.avatar = Avatar.objects.get(user=self.user)
+        self.shirt = Garment.objects.create(
+            user=self.user,
+            name='Shirt',
+            category='shirt',
+            original_image_url='https://example.com/shirt.jpg',
+            size_chart={
+                'S': {'chest': 88, 'waist': 74, 'hips': 90},
+                'M': {'chest': 94, 'waist': 80},
+                'L': {'chest': 104, 'waist': 88, 'hips': 104},
+            }
+        )
+        self.jeans = Garment.objects.create(
+            user=self.user,
+            name='Jeans',
+            category='jeans',
+            brand='Acme',
+            original_image_url='https://example.com/jeans.jpg',
+        )
+        BrandSizeChart.objects.create(
+            brand='Acme',
+            garment_type='jeans',
+            size_system='INT',
+            size_data={'M': {'waist': 76, 'hips': 92}},
+        )
+        self.service = SizeRecommendationService()
+        self.matrix_service = FitMatrixService(self.service)
+
+    def test_batch_scores_match_per_size_scores(self):
+        """Test vectorized wardrobe scoring against calculate_fit_score."""
+        garments = [self.shirt, self.jeans]
+        sizes, scores = self.service.score_garments(
+            self.avatar, garments, AvatarFitMatrix.FIT_PREFERENCES
+        )
+
+        for p, preference in enumerate(AvatarFitMatrix.FIT_PREFERENCES):
+            for g, garment in enumerate(garments):
+                for s, size in enumerate(sizes):
+                    if size not in self.service._get_available_sizes(garment):
+                        self.assertTrue(np.isnan(scores[p, g, s]))
+                        continue
+                    self.assertAlmostEqual(
+                        scores[p, g, s],
+                        self.service.calculate_fit_score(self.avatar, garment, size, preference),
+                        places=6
+                    )
+
+    def test_recommendation_reads_matrix(self):
+        """Test recommendations served from the matrix match computed ones."""
+        computed = self.service.get_recommendation(self.avatar, self.shirt, 'slim')
+        self.matrix_service.rebuild(self.avatar)
+
+        with patch.object(SizeRecommendationService, 'score_garments') as score_garments:
+            served = self.service.get_recommendation(self.avatar, self.shirt, 'slim')
+
+        score_garments.assert_not_called()
+        self.assertEqual(served['recommended_size'], computed['recommended_size'])
+        for size, score in computed['size_scores'].items():
+            self.assertAlmostEqual(served['size_scores'][size], score, places=2)
+
+    def test_stale_matrix_is_ignored(self):
+        """Test changed measurements or garments fall back to scoring."""
+        self.matrix_service.rebuild(self.avatar)
+
+        self.avatar.chest = 100
+        self.assertIsNone(self.matrix_service.lookup(self.avatar, self.shirt))
+
+        self.avatar.refresh_from_db()
+        self.assertIsNotNone(self.matrix_service.lookup(self.avatar, self.shirt))
+        self.shirt.save()
+        self.assertIsNotNone(self.matrix_service.lookup(self.avatar, self.shirt))
+        self.shirt.available_sizes = ['S', 'M']
+        self.assertIsNone(self.matrix_service.lookup(self.avatar, self.shirt))
+
+    def test_only_fit_changes_queue_refresh(self):
+        """Test saves that leave fit fields alone queue no rescoring."""
+        with patch('recommendations.signals.refresh_garment_fit_scores.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.shirt.processing_status = 'completed'
+                self.shirt.save()
+                self.shirt.color = 'navy'
+                self.shirt.save(update_fields=['color'])
+            delay.assert_not_called()
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.shirt.size_chart['S']['chest'] = 90
+                self.shirt.save()
+                self.shirt.save()
+            delay.assert_called_once_with(str(self.shirt.id), self.user.id)
+
+    def test_brand_chart_change_invalidates_matrix(self):
+        """Test editing a brand chart stops serving the old scores."""
+        self.matrix_service.rebuild(self.avatar)
+        self.assertIsNotNone(self.matrix_service.lookup(self.avatar, self.jeans))
+
+        chart = BrandSizeChart.objects.get(brand='Acme')
+        chart.gender = 'unisex'
+        chart.size_data = {'L': {'waist': 84, 'hips': 100}}
+        with patch('recommendations.signals.refresh_brand_chart_fit_scores.delay'):
+            chart.save()
+
+        self.assertIsNone(self.matrix_service.lookup(self.avatar, self.jeans))
+
+    def test_refresh_rescores_only_changed_garments(self):
+        """Test incremental column updates and removals."""
+        self.matrix_service.rebuild(self.avatar)
+        jeans_scores = self.matrix_service.lookup(self.avatar, self.jeans)
+
+        self.shirt.size_chart = {'XL': {'chest': 110, 'waist': 96, 'hips': 110}}
+        self.shirt.save()
+        with patch.object(
+            SizeRecommendationService, 'score_garments', wraps=self.service.score_garments
+        ) as score_garments:
+            self.matrix_service.refresh_garments(self.avatar, [self.shirt])
+
+        scored = score_garments.call_args[0][1]
+        self.assertEqual([garment.id for garment in scored], [self.shirt.id])
+        self.assertEqual(list(self.matrix_service.lookup(self.avatar, self.shirt)), ['XL'])
+        self.assertEqual(self.matrix_service.lookup(self.avatar, self.jeans), jeans_scores)
+
+        self.matrix_service.refresh_garments(self.avatar, [], removed_ids=[self.jeans.id])
+        self.assertIsNone(self.matrix_service.lookup(self.avatar, self.jeans))
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bulk-recommendation-tests',
+    }
+})
+class BulkSizeRecommendationAPITest(APITestCase):
+    """Test the wardrobe-wide recommendation endpoint."""
+
+    def setUp(self):
+        self.addCleanup(brand_size_charts.clear)
+        self.user = User.objects.create_user(
+            email='bulk@example.com',
+            username='bulkuser',
+            password='testpass123'
+        )
+        self.client.force_authenticate(user=self.user)
+        self.avatar = Avatar.objects.get(user=self.user)
+        BrandSizeChart.objects.create(
+            brand='Acme',
+            garment_type='pants',
+            gender='unisex',
+            size_system='INT',
+            size_data={'S': {'waist': 72, 'hips': 88}, 'M': {'waist': 78, 'hips': 94}},
+        )
+        self.url = reverse('recommendations:bulk_recommendations')
+
+    def _create_garments(self, count):
+        garments = []
+        for i in range(count):
+            garments.append(Garment.objects.create(
+                user=self.user,
+                name=f'Garment {i}',
+                category='pants' if i % 2 else 'shirt',
+                brand='Acme',
+                original_image_url='https://example.com/garment.jpg',
+                processing_status='completed',
+                available_sizes=['S', 'M'] if i % 2 else [],
+                size_chart={} if i % 2 else {'M': {'chest': 92 + i, 'waist': 76}},
+            ))
+        return garments
+
+    def _post(self, garments, **extra):
+        return self.client.post(self.url, {
+            'avatar_id': str(self.avatar.id),
+            'garment_ids': [str(garment.id) for garment in garments],
+            **extra
+        }, format='json')
+
+    def test_bulk_recommendations(self):
+        """Test compact rows match single-garment recommendations."""
+        garments = self._create_garments(6)
+
+        response = self._post(garments, fit_preference='slim')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        fields = response.data['fields']
+        rows = [dict(zip(fields, row)) for row in response.data['results']]
+        self.assertEqual([row['garment_id'] for row in rows], [str(g.id) for g in garments])
+
+        service = SizeRecommendationService()
+        for garment, row in zip(garments, rows):
+            expected = service.get_recommendation(self.avatar, garment, 'slim')
+            self.assertEqual(row['recommended_size'], expected['recommended_size'])
+            self.assertAlmostEqual(row['fit_score'], expected['fit_score'], places=2)
+
+        recommendations = SizeRecommendation.objects.filter(user=self.user)
+        self.assertEqual(recommendations.count(), len(garments))
+        self.assertEqual(
+            {str(pk) for pk in recommendations.values_list('id', flat=True)},
+            {row['recommendation_id'] for row in rows}
+        )
+        self.assertEqual(SizeAnalytics.objects.count(), len(garments))
+
+    def test_query_count_independent_of_batch_size(self):
+        """Test the batch costs a fixed number of queries."""
+        small = self._create_garments(3)
+        large = self._create_garments(40)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self._post(small)
+        with CaptureQueriesContext(connection) as large_queries:
+            response = self._post(large)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(large_queries), len(small_queries))
+
+    def test_unknown_garment_rejected(self):
+        """Test garments of other users or unknown ids are rejected."""
+        garments = self._create_garments(2)
+        response = self.client.post(self.url, {
+            'avatar_id': str(self.avatar.id),
+            'garment_ids': [str(garments[0].id), str(uuid.uuid4())],
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SizeRecommendation.objects.exists())
@@ -1,6 +1,7 @@
 from django.urls import path
 from .views import (
     GetSizeRecommendationView,
+    BulkSizeRecommendationView,
     ProvideFeedbackView,
     RecommendationHistoryView
 )
@@ -9,6 +10,7 @@ app_name = 'recommendations'
 
 urlpatterns = [
     path('get/', GetSizeRecommendationView.as_view(), name='get_recommendation'),
+    path('bulk/', BulkSizeRecommendationView.as_view(), name='bulk_recommendations'),
     path('feedback/', ProvideFeedbackView.as_view(), name='provide_feedback'),
     path('history/', RecommendationHistoryView.as_view(), name='recommendation_history'),
 ]
\ No newline at end of file
@@ -1,10 +1,12 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db import transaction
 from .models import SizeRecommendation
 from .serializers import (
     SizeRecommendationSerializer,
     SizeRecommendationRequestSerializer,
+    BulkSizeRecommendationRequestSerializer,
     SizeRecommendationFeedbackSerializer
 )
 from .services import SizeRecommendationService
@@ -41,7 +43,7 @@ class GetSizeRecommendationView(APIView):
             garment=garment,
             recommended_size=result['recommended_size'],
             confidence_score=result['confidence_score'],
-            alternative_size=result.get('alternative_size', ''),
+            alternative_size=result.get('alternative_size') or '',
             fit_preference=fit_preference
         )
         
@@ -58,6 +60,77 @@ class GetSizeRecommendationView(APIView):
         })
 
 
+class BulkSizeRecommendationView(APIView):
+    """Get size recommendations for up to 200 garments in one request."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    # Column order of each row in ``results``
+    RESULT_FIELDS = [
+        'garment_id', 'recommendation_id', 'recommended_size',
+        'fit_score', 'confidence_score', 'alternative_size'
+    ]
+    
+    def post(self, request):
+        serializer = BulkSizeRecommendationRequestSerializer(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        
+        avatar = serializer.validated_data['avatar']
+        garments = serializer.validated_data['garments']
+        fit_preference = serializer.validated_data['fit_preference']
+        
+        # Score the whole batch in one pass
+        service = SizeRecommendationService()
+        results = service.get_recommendations(
+            avatar=avatar,
+            garments=garments,
+            fit_preference=fit_preference
+        )
+        
+        # Save recommendations with a single insert
+        with transaction.atomic():
+            recommendations = SizeRecommendation.objects.bulk_create([
+                SizeRecommendation(
+                    user=request.user,
+                    avatar=avatar,
+                    garment=garment,
+                    recommended_size=result['recommended_size'],
+                    confidence_score=result['confidence_score'],
+                    alternative_size=result.get('alternative_size') or '',
+                    fit_preference=fit_preference
+                )
+                for garment, result in zip(garments, results)
+                if result['success']
+            ])
+        
+        # Track anonymous analytics
+        AnalyticsService.track_size_recommendations(avatar, recommendations)
+        
+        recommendation_ids = {
+            recommendation.garment_id: str(recommendation.id)
+            for recommendation in recommendations
+        }
+        rows = []
+        for garment, result in zip(garments, results):
+            rows.append([
+                str(garment.id),
+                recommendation_ids.get(garment.id),
+                result['recommended_size'],
+                result.get('fit_score'),
+                result['confidence_score'],
+                result.get('alternative_size') or ''
+            ])
+        
+        return Response({
+            'avatar_id': str(avatar.id),
+            'fit_preference': fit_preference,
+            'fields': self.RESULT_FIELDS,
+            'results': rows
+        })
+
+
 class ProvideFeedbackView(APIView):
     """Provide feedback on size recommendation."""
     permission_classes = [permissions.IsAuthenticated]
@@ -1,6 +1,8 @@
 # backend/try_on/ai_engine.py
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from .collision import LayeredCollisionIndex, vertex_normals
 
 class VirtualTryOnEngine:
     def __init__(self):
@@ -51,4 +53,35 @@ class VirtualTryOnEngine:
             'fit_analysis': fit_analysis,
             'visualization': visualization,
             'recommendations': self.generate_recommendations(fit_analysis)
-        }
\ No newline at end of file
+        }
+
+    def resolve_collisions(self, draped_garment: Dict, body_mesh: Dict,
+                           lower_layers: Optional[List[Dict]] = None) -> Dict:
+        """Push garment vertices out of the body and any layers beneath it.
+
+        Meshes are dicts with ``vertices`` and ``faces`` (or precomputed
+        ``normals``); ``lower_layers`` must be ordered innermost first.
+        """
+        index = LayeredCollisionIndex(clearance=draped_garment.get('thickness', 0.4))
+        index.add_body(*self._oriented_vertices(body_mesh))
+
+        for lower in lower_layers or []:
+            index.resolve_layer(*self._oriented_vertices(lower))
+
+        resolved, report = index.resolve_layer(*self._oriented_vertices(draped_garment))
+        return {
+            **draped_garment,
+            'vertices': resolved,
+            'clipping_depth': report.depth,
+            'clipping_against': [
+                index.names[surface] if surface >= 0 else None
+                for surface in report.against
+            ],
+        }
+
+    def _oriented_vertices(self, mesh: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        vertices = np.asarray(mesh['vertices'], dtype=np.float64)
+        normals = mesh.get('normals')
+        if normals is None:
+            normals = vertex_normals(vertices, mesh['faces'])
+        return vertices, np.asarray(normals, dtype=np.float64)
@@ -0,0 +1,128 @@
+from typing import Dict, Any, Optional
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+logger = logging.getLogger('miora.try_on')
+
+# Bump when the simulation output changes shape or meaning so old entries
+# stop matching.
+SIMULATION_VERSION = 1
+
+AVATAR_MEASUREMENT_FIELDS = (
+    'height', 'weight', 'chest', 'waist', 'hips',
+    'shoulder_width', 'arm_length', 'inseam', 'neck',
+)
+
+
+class SimulationCache:
+    """Content-addressed cache for per-layer try-on simulation results.
+
+    Keys hash everything a layer's simulation reads: the avatar's
+    measurements, the garment's id and ``updated_at``, the selected size
+    chart row, the layer and the key of the layer beneath it. Saving an
+    avatar with new measurements or editing a garment therefore produces new
+    keys, so stale entries are never read and simply age out through the
+    TTL and Redis' LRU eviction.
+    """
+
+    KEY_PREFIX = 'try_on:sim'
+    STATS_KEYS = ('hits', 'misses')
+
+    def __init__(self, alias: str = 'default', timeout: Optional[int] = None):
+        self.cache = caches[alias]
+        self.timeout = timeout if timeout is not None else getattr(
+            settings, 'TRY_ON_SIMULATION_CACHE_TIMEOUT', 60 * 60 * 24
+        )
+
+    def make_key(self, avatar, garment, size: str, layer: int,
+                 size_measurements: Dict[str, Any], beneath: str = '') -> str:
+        """Stable key for one layer of a simulation."""
+        payload = {
+            'version': SIMULATION_VERSION,
+            'avatar': {
+                field: _normalize(getattr(avatar, field, None))
+                for field in AVATAR_MEASUREMENT_FIELDS
+            },
+            'garment': str(garment.id),
+            'updated_at': _normalize(getattr(garment, 'updated_at', None)),
+            'category': getattr(garment, 'category', ''),
+            'material': getattr(garment, 'material_properties', None) or {},
+            'size': size,
+            'size_measurements': size_measurements or {},
+            'layer': layer,
+            'beneath': beneath,
+        }
+        digest = hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=_normalize).encode()
+        ).hexdigest()
+        return f'{self.KEY_PREFIX}:{digest}'
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for ``key`` and count the hit or miss."""
+        try:
+            entry = self.cache.get(key)
+        except Exception as e:
+            logger.warning(f'Simulation cache read failed: {str(e)}')
+            return None
+
+        self._count('hits' if entry is not None else 'misses')
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        try:
+            self.cache.set(key, entry, timeout=self.timeout)
+        except Exception as e:
+            logger.warning(f'Simulation cache write failed: {str(e)}')
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since the last reset."""
+        try:
+            values = self.cache.get_many([self._stats_key(name) for name in self.STATS_KEYS])
+        except Exception as e:
+            logger.warning(f'Simulation cache stats unavailable: {str(e)}')
+            values = {}
+
+        hits = int(values.get(self._stats_key('hits'), 0))
+        misses = int(values.get(self._stats_key('misses'), 0))
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            'timeout': self.timeout,
+        }
+
+    def reset_stats(self):
+        self.cache.delete_many([self._stats_key(name) for name in self.STATS_KEYS])
+
+    def _stats_key(self, name: str) -> str:
+        return f'{self.KEY_PREFIX}:stats:{name}'
+
+    def _count(self, name: str):
+        key = self._stats_key(name)
+        try:
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                # First lookup since reset; add() loses no counts if another
+                # worker created the key in the meantime.
+                if not self.cache.add(key, 1, timeout=None):
+                    self.cache.incr(key)
+        except Exception as e:
+            logger.debug(f'Simulation cache counter update failed: {str(e)}')
+
+
+def _normalize(value):
+    """JSON-stable form of model field values (Decimal, datetime, UUID)."""
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
@@ -0,0 +1,438 @@
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+import time
+import numpy as np
+
+# Landmark heights as a fraction of avatar height, top to bottom.
+LANDMARK_HEIGHTS = {
+    'shoulders': 0.82,
+    'chest': 0.72,
+    'waist': 0.62,
+    'hips': 0.52,
+    'thighs': 0.42,
+    'knees': 0.28,
+}
+
+# Vertical extent (top, bottom landmark) covered by each garment category.
+CATEGORY_SPANS = {
+    'dress': ('shoulders', 'knees'),
+    'coat': ('shoulders', 'thighs'),
+    'pants': ('waist', 'thighs'),
+    'jeans': ('waist', 'thighs'),
+    'shorts': ('waist', 'thighs'),
+    'skirt': ('waist', 'thighs'),
+}
+DEFAULT_SPAN = ('shoulders', 'hips')
+
+DEFAULT_MATERIAL = {
+    'stiffness': 0.3,
+    'stretchiness': 0.2,
+    'density': 0.15,
+    'friction': 0.3,
+}
+
+GRAVITY = 981.0  # cm/s^2
+
+
+@dataclass
+class ClothResult:
+    """Outcome of a cloth solve: final particle state plus summary metrics."""
+    positions: np.ndarray
+    strain: np.ndarray
+    penetration: np.ndarray
+    region_labels: np.ndarray
+    solve_time_ms: float
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+
+class ClothSimulator:
+    """Position-based mass-spring cloth solver over a cylindrical particle grid.
+
+    The garment is modelled as a tube of ``rows x cols`` particles wrapped
+    around a body proxy built from the avatar's circumference measurements.
+    Every constraint family (structural, shear, bend) is a shifted view of
+    the grid, so each solver iteration is a handful of whole-array
+    operations with no per-particle Python work.
+    """
+
+    # (row offset, column offset, family) for every spring set in the grid
+    SPRING_SETS = (
+        (0, 1, 'structural'),
+        (1, 0, 'structural'),
+        (1, 1, 'shear'),
+        (1, -1, 'shear'),
+        (0, 2, 'bend'),
+        (2, 0, 'bend'),
+    )
+
+    def __init__(self, vertex_budget: int = 5000, steps: int = 12,
+                 iterations: int = 4, dt: float = 1 / 60, thickness: float = 0.4,
+                 damping: float = 0.02):
+        # Keep both grid dimensions a multiple of four so every spring set
+        # splits into independent batches that are plain strided views.
+        self.cols = max(16, int(round(np.sqrt(vertex_budget * 1.25) / 4)) * 4)
+        self.rows = max(8, int(np.ceil(vertex_budget / self.cols / 4)) * 4)
+        self.steps = steps
+        self.iterations = iterations
+        self.dt = dt
+        self.thickness = thickness
+        self.damping = damping
+
+    @property
+    def vertex_count(self) -> int:
+        return self.rows * self.cols
+
+    def simulate(self, body_measurements: Dict[str, float],
+                 garment_measurements: Dict[str, float], category: str,
+                 material: Optional[Dict[str, float]] = None,
+                 layer: int = 1) -> ClothResult:
+        """Drape a garment over the avatar body proxy and measure the result."""
+        start = time.perf_counter()
+        material = {**DEFAULT_MATERIAL, **(material or {})}
+
+        heights, region_labels = self._row_heights(body_measurements.get('height', 170), category)
+        body_radius = self._radius_profile(heights, body_measurements, body_measurements.get('height', 170))
+        rest_radius = self._radius_profile(
+            heights,
+            self._fill_missing(garment_measurements, body_measurements),
+            body_measurements.get('height', 170)
+        )
+
+        # Inner layers push outer ones outwards by the cloth thickness.
+        collision_radius = body_radius + self.thickness * max(layer, 1)
+
+        angles = np.linspace(0, 2 * np.pi, self.cols, endpoint=False)
+        ring = np.stack([np.cos(angles), np.zeros_like(angles), np.sin(angles)], axis=-1)
+
+        rest = ring[None, :, :] * rest_radius[:, None, None]
+        rest[..., 1] = heights[:, None]
+        tether_lengths = self._tether_lengths(rest, material)
+
+        # Start from the rest shape, lifted just clear of the body.
+        positions = self._project_out(rest.copy(), collision_radius)[0]
+        previous = positions.copy()
+
+        stretch_k, compress_k, bend_k = self._spring_stiffness(material)
+        gravity = np.array([0.0, -GRAVITY * (0.5 + material['density']), 0.0]) * self.dt ** 2
+        friction = float(np.clip(material['friction'], 0.0, 1.0))
+        inverse_mass = np.ones((self.rows, self.cols), dtype=np.float64)
+        inverse_mass[0] = 0.0  # top edge hangs from the shoulders / waistband
+        batches = self._spring_batches(rest, inverse_mass)
+
+        for _ in range(self.steps):
+            velocity = (positions - previous) * (1 - self.damping)
+            previous = positions
+            positions = positions + (velocity + gravity) * inverse_mass[..., None]
+
+            for _ in range(self.iterations):
+                self._solve_springs(positions, batches, stretch_k, compress_k, bend_k)
+                positions = self._solve_tethers(positions, tether_lengths)
+                positions, contact = self._project_out(positions, collision_radius)
+
+            # Contact friction bleeds velocity off particles resting on the body.
+            previous = np.where(
+                contact[..., None],
+                previous + (positions - previous) * friction,
+                previous
+            )
+
+        # Where the fabric would have to stretch past its elastic limit to
+        # stay on the surface, a real garment could not cover the body: report
+        # how deep the body would poke through it.
+        max_radius = rest_radius * (1 + self._elastic_limit(material))
+        penetration = np.where(
+            contact,
+            np.maximum(collision_radius - max_radius, 0.0)[:, None],
+            0.0
+        )
+
+        strain = self._vertex_strain(positions, rest)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        result = ClothResult(
+            positions=positions,
+            strain=strain,
+            penetration=penetration,
+            region_labels=region_labels,
+            solve_time_ms=elapsed_ms,
+        )
+        result.metrics = self._summarize(result, material)
+        return result
+
+    def body_surface(self, body_measurements: Dict[str, float],
+                     spacing: float = 1.5) -> Tuple[np.ndarray, np.ndarray]:
+        """Sample the body proxy as points with outward normals, ``spacing`` cm apart."""
+        height = body_measurements.get('height', 170)
+        top = LANDMARK_HEIGHTS['shoulders'] * height
+        bottom = min(LANDMARK_HEIGHTS.values()) * height
+        heights = np.linspace(top, bottom, max(2, int((top - bottom) / spacing) + 1))
+        radius = self._radius_profile(heights, body_measurements, height)
+
+        cols = max(16, int(2 * np.pi * radius.max() / spacing))
+        angles = np.linspace(0, 2 * np.pi, cols, endpoint=False)
+        ring = np.stack([np.cos(angles), np.zeros_like(angles), np.sin(angles)], axis=-1)
+
+        points = ring[None, :, :] * radius[:, None, None]
+        points[..., 1] = heights[:, None]
+        normals = np.broadcast_to(ring, points.shape)
+        return points.reshape(-1, 3), normals.reshape(-1, 3)
+
+    def grid_normals(self, positions: np.ndarray) -> np.ndarray:
+        """Unit outward normals of the particle grid."""
+        along_ring = np.roll(positions, -1, axis=1) - np.roll(positions, 1, axis=1)
+        down = np.gradient(positions, axis=0)
+        normals = np.cross(along_ring, down)
+        length = np.linalg.norm(normals, axis=-1, keepdims=True)
+        return np.divide(normals, length, out=np.zeros_like(normals), where=length > 1e-9)
+
+    def clipping_areas(self, result: ClothResult, depth: np.ndarray,
+                       mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Group clipping depths (e.g. from a collision index) by body region."""
+        clipped = depth > 0.05
+        if mask is not None:
+            clipped &= mask
+        return self._regions(result, clipped, depth, 'max_depth_cm')
+
+    def _row_heights(self, height: float, category: str) -> Tuple[np.ndarray, np.ndarray]:
+        top, bottom = CATEGORY_SPANS.get(category, DEFAULT_SPAN)
+        heights = np.linspace(
+            LANDMARK_HEIGHTS[top] * height,
+            LANDMARK_HEIGHTS[bottom] * height,
+            self.rows
+        )
+
+        # Label each row with its nearest body landmark.
+        names = list(LANDMARK_HEIGHTS)
+        landmark_y = np.array([LANDMARK_HEIGHTS[name] * height for name in names])
+        nearest = np.abs(heights[:, None] - landmark_y[None, :]).argmin(axis=1)
+        return heights, np.array(names)[nearest]
+
+    def _radius_profile(self, heights: np.ndarray, measurements: Dict[str, float],
+                        height: float) -> np.ndarray:
+        chest = float(measurements['chest'])
+        waist = float(measurements['waist'])
+        hips = float(measurements['hips'])
+        circumferences = {
+            'shoulders': chest * 0.95,
+            'chest': chest,
+            'waist': waist,
+            'hips': hips,
+            'thighs': hips * 0.92,
+            'knees': hips * 0.9,
+        }
+        # np.interp needs increasing x, landmarks are listed top to bottom.
+        names = list(LANDMARK_HEIGHTS)[::-1]
+        xs = np.array([LANDMARK_HEIGHTS[name] * height for name in names])
+        ys = np.array([circumferences[name] for name in names]) / (2 * np.pi)
+        return np.interp(heights, xs, ys)
+
+    def _fill_missing(self, garment: Dict[str, float], body: Dict[str, float]) -> Dict[str, float]:
+        filled = {}
+        for key in ('chest', 'waist', 'hips'):
+            value = garment.get(key) if garment else None
+            filled[key] = float(value) if value is not None else float(body[key]) * 1.05
+        return filled
+
+    def _spring_stiffness(self, material: Dict[str, float]) -> Tuple[float, float, float]:
+        stiffness = float(np.clip(material['stiffness'], 0.0, 1.0))
+        stretchiness = float(np.clip(material['stretchiness'], 0.0, 1.0))
+
+        stretch_k = float(np.clip(0.9 * (1 - stretchiness) + 0.1 * stiffness, 0.05, 1.0))
+        compress_k = float(np.clip(0.05 + 0.3 * stiffness, 0.0, 1.0))
+        bend_k = float(np.clip(0.5 * stiffness, 0.0, 1.0))
+
+        # Convert per-solve stiffness to per-iteration stiffness.
+        n = self.iterations
+        return tuple(1 - (1 - k) ** (1 / n) for k in (stretch_k, compress_k, bend_k))
+
+    def _pair(self, positions: np.ndarray, dr: int, dc: int) -> Tuple[np.ndarray, np.ndarray]:
+        a = positions[:self.rows - dr]
+        b = positions[dr:] if dc == 0 else np.roll(positions[dr:], -dc, axis=1)
+        return a, b
+
+    def _elastic_limit(self, material: Dict[str, float]) -> float:
+        """Largest strain the fabric absorbs before it would tear or clip."""
+        return 0.05 + 0.5 * float(np.clip(material['stretchiness'], 0.0, 1.0))
+
+    def _batch_views(self, grid: np.ndarray, dr: int, dc: int,
+                     parity: int) -> Tuple[np.ndarray, np.ndarray, int, int]:
+        """Views on both ends of one independent batch of a spring set.
+
+        Returns ``(a, b, axis, shift)``: ``a`` and ``b`` are basic-slice views
+        into ``grid`` (so in-place updates write straight through) and, when
+        ``shift`` is non-zero, ``b`` must be rolled by ``shift`` along
+        ``axis`` to line up with ``a`` across the column seam.
+        """
+        rows, cols = self.rows, self.cols
+        if dr == 0:
+            groups = grid.reshape(rows, cols // (2 * dc), 2, dc, grid.shape[-1])
+            if parity == 0:
+                return groups[:, :, 0], groups[:, :, 1], 1, 0
+            return groups[:, :, 1], groups[:, :, 0], 1, -1
+        if dr == 1:
+            if parity == 0:
+                return grid[0::2], grid[1::2], 1, -dc
+            return grid[1:-1:2], grid[2::2], 1, -dc
+
+        blocks = grid.reshape(rows // 4, 4, cols, grid.shape[-1])
+        if parity == 0:
+            return blocks[:, 0:2], blocks[:, 2:4], 1, 0
+        return blocks[:-1, 2:4], blocks[1:, 0:2], 1, 0
+
+    def _spring_batches(self, rest: np.ndarray, inverse_mass: np.ndarray) -> List[Dict[str, Any]]:
+        """Split every spring set into two batches with no shared particles.
+
+        Springs inside a batch are independent, so a batch is projected at
+        full strength in one vectorized update (Gauss-Seidel across batches,
+        exact within a batch). Rest lengths and mass weights are gathered
+        once up front.
+        """
+        mass_grid = np.ascontiguousarray(inverse_mass[..., None])
+        batches = []
+        for dr, dc, family in self.SPRING_SETS:
+            for parity in (0, 1):
+                rest_a, rest_b, axis, shift = self._batch_views(rest, dr, dc, parity)
+                w_a, w_b, _, _ = self._batch_views(mass_grid, dr, dc, parity)
+                if shift:
+                    rest_b = np.roll(rest_b, shift, axis=axis)
+                    w_b = np.roll(w_b, shift, axis=axis)
+
+                w_sum = w_a + w_b
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    share_a = np.where(w_sum > 0, w_a / w_sum, 0.0)[..., 0]
+                    share_b = np.where(w_sum > 0, w_b / w_sum, 0.0)[..., 0]
+
+                batches.append({
+                    'key': (dr, dc, parity),
+                    'family': family,
+                    'axis': axis,
+                    'shift': shift,
+                    'rest': np.linalg.norm(rest_b - rest_a, axis=-1),
+                    'share_a': share_a,
+                    'share_b': share_b,
+                })
+        return batches
+
+    def _solve_springs(self, positions: np.ndarray, batches: List[Dict[str, Any]],
+                       stretch_k: float, compress_k: float, bend_k: float) -> np.ndarray:
+        """One solver pass over every spring batch, updating ``positions`` in place."""
+        for batch in batches:
+            dr, dc, parity = batch['key']
+            a, b_view, axis, shift = self._batch_views(positions, dr, dc, parity)
+            b = np.roll(b_view, shift, axis=axis) if shift else b_view
+
+            delta = b - a
+            length = np.sqrt(np.einsum('...i,...i->...', delta, delta))
+            np.maximum(length, 1e-9, out=length)
+            error = length - batch['rest']
+
+            if batch['family'] == 'bend':
+                scale = error * bend_k
+            else:
+                scale = error * np.where(error > 0, stretch_k, compress_k)
+            scale /= length
+
+            a += delta * (scale * batch['share_a'])[..., None]
+            move_b = delta * (scale * batch['share_b'])[..., None]
+            if shift:
+                b_view -= np.roll(move_b, -shift, axis=axis)
+            else:
+                b_view -= move_b
+
+        return positions
+
+    def _tether_lengths(self, rest: np.ndarray, material: Dict[str, float]) -> np.ndarray:
+        """Rest distance from every particle to its anchor on the pinned edge.
+
+        Long-range attachments stop gravity from stretching the hanging
+        fabric further than the material allows, without needing enough
+        iterations to propagate tension down the whole grid.
+        """
+        segments = np.linalg.norm(np.diff(rest, axis=0), axis=-1)
+        along = np.vstack([np.zeros((1, self.cols)), np.cumsum(segments, axis=0)])
+        return along * (1 + 0.1 * float(material['stretchiness']))
+
+    def _solve_tethers(self, positions: np.ndarray, tether_lengths: np.ndarray) -> np.ndarray:
+        anchor = positions[0:1]
+        offset = positions - anchor
+        distance = np.sqrt(np.einsum('...i,...i->...', offset, offset))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scale = np.where(distance > tether_lengths, tether_lengths / distance, 1.0)
+        return anchor + offset * scale[..., None]
+
+    def _radial(self, positions: np.ndarray) -> np.ndarray:
+        return np.hypot(positions[..., 0], positions[..., 2])
+
+    def _project_out(self, positions: np.ndarray,
+                     collision_radius: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Push particles inside the body proxy back onto its surface."""
+        radial = self._radial(positions)
+        target = collision_radius[:, None]
+        contact = radial < target
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scale = np.where(contact & (radial > 1e-9), target / radial, 1.0)
+        positions = positions.copy()
+        positions[..., 0] *= scale
+        positions[..., 2] *= scale
+        return positions, contact
+
+    def _vertex_strain(self, positions: np.ndarray, rest: np.ndarray) -> np.ndarray:
+        """Largest structural strain touching each vertex."""
+        strain = np.zeros((self.rows, self.cols), dtype=np.float64)
+        for dr, dc, family in self.SPRING_SETS:
+            if family != 'structural':
+                continue
+            a, b = self._pair(positions, dr, dc)
+            rest_a, rest_b = self._pair(rest, dr, dc)
+            rest_length = np.linalg.norm(rest_b - rest_a, axis=-1)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                edge_strain = np.where(
+                    rest_length > 1e-9,
+                    np.linalg.norm(b - a, axis=-1) / rest_length - 1,
+                    0.0
+                )
+            strain[:self.rows - dr] = np.maximum(strain[:self.rows - dr], edge_strain)
+            strain[dr:] = np.maximum(strain[dr:], np.roll(edge_strain, dc, axis=1))
+        return strain
+
+    def _summarize(self, result: ClothResult, material: Dict[str, float]) -> Dict[str, Any]:
+        # Strain the fabric absorbs without visibly pulling.
+        allowance = 0.02 + 0.1 * float(material['stretchiness'])
+        stretched = result.strain > allowance
+        clipped = result.penetration > self.thickness
+
+        stretch_areas = self._regions(result, stretched, result.strain, 'max_strain')
+        collision_areas = self._regions(result, clipped, result.penetration, 'max_depth_cm')
+
+        tension = np.maximum(result.strain - allowance, 0.0)
+        mean_abs_strain = float(np.abs(result.strain).mean())
+        drape_quality = 1 - 3 * mean_abs_strain - 0.5 * float(clipped.mean())
+        movement_restriction = 8 * float(tension.mean()) + 0.5 * float(stretched.mean())
+
+        return {
+            'drape_quality': round(float(np.clip(drape_quality, 0, 1)), 3),
+            'stretch_areas': stretch_areas,
+            'collision_areas': collision_areas,
+            'movement_restriction': round(float(np.clip(movement_restriction, 0, 1)), 3),
+            'vertex_count': self.vertex_count,
+            'solve_time_ms': round(result.solve_time_ms, 1),
+        }
+
+    def _regions(self, result: ClothResult, mask: np.ndarray, values: np.ndarray,
+                 value_key: str) -> List[Dict[str, Any]]:
+        """Group flagged vertices by body landmark region."""
+        regions = []
+        labels = np.broadcast_to(result.region_labels[:, None], mask.shape)
+        for region in LANDMARK_HEIGHTS:
+            in_region = labels == region
+            flagged = mask & in_region
+            # Ignore specks: require a meaningful share of the region.
+            if not in_region.any() or flagged.sum() < max(3, 0.02 * in_region.sum()):
+                continue
+            regions.append({
+                'region': region,
+                'coverage': round(float(flagged.sum() / in_region.sum()), 3),
+                value_key: round(float(values[flagged].max()), 3),
+            })
+        return regions
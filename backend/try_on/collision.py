@@ -0,0 +1,227 @@
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+import numpy as np
+
+# Bits per axis when packing integer cell coordinates into one int64 key.
+_KEY_BITS = 21
+_KEY_OFFSET = 1 << (_KEY_BITS - 1)
+_KEY_MASK = (1 << _KEY_BITS) - 1
+
+# The 27 cells around (and including) a query cell.
+_NEIGHBOR_OFFSETS = np.array(
+    [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)],
+    dtype=np.int64
+)
+
+
+def _pack_keys(cells: np.ndarray) -> np.ndarray:
+    shifted = (cells + _KEY_OFFSET) & _KEY_MASK
+    return (shifted[..., 0] << (2 * _KEY_BITS)) | (shifted[..., 1] << _KEY_BITS) | shifted[..., 2]
+
+
+def _ranges(counts: np.ndarray) -> np.ndarray:
+    """Concatenated ``arange(n)`` for every ``n`` in ``counts``."""
+    first = np.cumsum(counts) - counts
+    return np.arange(int(counts.sum())) - np.repeat(first, counts)
+
+
+class SpatialHashGrid:
+    """Uniform spatial hash over the oriented samples of one surface.
+
+    Points are bucketed by integer cell coordinates and stored sorted by cell
+    key, so a cell lookup is a binary search into the unique keys. Queries
+    are batched: every query point looks up its 27 neighbouring cells at
+    once and candidate pairs are expanded with array operations, giving
+    roughly ``O(V log C)`` work instead of the naive ``O(V x F)`` test of
+    every garment vertex against every body face.
+    """
+
+    def __init__(self, points: np.ndarray, normals: np.ndarray, cell_size: float = 2.5):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+        if points.shape != normals.shape:
+            raise ValueError('points and normals must have the same shape')
+
+        self.cell_size = float(cell_size)
+        keys = _pack_keys(np.floor(points / self.cell_size).astype(np.int64))
+        order = np.argsort(keys, kind='stable')
+
+        self.points = points[order]
+        self.normals = normals[order]
+        self.cell_keys, self.cell_starts, self.cell_counts = np.unique(
+            keys[order], return_index=True, return_counts=True
+        )
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def candidates(self, queries: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(query_index, point_index)`` pairs from neighbouring cells.
+
+        Pairs come out grouped by query index in ascending order.
+        """
+        if not len(self.cell_keys) or not len(queries):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        # Nearby queries share cells: look up each distinct cell's 27
+        # neighbours once, then hand the gathered points to every query in it.
+        cells, query_cell = np.unique(
+            np.floor(queries / self.cell_size).astype(np.int64), axis=0, return_inverse=True
+        )
+        query_cell = query_cell.ravel()
+        keys = _pack_keys(cells[:, None, :] + _NEIGHBOR_OFFSETS[None, :, :]).ravel()
+
+        slot = np.searchsorted(self.cell_keys, keys)
+        slot = np.minimum(slot, len(self.cell_keys) - 1)
+        hit = self.cell_keys[slot] == keys
+
+        starts = self.cell_starts[slot[hit]]
+        counts = self.cell_counts[slot[hit]]
+        cell_points = np.repeat(starts, counts) + _ranges(counts)
+
+        per_cell = np.bincount(
+            np.repeat(np.arange(len(cells)), len(_NEIGHBOR_OFFSETS))[hit],
+            weights=counts,
+            minlength=len(cells)
+        ).astype(np.int64)
+        cell_first = np.cumsum(per_cell) - per_cell
+
+        per_query = per_cell[query_cell]
+        query_index = np.repeat(np.arange(len(queries)), per_query)
+        point_index = cell_points[np.repeat(cell_first[query_cell], per_query) + _ranges(per_query)]
+        return query_index, point_index
+
+    def signed_distance(self, queries: np.ndarray, radius: float) -> np.ndarray:
+        """Signed distance from each query to the surface (positive outside).
+
+        Measured along the normal of the nearest sample within ``radius``
+        (``radius`` must not exceed the cell size); NaN where no sample is
+        in reach.
+        """
+        queries = np.asarray(queries, dtype=np.float64).reshape(-1, 3)
+        result = np.full(len(queries), np.nan)
+
+        query_index, point_index = self.candidates(queries)
+        offset = queries[query_index] - self.points[point_index]
+        distance2 = np.einsum('ij,ij->i', offset, offset)
+
+        in_reach = distance2 <= radius * radius
+        query_index, point_index = query_index[in_reach], point_index[in_reach]
+        offset, distance2 = offset[in_reach], distance2[in_reach]
+        if not len(query_index):
+            return result
+
+        # Pairs are grouped by query, so the nearest sample per query is a
+        # segmented min rather than a sort.
+        segment = np.flatnonzero(np.r_[True, query_index[1:] != query_index[:-1]])
+        nearest_distance = np.minimum.reduceat(distance2, segment)
+        counts = np.diff(np.r_[segment, len(query_index)])
+        is_nearest = distance2 == np.repeat(nearest_distance, counts)
+        # Ties: keep the first candidate of each query.
+        nearest = np.flatnonzero(is_nearest)
+        nearest = nearest[np.r_[True, query_index[nearest[1:]] != query_index[nearest[:-1]]]]
+
+        result[query_index[nearest]] = np.einsum(
+            'ij,ij->i', offset[nearest], self.normals[point_index[nearest]]
+        )
+        return result
+
+
+@dataclass
+class ClippingReport:
+    """Per-vertex clipping depth of one layer and the surface it clips into."""
+    depth: np.ndarray
+    against: np.ndarray
+    layer: int
+
+
+class LayeredCollisionIndex:
+    """Collision index over the avatar body and each garment layer.
+
+    Surface 0 is the body; garment layers must be resolved innermost first
+    (``TryOnSessionGarment.layer_order``). Each layer is checked with one
+    batched query per surface beneath it, pushed back out of anything it
+    clips into, and then indexed so the next layer collides with it.
+    """
+
+    def __init__(self, clearance: float = 0.4, reach: float = 2.5, layer_stride: int = 2):
+        self.clearance = clearance
+        self.reach = reach
+        # Garment grids are smooth; index every n-th row/column of them.
+        self.layer_stride = layer_stride
+        self.surfaces: List[SpatialHashGrid] = []
+        self.names: List[str] = []
+
+    def add_body(self, points: np.ndarray, normals: np.ndarray):
+        if self.surfaces:
+            raise ValueError('The body must be added before any garment layer')
+        self.surfaces.append(SpatialHashGrid(points, normals, cell_size=self.reach))
+        self.names.append('body')
+
+    def add_layer(self, points: np.ndarray, normals: np.ndarray, layer: int) -> SpatialHashGrid:
+        """Index an already resolved layer surface (e.g. one restored from cache)."""
+        surface = SpatialHashGrid(points, normals, cell_size=self.reach)
+        self.surfaces.append(surface)
+        self.names.append(f'layer {layer}')
+        return surface
+
+    def resolve_layer(self, positions: np.ndarray, normals: np.ndarray,
+                      layer: Optional[int] = None) -> Tuple[np.ndarray, ClippingReport]:
+        """Resolve one layer against everything beneath it.
+
+        ``positions`` and ``normals`` are ``(..., 3)`` arrays; a ``(rows,
+        cols, 3)`` particle grid is subsampled before being indexed. Returns
+        the corrected positions and how deep each vertex was clipping before
+        correction.
+        """
+        shape = positions.shape
+        flat = positions.reshape(-1, 3)
+        flat_normals = normals.reshape(-1, 3)
+        layer = layer if layer is not None else len(self.surfaces)
+
+        # Shortfall against each surface: the body needs no gap, garments
+        # need room for the cloth thickness.
+        shortfall = np.zeros((len(flat), len(self.surfaces)))
+        for surface_id, surface in enumerate(self.surfaces):
+            required = 0.0 if self.names[surface_id] == 'body' else self.clearance
+            signed = surface.signed_distance(flat, self.reach)
+            shortfall[:, surface_id] = np.where(
+                np.isnan(signed), 0.0, np.maximum(required - signed, 0.0)
+            )
+
+        if self.surfaces:
+            depth = shortfall.max(axis=1)
+            against = np.where(depth > 0, shortfall.argmax(axis=1), -1)
+        else:
+            depth = np.zeros(len(flat))
+            against = np.full(len(flat), -1)
+
+        resolved = (flat + flat_normals * depth[:, None]).reshape(shape)
+
+        stride = self.layer_stride
+        if len(shape) == 3:
+            self.add_layer(resolved[::stride, ::stride], normals[::stride, ::stride], layer)
+        else:
+            self.add_layer(resolved, flat_normals, layer)
+
+        report = ClippingReport(
+            depth=depth.reshape(shape[:-1]),
+            against=against.reshape(shape[:-1]),
+            layer=layer,
+        )
+        return resolved, report
+
+
+def vertex_normals(vertices: np.ndarray, faces: np.ndarray) -> np.ndarray:
+    """Area-weighted unit vertex normals of a triangle mesh."""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    v0, v1, v2 = vertices[faces[:, 0]], vertices[faces[:, 1]], vertices[faces[:, 2]]
+    face_normals = np.cross(v1 - v0, v2 - v0)
+
+    normals = np.zeros_like(vertices)
+    for corner in range(3):
+        np.add.at(normals, faces[:, corner], face_normals)
+
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
@@ -0,0 +1,124 @@
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Avatar measurements compared against garment size charts, in vector order.
+MEASUREMENT_FIELDS = ('chest', 'waist', 'hips')
+
+# Upper bounds (difference in percent of the avatar measurement) and the
+# score awarded inside each band; anything above the last bound gets the
+# final level.
+DEFAULT_THRESHOLDS = (2, 5, 10, 15)
+DEFAULT_LEVELS = (100, 90, 70, 50, 30)
+
+
+class FitScoringEngine:
+    """Vectorized fit scoring over garments x sizes x measurements.
+
+    Size charts are stacked into a ``(garments, sizes, measurements)`` matrix
+    with NaN for missing values, so a whole wardrobe is scored in a handful of
+    array operations instead of a Python loop per measurement.
+    """
+
+    def __init__(self, measurements: Sequence[str] = MEASUREMENT_FIELDS,
+                 thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+                 levels: Sequence[float] = DEFAULT_LEVELS,
+                 weights: Optional[Sequence[float]] = None,
+                 default_score: float = 50, renormalize: bool = True):
+        if len(levels) != len(thresholds) + 1:
+            raise ValueError('levels must have exactly one more entry than thresholds')
+
+        self.measurements = tuple(measurements)
+        self.thresholds = np.asarray(thresholds, dtype=np.float64)
+        self.levels = np.asarray(levels, dtype=np.float64)
+        self.weights = (
+            np.asarray(weights, dtype=np.float64) if weights is not None
+            else np.ones(len(self.measurements), dtype=np.float64)
+        )
+        self.default_score = float(default_score)
+        # When False, missing measurements count as zero against the full
+        # weight total instead of being dropped from the average.
+        self.renormalize = renormalize
+
+    def avatar_vector(self, avatar) -> np.ndarray:
+        """Return the avatar's measurements as a float vector (NaN if missing)."""
+        return np.array(
+            [_to_float(getattr(avatar, field, None)) for field in self.measurements],
+            dtype=np.float64
+        )
+
+    def size_matrix(self, size_charts: Sequence[Dict[str, Dict[str, Any]]],
+                    sizes: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Stack size charts into a ``(G, S, M)`` matrix.
+
+        Returns the matrix and a ``(G, S)`` boolean mask telling which sizes
+        each chart actually offers.
+        """
+        matrix = np.full(
+            (len(size_charts), len(sizes), len(self.measurements)),
+            np.nan,
+            dtype=np.float64
+        )
+        available = np.zeros((len(size_charts), len(sizes)), dtype=bool)
+
+        for g, chart in enumerate(size_charts):
+            for s, size in enumerate(sizes):
+                row = chart.get(size) if chart else None
+                if row is None:
+                    continue
+                available[g, s] = True
+                matrix[g, s] = [_to_float(row.get(field)) for field in self.measurements]
+
+        return matrix, available
+
+    def score(self, avatar_vector: np.ndarray, size_matrix: np.ndarray,
+              available: Optional[np.ndarray] = None) -> np.ndarray:
+        """Score every garment/size pair in one pass.
+
+        Returns a ``(G, S)`` array of 0-100 scores; sizes that are not
+        available are NaN.
+        """
+        avatar_vector = np.asarray(avatar_vector, dtype=np.float64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            diff_percent = np.abs(size_matrix - avatar_vector) / avatar_vector * 100
+
+        valid = np.isfinite(diff_percent)
+        band = np.searchsorted(self.thresholds, np.where(valid, diff_percent, 0), side='left')
+        measurement_scores = self.levels[band]
+
+        weights = np.where(valid, self.weights, 0.0)
+        weight_sum = weights.sum(axis=-1)
+        weighted = (measurement_scores * weights).sum(axis=-1)
+
+        divisor = weight_sum if self.renormalize else self.weights.sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(weight_sum > 0, weighted / divisor, self.default_score)
+
+        if available is not None:
+            scores = np.where(available, scores, np.nan)
+
+        return scores
+
+    def score_charts(self, avatar, size_charts: Sequence[Dict[str, Dict[str, Any]]],
+                     sizes: Sequence[str]) -> np.ndarray:
+        """Convenience wrapper: build the matrix and score it for ``avatar``."""
+        matrix, available = self.size_matrix(size_charts, sizes)
+        return self.score(self.avatar_vector(avatar), matrix, available)
+
+
+def union_sizes(size_charts: Iterable[Dict[str, Any]]) -> List[str]:
+    """Return all sizes offered by ``size_charts`` in first-seen order."""
+    sizes = {}
+    for chart in size_charts:
+        for size in chart or {}:
+            sizes.setdefault(size, None)
+    return list(sizes)
+
+
+def _to_float(value) -> float:
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("try_on", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tryonsessiongarment",
+            name="simulation_result",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
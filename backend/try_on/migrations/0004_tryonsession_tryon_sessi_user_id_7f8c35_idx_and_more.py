@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("try_on", "0003_tryonsession_status"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="tryonsession",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="tryon_sessi_user_id_7f8c35_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outfit",
+            index=models.Index(
+                fields=["user", "-created_at", "-id"], name="outfits_user_id_f77ef1_idx"
+            ),
+        ),
+    ]
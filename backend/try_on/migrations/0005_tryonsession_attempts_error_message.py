@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("try_on", "0004_tryonsession_tryon_sessi_user_id_7f8c35_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tryonsession",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="tryonsession",
+            name="error_message",
+            field=models.TextField(blank=True),
+        ),
+    ]
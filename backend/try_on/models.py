@@ -5,10 +5,21 @@ import uuid
 
 
 class TryOnSession(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tryon_sessions')
     avatar = models.ForeignKey('avatars.Avatar', on_delete=models.SET_NULL, null=True, related_name='tryon_sessions')
     session_name = models.CharField(max_length=200, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='completed')
+    # Simulation job attempts so far and the last one's error
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error_message = models.TextField(blank=True)
     
     # Session results
     fit_score = models.DecimalField(
@@ -39,6 +50,8 @@ class TryOnSession(models.Model):
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['created_at']),
+            # Keyset pagination of a user's sessions
+            models.Index(fields=['user', '-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -58,6 +71,8 @@ class TryOnSessionGarment(models.Model):
         blank=True,
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
+    # Last per-layer simulation output, reused by incremental re-simulation
+    simulation_result = models.JSONField(null=True, blank=True)
     
     class Meta:
         db_table = 'tryon_session_garments'
@@ -89,6 +104,8 @@ class Outfit(models.Model):
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['user', 'is_favorite']),
+            # Keyset pagination of a user's outfits
+            models.Index(fields=['user', '-created_at', '-id']),
         ]
     
     def __str__(self):
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from .models import TryOnSession, TryOnSessionGarment, Outfit, OutfitGarment
+from avatars.models import Avatar
 from avatars.serializers import AvatarSerializer
+from garments.models import Garment
 from garments.serializers import GarmentSerializer
 from django.conf import settings
 
@@ -12,8 +14,8 @@ class TryOnSessionGarmentSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = TryOnSessionGarment
-        fields = ('id', 'garment', 'garment_id', 'layer_order', 'selected_size', 'fit_score')
-        read_only_fields = ('id', 'fit_score')
+        fields = ('id', 'garment', 'garment_id', 'layer_order', 'selected_size', 'fit_score', 'simulation_result')
+        read_only_fields = ('id', 'fit_score', 'simulation_result')
 
 
 class TryOnSessionSerializer(serializers.ModelSerializer):
@@ -26,7 +28,8 @@ class TryOnSessionSerializer(serializers.ModelSerializer):
         model = TryOnSession
         fields = '__all__'
         read_only_fields = ('id', 'user', 'created_at', 'updated_at', 
-                           'fit_score', 'recommended_size', 'confidence_level')
+                           'fit_score', 'recommended_size', 'confidence_level', 'status',
+                           'attempts', 'error_message')
     
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
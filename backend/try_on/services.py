@@ -1,7 +1,12 @@
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, List, Optional
 from django.db.models import Avg
 import numpy as np
 import logging
+from .cache import SimulationCache
+from .models import TryOnSessionGarment
+from .cloth import ClothSimulator, DEFAULT_MATERIAL
+from .collision import LayeredCollisionIndex
+from .fit_scoring import FitScoringEngine, union_sizes, _to_float
 
 logger = logging.getLogger('miora.try_on')
 
@@ -9,43 +14,88 @@ logger = logging.getLogger('miora.try_on')
 class VirtualTryOnService:
     """Service for virtual try-on simulation."""
     
+    # Fallback chart used when a garment has no size chart of its own
+    STANDARD_SIZES = {
+        'S': {'chest': 90, 'waist': 75, 'hips': 90},
+        'M': {'chest': 95, 'waist': 80, 'hips': 95},
+        'L': {'chest': 100, 'waist': 85, 'hips': 100},
+        'XL': {'chest': 105, 'waist': 90, 'hips': 105}
+    }
+    
+    def __init__(self):
+        self.scoring_engine = FitScoringEngine()
+        self.cloth_simulator = ClothSimulator()
+        self.cache = SimulationCache()
+    
     def simulate(self, session) -> Dict[str, Any]:
         """Run virtual try-on simulation."""
         try:
             avatar = session.avatar
-            garments = session.garments.all().order_by('layer_order')
+            garments = list(
+                session.garments.select_related('garment').order_by('layer_order')
+            )
             
-            # Initialize simulation
-            simulation_results = []
-            overall_fit_scores = []
+            simulation_results = self.simulate_layers(avatar, garments)
             
-            for session_garment in garments:
-                garment = session_garment.garment
-                
-                # Simulate garment on avatar
-                result = self._simulate_garment(
-                    avatar,
-                    garment,
-                    session_garment.selected_size,
-                    session_garment.layer_order
-                )
-                
-                simulation_results.append(result)
-                overall_fit_scores.append(result['fit_score'])
+            return {
+                'success': True,
+                **self._aggregate_results(simulation_results),
+                'garment_results': simulation_results
+            }
             
-            # Calculate overall scores
-            overall_fit_score = np.mean(overall_fit_scores) if overall_fit_scores else 0
-            confidence = self._calculate_confidence(simulation_results)
+        except Exception as e:
+            logger.error(f'Try-on simulation error: {str(e)}')
+            return {
+                'success': False,
+                'error': str(e),
+                'overall_fit_score': 0,
+                'confidence': 0
+            }
+    
+    def resimulate(self, session, changed_layer: int) -> Dict[str, Any]:
+        """Re-simulate ``changed_layer`` and the layers above it.
+        
+        Layers below the change keep their stored ``simulation_result``;
+        session aggregates are recomputed from the stored per-layer results
+        and saved on the session.
+        """
+        try:
+            garments = list(
+                session.garments.select_related('garment').order_by('layer_order')
+            )
+            previous_results = {
+                sg.layer_order: sg.simulation_result
+                for sg in garments
+                if sg.simulation_result
+            }
+            
+            simulation_results = self.simulate_layers(
+                session.avatar,
+                garments,
+                start_layer=changed_layer,
+                previous_results=previous_results
+            )
+            
+            updated = []
+            for session_garment, result in zip(garments, simulation_results):
+                if session_garment.simulation_result != result:
+                    session_garment.simulation_result = result
+                    updated.append(session_garment)
+            TryOnSessionGarment.objects.bulk_update(updated, ['simulation_result'])
+            
+            aggregates = self._aggregate_results(simulation_results)
+            session.fit_score = aggregates['overall_fit_score']
+            session.confidence_level = aggregates['confidence']
+            session.save(update_fields=['fit_score', 'confidence_level', 'updated_at'])
             
             return {
                 'success': True,
-                'overall_fit_score': round(overall_fit_score, 2),
-                'confidence': round(confidence, 2),
+                **aggregates,
                 'garment_results': simulation_results
             }
             
         except Exception as e:
-            logger.error(f'Try-on simulation error: {str(e)}')
+            logger.error(f'Try-on re-simulation error: {str(e)}')
             return {
                 'success': False,
                 'error': str(e),
@@ -53,24 +103,139 @@ class VirtualTryOnService:
                 'confidence': 0
             }
     
-    def _simulate_garment(self, avatar, garment, size: str, layer: int) -> Dict[str, Any]:
+    def simulate_layers(self, avatar, session_garments, start_layer: Optional[int] = None,
+                        previous_results: Optional[Dict[int, Dict[str, Any]]] = None,
+                        on_layer: Optional[Callable[[int, Any, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """Simulate session garments innermost first, reusing cached layers.
+        
+        ``session_garments`` must be ordered by ``layer_order``. Each layer is
+        cached under a key chained to the layer beneath it, because outer
+        layers collide with (and so depend on) the inner ones.
+        
+        With ``start_layer``, layers below it return their entry from
+        ``previous_results`` instead of being simulated again. They are only
+        re-solved when their collision surface is no longer cached and a
+        layer above needs to collide with it.
+        
+        ``on_layer(index, session_garment, result)`` is called as each layer
+        finishes, e.g. to report progress.
+        """
+        previous_results = previous_results or {}
+        # Score every layer in a single batched pass
+        fit_scores = self.score_layers(avatar, session_garments)
+        collision_index = self._build_collision_index(avatar)
+        
+        simulation_results = []
+        beneath = ''
+        for session_garment, fit_score in zip(session_garments, fit_scores):
+            garment = session_garment.garment
+            size = session_garment.selected_size
+            layer = session_garment.layer_order
+            
+            cache_key = self.cache.make_key(
+                avatar, garment, size, layer,
+                self._get_size_measurements(garment, size),
+                beneath=beneath
+            )
+            reuse = (
+                start_layer is not None
+                and layer < start_layer
+                and layer in previous_results
+            )
+            if reuse and collision_index is None:
+                simulation_results.append(previous_results[layer])
+                beneath = cache_key
+                if on_layer:
+                    on_layer(len(simulation_results) - 1, session_garment, simulation_results[-1])
+                continue
+            
+            entry = self.cache.get(cache_key)
+            
+            if entry is None:
+                result = self._simulate_garment(
+                    avatar,
+                    garment,
+                    size,
+                    layer,
+                    fit_score=fit_score,
+                    collision_index=collision_index
+                )
+                entry = {'result': result, 'surface': None}
+                if collision_index is not None:
+                    surface = collision_index.surfaces[-1]
+                    entry['surface'] = (
+                        surface.points.astype(np.float32),
+                        surface.normals.astype(np.float32)
+                    )
+                self.cache.set(cache_key, entry)
+            elif collision_index is not None and entry['surface'] is not None:
+                # Outer layers still need to collide with the cached one
+                collision_index.add_layer(*entry['surface'], layer)
+            
+            simulation_results.append(previous_results[layer] if reuse else entry['result'])
+            beneath = cache_key
+            if on_layer:
+                on_layer(len(simulation_results) - 1, session_garment, simulation_results[-1])
+        
+        return simulation_results
+    
+    def score_layers(self, avatar, session_garments) -> List[float]:
+        """Score the selected size of every session layer in one array operation."""
+        if not session_garments:
+            return []
+        
+        size_rows = [
+            {'selected': self._get_size_measurements(sg.garment, sg.selected_size)}
+            for sg in session_garments
+        ]
+        scores = self.scoring_engine.score_charts(avatar, size_rows, ['selected'])
+        return [float(score) for score in scores[:, 0]]
+    
+    def score_wardrobe(self, avatar, garments) -> Dict[str, Dict[str, float]]:
+        """Score every size of every garment for ``avatar``.
+        
+        Returns a mapping of garment id to ``{size: fit_score}`` covering the
+        sizes each garment offers.
+        """
+        garments = list(garments)
+        if not garments:
+            return {}
+        
+        size_charts = [garment.size_chart or self.STANDARD_SIZES for garment in garments]
+        sizes = union_sizes(size_charts)
+        scores = self.scoring_engine.score_charts(avatar, size_charts, sizes)
+        
+        wardrobe_scores = {}
+        for garment, row in zip(garments, scores):
+            wardrobe_scores[str(garment.id)] = {
+                size: round(float(score), 2)
+                for size, score in zip(sizes, row)
+                if not np.isnan(score)
+            }
+        return wardrobe_scores
+    
+    def _simulate_garment(self, avatar, garment, size: str, layer: int,
+                          fit_score: Optional[float] = None,
+                          collision_index: Optional[LayeredCollisionIndex] = None) -> Dict[str, Any]:
         """Simulate single garment on avatar."""
         # Get garment measurements for size
         size_measurements = self._get_size_measurements(garment, size)
         
-        # Calculate fit score
-        fit_score = self._calculate_fit_score(
-            avatar,
-            garment,
-            size_measurements
-        )
+        # Calculate fit score unless it was already scored in a batch
+        if fit_score is None:
+            fit_score = self._calculate_fit_score(
+                avatar,
+                garment,
+                size_measurements
+            )
         
-        # Simulate cloth physics (placeholder)
+        # Simulate cloth physics
         physics_result = self._simulate_physics(
             avatar,
             garment,
             size_measurements,
-            layer
+            layer,
+            collision_index=collision_index
         )
         
         return {
@@ -87,61 +252,99 @@ class VirtualTryOnService:
             return garment.size_chart[size]
         
         # Fallback to standard sizes
-        standard_sizes = {
-            'S': {'chest': 90, 'waist': 75, 'hips': 90},
-            'M': {'chest': 95, 'waist': 80, 'hips': 95},
-            'L': {'chest': 100, 'waist': 85, 'hips': 100},
-            'XL': {'chest': 105, 'waist': 90, 'hips': 105}
-        }
-        
-        return standard_sizes.get(size, standard_sizes['M'])
+        return self.STANDARD_SIZES.get(size, self.STANDARD_SIZES['M'])
     
     def _calculate_fit_score(self, avatar, garment, size_measurements: Dict[str, float]) -> float:
         """Calculate fit score based on measurements."""
-        scores = []
-        
-        # Compare measurements
-        measurement_pairs = [
-            ('chest', 'chest'),
-            ('waist', 'waist'),
-            ('hips', 'hips')
-        ]
+        scores = self.scoring_engine.score_charts(
+            avatar,
+            [{'selected': size_measurements}],
+            ['selected']
+        )
+        return float(scores[0, 0])
+    
+    def _body_measurements(self, avatar) -> Optional[Dict[str, float]]:
+        """Avatar measurements the cloth solver needs, or None if incomplete."""
+        body_measurements = {
+            field: _to_float(getattr(avatar, field, None))
+            for field in ('height', 'chest', 'waist', 'hips')
+        }
+        if any(np.isnan(value) for value in body_measurements.values()):
+            return None
+        return body_measurements
+    
+    def _build_collision_index(self, avatar) -> Optional[LayeredCollisionIndex]:
+        """Index the avatar body so garment layers can be checked against it."""
+        body_measurements = self._body_measurements(avatar)
+        if body_measurements is None:
+            return None
         
-        for avatar_attr, size_attr in measurement_pairs:
-            if hasattr(avatar, avatar_attr) and size_attr in size_measurements:
-                avatar_value = float(getattr(avatar, avatar_attr))
-                size_value = float(size_measurements[size_attr])
-                
-                # Calculate difference percentage
-                diff_percent = abs(avatar_value - size_value) / avatar_value * 100
-                
-                # Convert to score (0-100)
-                if diff_percent <= 2:
-                    score = 100
-                elif diff_percent <= 5:
-                    score = 90
-                elif diff_percent <= 10:
-                    score = 70
-                elif diff_percent <= 15:
-                    score = 50
-                else:
-                    score = 30
-                
-                scores.append(score)
-        
-        return np.mean(scores) if scores else 50
+        collision_index = LayeredCollisionIndex(clearance=self.cloth_simulator.thickness)
+        collision_index.add_body(*self.cloth_simulator.body_surface(body_measurements))
+        return collision_index
     
     def _simulate_physics(self, avatar, garment, size_measurements: Dict[str, float], 
-                         layer: int) -> Dict[str, Any]:
+                         layer: int,
+                         collision_index: Optional[LayeredCollisionIndex] = None) -> Dict[str, Any]:
         """Simulate cloth physics."""
-        # Placeholder physics simulation
-        # In reality, would use a physics engine
+        body_measurements = self._body_measurements(avatar)
+        if body_measurements is None:
+            logger.warning(f"Avatar {avatar.id} is missing body measurements, skipping cloth solve")
+            return {
+                'drape_quality': 0.5,
+                'stretch_areas': [],
+                'collision_areas': [],
+                'movement_restriction': 0.0
+            }
+        
+        garment_measurements = {}
+        for field in ('chest', 'waist', 'hips'):
+            value = _to_float((size_measurements or {}).get(field))
+            if not np.isnan(value):
+                garment_measurements[field] = value
+        
+        # Only the properties the solver understands, defaults for the rest
+        material = {}
+        for key in DEFAULT_MATERIAL:
+            value = _to_float((garment.material_properties or {}).get(key))
+            if not np.isnan(value):
+                material[key] = value
+        
+        result = self.cloth_simulator.simulate(
+            body_measurements,
+            garment_measurements,
+            garment.category,
+            material=material,
+            layer=layer
+        )
+        metrics = dict(result.metrics)
+        
+        if collision_index is not None:
+            _, report = collision_index.resolve_layer(
+                result.positions,
+                self.cloth_simulator.grid_normals(result.positions),
+                layer
+            )
+            collision_areas = list(metrics['collision_areas'])
+            for surface_id in np.unique(report.against[report.against >= 0]):
+                for area in self.cloth_simulator.clipping_areas(
+                    result, report.depth, report.against == surface_id
+                ):
+                    area['against'] = collision_index.names[surface_id]
+                    collision_areas.append(area)
+            metrics['collision_areas'] = collision_areas
+        
+        return metrics
+    
+    def _aggregate_results(self, simulation_results: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Session-level scores from per-layer results."""
+        overall_fit_scores = [result['fit_score'] for result in simulation_results]
+        overall_fit_score = np.mean(overall_fit_scores) if overall_fit_scores else 0
+        confidence = self._calculate_confidence(simulation_results)
         
         return {
-            'drape_quality': 0.85,
-            'stretch_areas': [],
-            'collision_areas': [],
-            'movement_restriction': 0.1
+            'overall_fit_score': round(float(overall_fit_score), 2),
+            'confidence': round(float(confidence), 2)
         }
     
     def _calculate_confidence(self, results: List[Dict[str, Any]]) -> float:
@@ -0,0 +1,159 @@
+from celery import shared_task
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import time
+import logging
+from .models import TryOnSession
+from .services import VirtualTryOnService
+from recommendations.services import SizeRecommendationService
+
+logger = logging.getLogger('miora.try_on')
+
+# A session queued or processing this long has lost its simulation job
+STALE_SESSION_TIMEOUT = timedelta(minutes=10)
+
+
+def session_group(session_id) -> str:
+    """Channel group joined by ``TryOnConsumer`` for a session."""
+    return f'tryon_{session_id}'
+
+
+def notify_session(session_id, event_type: str, **payload):
+    """Push an event to everyone watching the session; never fails the job."""
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+
+    try:
+        async_to_sync(channel_layer.group_send)(
+            session_group(session_id),
+            {'type': event_type, 'session_id': str(session_id), **payload}
+        )
+    except Exception as e:
+        logger.warning(f'Could not notify try-on session {session_id}: {str(e)}')
+
+
+@shared_task(bind=True, max_retries=2)
+def run_try_on_session(self, session_id):
+    """Simulate a queued try-on session and stream progress to its group."""
+    try:
+        session = TryOnSession.objects.select_related('avatar').get(id=session_id)
+    except TryOnSession.DoesNotExist:
+        logger.error(f'Try-on session {session_id} not found')
+        return {'success': False, 'error': 'Session not found'}
+
+    start_time = time.time()
+
+    try:
+        session.status = 'processing'
+        session.attempts = self.request.retries + 1
+        session.save(update_fields=['status', 'attempts', 'updated_at'])
+
+        session_garments = list(
+            session.garments.select_related('garment').order_by('layer_order')
+        )
+        total_layers = len(session_garments)
+        notify_session(session_id, 'tryon.progress', stage='started', total_layers=total_layers)
+
+        def on_layer(index, session_garment, result):
+            notify_session(
+                session_id,
+                'tryon.progress',
+                stage='layer_completed',
+                layer=session_garment.layer_order,
+                completed_layers=index + 1,
+                total_layers=total_layers,
+                result=result
+            )
+
+        service = VirtualTryOnService()
+        simulation_results = service.simulate_layers(
+            session.avatar,
+            session_garments,
+            on_layer=on_layer
+        )
+        aggregates = service._aggregate_results(simulation_results)
+
+        # Size recommendations are computed before taking any row locks
+        recommendation_service = SizeRecommendationService()
+        recommendations = [
+            recommendation_service.get_recommendation(
+                avatar=session.avatar,
+                garment=session_garment.garment
+            )
+            for session_garment in session_garments
+        ]
+
+        with transaction.atomic():
+            for session_garment, result, recommendation in zip(
+                session_garments, simulation_results, recommendations
+            ):
+                session_garment.fit_score = recommendation.get('fit_score')
+                session_garment.simulation_result = result
+                if not session_garment.selected_size:
+                    session_garment.selected_size = recommendation.get('recommended_size', '')
+                session_garment.save()
+
+            session.fit_score = aggregates['overall_fit_score']
+            session.confidence_level = aggregates['confidence']
+            session.status = 'completed'
+            session.error_message = ''
+            session.save()
+
+        processing_time = int((time.time() - start_time) * 1000)
+        notify_session(
+            session_id,
+            'tryon.completed',
+            overall_fit_score=aggregates['overall_fit_score'],
+            confidence=aggregates['confidence'],
+            garment_results=simulation_results,
+            processing_time_ms=processing_time
+        )
+
+        logger.info(f'Try-on session {session_id} simulated in {processing_time}ms')
+        return {'success': True, 'session_id': str(session_id)}
+
+    except Exception as e:
+        logger.error(f'Try-on simulation failed for {session_id}: {str(e)}')
+        session.error_message = str(e)
+
+        if self.request.retries < self.max_retries:
+            # Back in the queue until the retry picks it up
+            session.status = 'queued'
+            session.save(update_fields=['status', 'error_message', 'updated_at'])
+            raise self.retry(exc=e, countdown=10)
+
+        session.status = 'failed'
+        session.save(update_fields=['status', 'error_message', 'updated_at'])
+        notify_session(session_id, 'tryon.failed', error=str(e))
+        return {'success': False, 'error': str(e)}
+
+
+@shared_task
+def fail_stale_sessions():
+    """Fail sessions whose simulation job died without reporting back.
+    
+    A worker killed mid-job never reaches the failure branch of
+    ``run_try_on_session``, which would leave its session processing.
+    """
+    cutoff = timezone.now() - STALE_SESSION_TIMEOUT
+    stale = TryOnSession.objects.filter(
+        status__in=['queued', 'processing'], updated_at__lt=cutoff
+    ).values_list('id', flat=True)
+    
+    failed = 0
+    error = 'Simulation timed out.'
+    for session_id in list(stale):
+        # Skip sessions a late job picked up since the query
+        if TryOnSession.objects.filter(
+            id=session_id, status__in=['queued', 'processing'], updated_at__lt=cutoff
+        ).update(status='failed', error_message=error, updated_at=timezone.now()):
+            notify_session(session_id, 'tryon.failed', error=error)
+            failed += 1
+    
+    if failed:
+        logger.warning(f'Failed {failed} stale try-on sessions')
+    return {'success': True, 'failed': failed}
@@ -1,14 +1,27 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
-from rest_framework.test import APITestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from celery.exceptions import Retry
+from channels.layers import get_channel_layer
 import uuid
+import numpy as np
 
 from avatars.models import Avatar
 from garments.models import Garment
 from .models import TryOnSession, TryOnSessionGarment, Outfit, OutfitGarment
+from .cache import SimulationCache
+from .tasks import STALE_SESSION_TIMEOUT, fail_stale_sessions, run_try_on_session, session_group
+from .cloth import ClothSimulator
+from .collision import LayeredCollisionIndex, SpatialHashGrid
+from .fit_scoring import FitScoringEngine
+from .services import VirtualTryOnService
 
 User = get_user_model()
 
@@ -172,13 +185,17 @@ class TryOnSessionAPITest(APITestCase):
             ]
         }
         
-        response = self.client.post(url, data, format='json')
-        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with patch('try_on.views.run_try_on_session.delay') as mock_job:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'queued')
         
-        # Check session was created
+        # Check session was created and the simulation job queued
         session = TryOnSession.objects.get(id=response.data['id'])
         self.assertEqual(session.session_name, 'New Session')
         self.assertEqual(session.garments.count(), 1)
+        mock_job.assert_called_once_with(str(session.id))
 
     def test_update_garment_size(self):
         """Test updating garment size in a session."""
@@ -492,3 +509,474 @@ class EnhancedTryOnAPITest(APITestCase):
         
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+
+class FitScoringEngineTest(TestCase):
+    """Test the vectorized fit scoring engine."""
+
+    def setUp(self):
+        self.engine = FitScoringEngine()
+        self.avatar = SimpleNamespace(chest=95.0, waist=80.0, hips=95.0)
+
+    def test_scores_match_threshold_bands(self):
+        """Test each measurement lands in the expected score band."""
+        charts = [
+            {'M': {'chest': 95, 'waist': 80, 'hips': 95}},   # exact fit
+            {'M': {'chest': 99, 'waist': 84, 'hips': 99}},   # ~4-5% off
+            {'M': {'chest': 120, 'waist': 100, 'hips': 120}},  # far off
+        ]
+        scores = self.engine.score_charts(self.avatar, charts, ['M'])
+
+        self.assertEqual(scores.shape, (3, 1))
+        self.assertEqual(scores[0, 0], 100)
+        self.assertEqual(scores[1, 0], 90)
+        self.assertEqual(scores[2, 0], 30)
+
+    def test_missing_sizes_and_measurements(self):
+        """Test unavailable sizes are NaN and empty rows fall back to default."""
+        charts = [
+            {'S': {'chest': 91}, 'M': {}},
+            {'L': {'chest': 100, 'waist': 85, 'hips': 100}},
+        ]
+        scores = self.engine.score_charts(self.avatar, charts, ['S', 'M', 'L'])
+
+        self.assertEqual(scores[0, 0], 90)
+        self.assertEqual(scores[0, 1], 50)
+        self.assertTrue(np.isnan(scores[0, 2]))
+        self.assertTrue(np.isnan(scores[1, 0]))
+        self.assertEqual(scores[1, 2], 70)
+
+    def test_matches_service_single_score(self):
+        """Test batched wardrobe scores agree with single-garment scoring."""
+        service = VirtualTryOnService()
+        garments = [
+            SimpleNamespace(id=uuid.uuid4(), size_chart={}),
+            SimpleNamespace(id=uuid.uuid4(), size_chart={
+                'M': {'chest': 97, 'waist': 86, 'hips': 110}
+            }),
+        ]
+        wardrobe = service.score_wardrobe(self.avatar, garments)
+
+        self.assertEqual(set(wardrobe[str(garments[0].id)]), {'S', 'M', 'L', 'XL'})
+        for garment in garments:
+            for size, score in wardrobe[str(garment.id)].items():
+                measurements = service._get_size_measurements(garment, size)
+                expected = service._calculate_fit_score(self.avatar, garment, measurements)
+                self.assertAlmostEqual(score, expected, places=2)
+
+
+class ClothSimulatorTest(TestCase):
+    """Test cases for the mass-spring cloth solver."""
+
+    def setUp(self):
+        self.simulator = ClothSimulator()
+        self.body = {'height': 170, 'chest': 96, 'waist': 82, 'hips': 98}
+
+    def test_loose_garment_drapes_freely(self):
+        """Test a roomy garment shows no stretch or clipping."""
+        result = self.simulator.simulate(
+            self.body, {'chest': 104, 'waist': 96, 'hips': 104}, 'shirt'
+        )
+
+        self.assertGreaterEqual(self.simulator.vertex_count, 5000)
+        self.assertEqual(result.metrics['stretch_areas'], [])
+        self.assertEqual(result.metrics['collision_areas'], [])
+        self.assertGreater(result.metrics['drape_quality'], 0.85)
+        self.assertLess(result.metrics['movement_restriction'], 0.1)
+
+    def test_tight_garment_reports_regions(self):
+        """Test undersized garments report stretch and clipping by region."""
+        result = self.simulator.simulate(
+            self.body,
+            {'chest': 80, 'waist': 68, 'hips': 84},
+            'shirt',
+            material={'stretchiness': 0.05}
+        )
+        stretched = {area['region'] for area in result.metrics['stretch_areas']}
+        clipped = {area['region'] for area in result.metrics['collision_areas']}
+
+        self.assertIn('chest', stretched)
+        self.assertIn('chest', clipped)
+        self.assertEqual(result.metrics['movement_restriction'], 1.0)
+
+    def test_stretchy_material_absorbs_tightness(self):
+        """Test material stretchiness lowers the reported restriction."""
+        garment = {'chest': 90, 'waist': 76, 'hips': 92}
+        rigid = self.simulator.simulate(self.body, garment, 'shirt', material={'stretchiness': 0.05})
+        stretchy = self.simulator.simulate(self.body, garment, 'shirt', material={'stretchiness': 0.6})
+
+        self.assertLess(
+            stretchy.metrics['movement_restriction'],
+            rigid.metrics['movement_restriction']
+        )
+
+
+class CollisionIndexTest(TestCase):
+    """Test cases for the spatial-hash collision index."""
+
+    def setUp(self):
+        self.simulator = ClothSimulator()
+        self.body = {'height': 170, 'chest': 96, 'waist': 82, 'hips': 98}
+
+    def test_signed_distance_matches_brute_force(self):
+        """Test hashed nearest-sample queries agree with an exhaustive search."""
+        rng = np.random.default_rng(0)
+        points = rng.uniform(-10, 10, size=(2000, 3))
+        normals = rng.normal(size=(2000, 3))
+        normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+        queries = rng.uniform(-12, 12, size=(500, 3))
+
+        grid = SpatialHashGrid(points, normals, cell_size=2.0)
+        signed = grid.signed_distance(queries, radius=2.0)
+
+        distance2 = ((queries[:, None, :] - points[None, :, :]) ** 2).sum(axis=-1)
+        nearest = distance2.argmin(axis=1)
+        expected = np.einsum('ij,ij->i', queries - points[nearest], normals[nearest])
+        expected[distance2.min(axis=1) > 4.0] = np.nan
+
+        np.testing.assert_allclose(signed, expected)
+
+    def test_outer_layer_clipping_into_inner_layer(self):
+        """Test a tight outer layer over a loose inner one is reported and resolved."""
+        index = LayeredCollisionIndex(clearance=self.simulator.thickness)
+        index.add_body(*self.simulator.body_surface(self.body))
+
+        inner = self.simulator.simulate(self.body, {'chest': 104, 'waist': 92, 'hips': 104}, 'shirt', layer=1)
+        _, inner_report = index.resolve_layer(
+            inner.positions, self.simulator.grid_normals(inner.positions), 1
+        )
+        outer = self.simulator.simulate(self.body, {'chest': 98, 'waist': 84, 'hips': 100}, 'shirt', layer=2)
+        resolved, outer_report = index.resolve_layer(
+            outer.positions, self.simulator.grid_normals(outer.positions), 2
+        )
+
+        self.assertEqual(inner_report.depth.max(), 0)
+        self.assertGreater((outer_report.against == 1).mean(), 0.5)
+        self.assertEqual(index.names[1], 'layer 1')
+        areas = self.simulator.clipping_areas(outer, outer_report.depth)
+        self.assertIn('chest', {area['region'] for area in areas})
+
+        # Resolved vertices clear the inner layer
+        self.assertGreater(
+            np.nanmin(index.surfaces[1].signed_distance(resolved.reshape(-1, 3), index.reach)),
+            self.simulator.thickness - 0.05
+        )
+
+    def test_service_reports_layer_clipping(self):
+        """Test the try-on service threads the index through session layers."""
+        service = VirtualTryOnService()
+        avatar = SimpleNamespace(id=uuid.uuid4(), **self.body)
+        inner = SimpleNamespace(
+            id=uuid.uuid4(), category='top', material_properties={},
+            size_chart={'L': {'chest': 104, 'waist': 92, 'hips': 104}}
+        )
+        outer = SimpleNamespace(
+            id=uuid.uuid4(), category='top', material_properties={},
+            size_chart={'M': {'chest': 98, 'waist': 84, 'hips': 100}}
+        )
+
+        index = service._build_collision_index(avatar)
+        first = service._simulate_garment(avatar, inner, 'L', 1, collision_index=index)
+        second = service._simulate_garment(avatar, outer, 'M', 2, collision_index=index)
+
+        self.assertEqual(first['physics']['collision_areas'], [])
+        self.assertIn('layer 1', {area.get('against') for area in second['physics']['collision_areas']})
+        self.assertIn('Clipping detected', second['issues'])
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'simulation-cache-tests',
+    }
+})
+class SimulationCacheTest(TestCase):
+    """Test cases for the per-layer simulation cache."""
+
+    def setUp(self):
+        self.service = VirtualTryOnService()
+        self.service.cache.cache.clear()
+        self.avatar = SimpleNamespace(
+            id=uuid.uuid4(), height=170, chest=96, waist=82, hips=98
+        )
+        self.layers = [
+            SimpleNamespace(
+                layer_order=order,
+                selected_size='M',
+                garment=SimpleNamespace(
+                    id=uuid.uuid4(), category='top', material_properties={},
+                    size_chart={'M': {'chest': chest, 'waist': 84, 'hips': 100}},
+                    updated_at='2024-01-01T00:00:00'
+                )
+            )
+            for order, chest in ((1, 100), (2, 108))
+        ]
+
+    def simulate(self):
+        with patch.object(
+            self.service.cloth_simulator, 'simulate',
+            wraps=self.service.cloth_simulator.simulate
+        ) as solver:
+            results = self.service.simulate_layers(self.avatar, self.layers)
+        return results, solver.call_count
+
+    def test_repeat_simulation_is_served_from_cache(self):
+        """Test a repeated avatar/garment/size/layer combination skips the solver."""
+        first, first_solves = self.simulate()
+        second, second_solves = self.simulate()
+
+        self.assertEqual(first_solves, 2)
+        self.assertEqual(second_solves, 0)
+        self.assertEqual(first, second)
+
+        stats = self.service.cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_changed_measurements_invalidate(self):
+        """Test new avatar measurements miss the cache for every layer."""
+        self.simulate()
+        self.avatar.chest = 100
+
+        _, solves = self.simulate()
+        self.assertEqual(solves, 2)
+
+    def test_inner_layer_change_invalidates_layers_above(self):
+        """Test editing an inner garment re-simulates it and the layers above."""
+        self.simulate()
+        self.layers[1].garment.updated_at = '2024-02-01T00:00:00'
+        _, outer_only = self.simulate()
+        self.layers[0].garment.updated_at = '2024-02-01T00:00:00'
+        _, both = self.simulate()
+
+        self.assertEqual(outer_only, 1)
+        self.assertEqual(both, 2)
+
+    def test_key_is_stable(self):
+        """Test keys are deterministic and sensitive to size and layer."""
+        cache = SimulationCache()
+        garment = self.layers[0].garment
+        key = cache.make_key(self.avatar, garment, 'M', 1, {'chest': 100})
+
+        self.assertEqual(key, cache.make_key(self.avatar, garment, 'M', 1, {'chest': 100}))
+        self.assertNotEqual(key, cache.make_key(self.avatar, garment, 'L', 1, {'chest': 100}))
+        self.assertNotEqual(key, cache.make_key(self.avatar, garment, 'M', 2, {'chest': 100}))
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'incremental-simulation-tests',
+    }
+})
+class IncrementalSimulationTest(TestCase):
+    """Test cases for re-simulating from a changed layer upwards."""
+
+    def setUp(self):
+        self.service = VirtualTryOnService()
+        self.service.cache.cache.clear()
+        self.avatar = SimpleNamespace(
+            id=uuid.uuid4(), height=170, chest=96, waist=82, hips=98
+        )
+        size_chart = {
+            'M': {'chest': 100, 'waist': 84, 'hips': 100},
+            'L': {'chest': 108, 'waist': 92, 'hips': 108},
+        }
+        self.layers = [
+            SimpleNamespace(
+                layer_order=order,
+                selected_size='M',
+                garment=SimpleNamespace(
+                    id=uuid.uuid4(), category='top', material_properties={},
+                    size_chart=size_chart, updated_at='2024-01-01T00:00:00'
+                )
+            )
+            for order in (1, 2, 3)
+        ]
+
+    def resimulate(self, start_layer, previous_results):
+        with patch.object(
+            self.service.cloth_simulator, 'simulate',
+            wraps=self.service.cloth_simulator.simulate
+        ) as solver:
+            results = self.service.simulate_layers(
+                self.avatar, self.layers,
+                start_layer=start_layer,
+                previous_results=previous_results
+            )
+        return results, [call.kwargs['layer'] for call in solver.call_args_list]
+
+    def test_only_changed_layer_and_above_are_solved(self):
+        """Test a size change on layer 2 re-solves layers 2 and 3 only."""
+        initial = self.service.simulate_layers(self.avatar, self.layers)
+        stored = {layer.layer_order: result for layer, result in zip(self.layers, initial)}
+
+        self.layers[1].selected_size = 'L'
+        results, solved = self.resimulate(2, stored)
+
+        self.assertEqual(solved, [2, 3])
+        self.assertEqual(results[0], initial[0])
+        self.assertEqual(results[1]['size'], 'L')
+
+    def test_lower_layers_keep_stored_results(self):
+        """Test layers below the change return the stored result even when re-solved."""
+        stored = {1: {'garment_id': 'stored', 'fit_score': 75.0}}
+        self.service.cache.cache.clear()
+
+        results, solved = self.resimulate(2, stored)
+
+        # Layer 1 is re-solved only to rebuild its collision surface
+        self.assertEqual(solved, [1, 2, 3])
+        self.assertEqual(results[0], stored[1])
+
+    def test_aggregates_from_stored_results(self):
+        """Test session scores are recomputed from per-layer results."""
+        aggregates = self.service._aggregate_results([
+            {'fit_score': 80.0, 'physics': {'drape_quality': 0.9}},
+            {'fit_score': 60.0, 'physics': {'drape_quality': 0.7}},
+        ])
+
+        self.assertEqual(aggregates['overall_fit_score'], 70.0)
+        self.assertEqual(aggregates['confidence'], 75.0)
+
+
+class TryOnJobTest(TestCase):
+    """Test cases for the background try-on simulation job."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='job@example.com',
+            username='jobuser',
+            password='testpass123!@#'
+        )
+        # Default avatar created by the profiles signal
+        self.avatar = Avatar.objects.get(user=self.user)
+        self.garment = Garment.objects.create(
+            user=self.user,
+            name='Test Shirt',
+            category='shirt',
+            original_image_url='https://example.com/shirt.jpg',
+            size_chart={'M': {'chest': 96, 'waist': 80, 'hips': 96}}
+        )
+        self.session = TryOnSession.objects.create(
+            user=self.user,
+            avatar=self.avatar,
+            status='queued'
+        )
+        TryOnSessionGarment.objects.create(
+            session=self.session,
+            garment=self.garment,
+            layer_order=1,
+            selected_size='M'
+        )
+
+        self.channel_layer = get_channel_layer()
+        self.channel = async_to_sync(self.channel_layer.new_channel)()
+        async_to_sync(self.channel_layer.group_add)(session_group(self.session.id), self.channel)
+
+    def events(self):
+        events = []
+        while True:
+            try:
+                events.append(async_to_sync(self.channel_layer.receive)(self.channel))
+            except Exception:
+                break
+            if events[-1]['type'] in ('tryon.completed', 'tryon.failed'):
+                break
+        return events
+
+    @patch('recommendations.services.SizeRecommendationService.get_recommendation')
+    def test_job_streams_progress_and_stores_results(self, mock_size_rec):
+        """Test the job reports each layer and saves session results."""
+        mock_size_rec.return_value = {'fit_score': 80, 'recommended_size': 'M'}
+
+        result = run_try_on_session.delay(str(self.session.id)).get()
+        self.assertTrue(result['success'])
+
+        events = self.events()
+        self.assertEqual(
+            [(event['type'], event.get('stage')) for event in events],
+            [
+                ('tryon.progress', 'started'),
+                ('tryon.progress', 'layer_completed'),
+                ('tryon.completed', None),
+            ]
+        )
+        self.assertEqual(events[1]['total_layers'], 1)
+
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'completed')
+        self.assertIsNotNone(self.session.fit_score)
+        session_garment = self.session.garments.get()
+        self.assertEqual(session_garment.simulation_result['size'], 'M')
+
+    @patch('try_on.services.VirtualTryOnService.simulate_layers')
+    def test_job_failure_is_reported(self, mock_simulate):
+        """Test a failing simulation marks the session failed and notifies clients."""
+        mock_simulate.side_effect = RuntimeError('solver exploded')
+
+        # Final attempt: no retries left
+        result = run_try_on_session.apply(
+            args=[str(self.session.id)],
+            retries=run_try_on_session.max_retries
+        ).get()
+        self.assertFalse(result['success'])
+
+        events = self.events()
+        self.assertEqual(events[-1]['type'], 'tryon.failed')
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'failed')
+        self.assertEqual(self.session.attempts, run_try_on_session.max_retries + 1)
+        self.assertEqual(self.session.error_message, 'solver exploded')
+
+    @patch('try_on.services.VirtualTryOnService.simulate_layers')
+    def test_job_retry_is_recorded(self, mock_simulate):
+        """Test a failed attempt with retries left requeues the session."""
+        mock_simulate.side_effect = RuntimeError('solver exploded')
+
+        with self.assertRaises(Retry):
+            run_try_on_session.apply(args=[str(self.session.id)], throw=True)
+
+        self.session.refresh_from_db()
+        self.assertEqual(
+            (self.session.status, self.session.attempts, self.session.error_message),
+            ('queued', 1, 'solver exploded')
+        )
+
+    def test_stale_sessions_are_failed(self):
+        """Test sessions whose job died are failed and clients told."""
+        TryOnSession.objects.filter(id=self.session.id).update(
+            status='processing',
+            updated_at=timezone.now() - STALE_SESSION_TIMEOUT - timedelta(minutes=1)
+        )
+        fresh = TryOnSession.objects.create(user=self.user, avatar=self.avatar, status='queued')
+
+        self.assertEqual(fail_stale_sessions()['failed'], 1)
+
+        self.assertEqual(self.events()[-1]['type'], 'tryon.failed')
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.status, 'failed')
+        fresh.refresh_from_db()
+        self.assertEqual(fresh.status, 'queued')
+
+    def update_size(self, size='L'):
+        client = APIClient()
+        client.force_authenticate(user=self.user)
+        url = reverse('try_on:tryon-session-update-garment-size', kwargs={'pk': self.session.id})
+        return client.post(url, {'garment_id': str(self.garment.id), 'size': size})
+
+    def test_size_change_waits_for_job(self):
+        """Test size changes are refused until the queued simulation is done."""
+        for session_status in ('queued', 'processing'):
+            TryOnSession.objects.filter(id=self.session.id).update(status=session_status)
+            self.assertEqual(self.update_size().status_code, status.HTTP_409_CONFLICT)
+
+        self.assertEqual(self.session.garments.get().selected_size, 'M')
+
+    def test_size_change_without_avatar(self):
+        """Test a session whose avatar was deleted is rejected, not a 500."""
+        TryOnSession.objects.filter(id=self.session.id).update(status='completed', avatar=None)
+
+        self.assertEqual(self.update_size().status_code, status.HTTP_400_BAD_REQUEST)
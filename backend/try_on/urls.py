@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import TryOnSessionViewSet, OutfitViewSet, TryOnView
+from .views import TryOnSessionViewSet, OutfitViewSet, TryOnView, SimulationCacheStatsView
 
 app_name = 'try_on'
 
@@ -11,4 +11,5 @@ router.register('outfits', OutfitViewSet, basename='outfit')
 urlpatterns = [
     path('', include(router.urls)),
     path('try-on/', TryOnView.as_view(), name='enhanced_try_on'),
+    path('simulation-cache/stats/', SimulationCacheStatsView.as_view(), name='simulation_cache_stats'),
 ]
\ No newline at end of file
@@ -13,21 +13,27 @@ from .serializers import (
     OutfitSerializer,
     OutfitCreateFromSessionSerializer
 )
+from .cache import SimulationCache
 from .services import VirtualTryOnService
+from .tasks import run_try_on_session
 from recommendations.services import SizeRecommendationService
 from common.services.flora_fauna_service import FloraFaunaService
 from common.services.revery_ai_service import ReveryAIService
+from core.pagination import KeysetPagination
 
 
 class TryOnSessionViewSet(viewsets.ModelViewSet):
     """ViewSet for virtual try-on sessions."""
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = TryOnSessionSerializer
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         return TryOnSession.objects.filter(
             user=self.request.user
-        ).order_by('-created_at')
+        ).select_related('avatar').prefetch_related(
+            'garments__garment'
+        ).order_by('-created_at', '-id')
     
     def create(self, request, *args, **kwargs):
         """Create a new try-on session."""
@@ -42,7 +48,8 @@ class TryOnSessionViewSet(viewsets.ModelViewSet):
             session = TryOnSession.objects.create(
                 user=request.user,
                 avatar_id=serializer.validated_data['avatar_id'],
-                session_name=serializer.validated_data.get('session_name', '')
+                session_name=serializer.validated_data.get('session_name', ''),
+                status='queued'
             )
             
             # Add garments
@@ -54,33 +61,14 @@ class TryOnSessionViewSet(viewsets.ModelViewSet):
                     selected_size=garment_data.get('selected_size', '')
                 )
             
-            # Run virtual try-on simulation
-            try_on_service = VirtualTryOnService()
-            results = try_on_service.simulate(session)
-            
-            # Update session with results
-            session.fit_score = results.get('overall_fit_score')
-            session.confidence_level = results.get('confidence')
-            session.save()
-            
-            # Get size recommendations
-            recommendation_service = SizeRecommendationService()
-            for session_garment in session.garments.all():
-                recommendation = recommendation_service.get_recommendation(
-                    avatar=session.avatar,
-                    garment=session_garment.garment
-                )
-                session_garment.fit_score = recommendation.get('fit_score')
-                session_garment.save()
-                
-                if not session_garment.selected_size:
-                    session_garment.selected_size = recommendation.get('recommended_size', '')
-                    session_garment.save()
+            # Simulation and size recommendations run in the background;
+            # progress is streamed to the session's websocket group
+            transaction.on_commit(lambda: run_try_on_session.delay(str(session.id)))
         
-        # Return session with garments
+        # Return queued session with garments
         return Response(
             TryOnSessionSerializer(session).data,
-            status=status.HTTP_201_CREATED
+            status=status.HTTP_202_ACCEPTED
         )
     
     @action(detail=True, methods=['post'])
@@ -95,6 +83,17 @@ class TryOnSessionViewSet(viewsets.ModelViewSet):
                 'detail': 'garment_id and size are required.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        # The queued simulation would overwrite the layer results
+        if session.status in ['queued', 'processing']:
+            return Response({
+                'detail': 'Session is still being simulated.'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        if session.avatar is None:
+            return Response({
+                'detail': 'Session avatar no longer exists.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         try:
             session_garment = session.garments.get(garment__id=garment_id)
             session_garment.selected_size = new_size
@@ -110,9 +109,15 @@ class TryOnSessionViewSet(viewsets.ModelViewSet):
             session_garment.fit_score = new_score
             session_garment.save()
             
+            # Only the changed layer and the layers above it are re-simulated
+            try_on_service = VirtualTryOnService()
+            results = try_on_service.resimulate(session, session_garment.layer_order)
+            
             return Response({
                 'detail': 'Size updated successfully.',
-                'new_fit_score': new_score
+                'new_fit_score': new_score,
+                'session_fit_score': results.get('overall_fit_score'),
+                'confidence_level': results.get('confidence')
             })
         except TryOnSessionGarment.DoesNotExist:
             return Response({
@@ -156,9 +161,12 @@ class OutfitViewSet(viewsets.ModelViewSet):
     """ViewSet for outfit management."""
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = OutfitSerializer
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        queryset = Outfit.objects.filter(user=self.request.user)
+        queryset = Outfit.objects.filter(
+            user=self.request.user
+        ).select_related('avatar').prefetch_related('garments__garment')
         
         # Filter by privacy level
         privacy = self.request.query_params.get('privacy')
@@ -169,7 +177,7 @@ class OutfitViewSet(viewsets.ModelViewSet):
         if self.request.query_params.get('favorites') == 'true':
             queryset = queryset.filter(is_favorite=True)
         
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
     
     @action(detail=True, methods=['post'])
     def toggle_favorite(self, request, pk=None):
@@ -198,17 +206,19 @@ class OutfitViewSet(viewsets.ModelViewSet):
             is_favorite=False
         )
         
-        # Copy garments
-        for garment in original.garments.all():
-            OutfitGarment.objects.create(
+        # Copy garments (prefetched by get_queryset)
+        OutfitGarment.objects.bulk_create([
+            OutfitGarment(
                 outfit=outfit,
                 garment=garment.garment,
                 layer_order=garment.layer_order,
                 selected_size=garment.selected_size
             )
+            for garment in original.garments.all()
+        ])
         
         return Response(
-            OutfitSerializer(outfit).data,
+            OutfitSerializer(self.get_queryset().get(pk=outfit.pk)).data,
             status=status.HTTP_201_CREATED
         )
     
@@ -225,13 +235,15 @@ class OutfitViewSet(viewsets.ModelViewSet):
         )
         
         # Copy garments
-        for outfit_garment in outfit.garments.all():
-            TryOnSessionGarment.objects.create(
+        TryOnSessionGarment.objects.bulk_create([
+            TryOnSessionGarment(
                 session=session,
                 garment=outfit_garment.garment,
                 layer_order=outfit_garment.layer_order,
                 selected_size=outfit_garment.selected_size
             )
+            for outfit_garment in outfit.garments.all()
+        ])
         
         return Response({
             'detail': 'Try-on session created.',
@@ -285,3 +297,16 @@ class TryOnView(APIView):
             'avatar_id': str(avatar.id),
             'garment_id': str(garment.id)
         }, status=status.HTTP_200_OK)
+
+
+class SimulationCacheStatsView(APIView):
+    """Hit/miss counters of the try-on simulation cache (staff only)."""
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(SimulationCache().stats())
+
+    def delete(self, request):
+        """Reset the counters."""
+        SimulationCache().reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
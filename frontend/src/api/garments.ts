@@ -5,8 +5,10 @@ interface GarmentFilters {
   category?: string;
   status?: string;
   search?: string;
-  page?: number;
   page_size?: number;
+  cursor?: string;
+  // The list is cursor-paginated; the total is only counted on request
+  include_count?: boolean;
 }
 
 export const garmentApi = {
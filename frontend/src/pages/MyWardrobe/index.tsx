@@ -16,7 +16,7 @@ const MyWardrobe = () => {
     search: '',
   });
   
-  const { data: garments, isLoading } = useGarments(filters);
+  const { data: garments, isLoading } = useGarments({ ...filters, include_count: true });
   
   return (
     <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-8">